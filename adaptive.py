@@ -0,0 +1,110 @@
+"""Adaptive sample period: slow sampling through steady creep, fast sampling as it accelerates to rupture.
+
+AdaptivePeriod looks at the latest samples of true strain at each check and
+picks the period so that
+
+* the strain moves about `strain_step` between samples, using a lower
+  confidence bound of the fitted strain rate so noise alone never speeds
+  sampling up, and
+* while the strain rate is clearly rising (tertiary creep) from one window
+  of samples to the next, there are at least `samples_per_doubling`
+  samples in the time the rate takes to grow by its own size.
+
+Periods come from the ladder min_period * 2**k (topped by max_period), so
+the period changes in a few clean steps. It moves to a faster rung as soon as
+the target calls for it, and to the next slower one only after `FIT_SAMPLES`
+samples at the current period call for at least twice that.
+"""
+import math
+
+import numpy as np
+
+
+class AdaptivePeriod:
+    """Chooses the sample period within [min_period, max_period] from the recent strain."""
+    FIT_SAMPLES = 20 # samples the strain rate and its change are fitted over
+    STRAIN_STEP = 1e-5 # true strain wanted between samples
+    SAMPLES_PER_DOUBLING = 50 # samples wanted while an accelerating strain rate grows by its own size
+    CONFIDENCE = 2.0 # standard errors the strain rate must exceed to count
+    RISE_CONFIDENCE = 3.0 # standard errors a rise in the strain rate must exceed to count
+    HEADROOM = 2.0 # a slower rung is taken once the target is this many times longer
+
+    def __init__(self, min_period: float, max_period: float, strain_step: float = STRAIN_STEP,
+                 samples_per_doubling: int = SAMPLES_PER_DOUBLING):
+        if not 0 < min_period <= max_period:
+            raise ValueError("Adaptive period bounds must satisfy 0 < min <= max.")
+        self.min_period = min_period
+        self.max_period = max_period
+        self.strain_step = strain_step
+        self.samples_per_doubling = samples_per_doubling
+        self.reason = "" # why the latest target was chosen, for the log
+        self.previous = None # (mean time, rate, standard error) of the latest window not overlapping the ones after it
+        self.previous_end = None
+
+    def ladder(self, period: float) -> float:
+        """The rung at or below `period` (min_period if below the ladder)."""
+        if period >= self.max_period:
+            return self.max_period
+        if period <= self.min_period:
+            return self.min_period
+        return self.min_period * 2 ** math.floor(math.log2(period / self.min_period) + 1e-9)
+
+    @staticmethod
+    def _fit(t, y):
+        """Slope of a least-squares line, its standard error, and the mean time."""
+        t_mean = t.mean()
+        tc = t - t_mean
+        sxx = float(tc @ tc)
+        if sxx <= 0:
+            return 0.0, math.inf, t_mean
+        slope = float(tc @ (y - y.mean())) / sxx
+        residual = y - y.mean() - slope * tc
+        sigma = math.sqrt(float(residual @ residual) / max(t.size - 2, 1))
+        return slope, sigma / math.sqrt(sxx), t_mean
+
+    def target(self, elapsed, strain) -> float:
+        """Period the latest samples call for, at least min_period but not capped at max_period.
+
+        elapsed and strain are the last FIT_SAMPLES; infinite if the strain is not moving measurably.
+        """
+        t = np.asarray(elapsed, dtype=np.float64)
+        y = np.asarray(strain, dtype=np.float64)
+        rate, error, mid = self._fit(t, y)
+        period = math.inf
+        self.reason = "steady strain"
+        significant = abs(rate) - self.CONFIDENCE * error
+        if significant > 0:
+            period = self.strain_step / significant
+            self.reason = f"strain rate {rate:.3g}/s"
+
+        # A clear rise since the previous, separate window means creep is accelerating
+        if self.previous is not None:
+            previous_mid, previous_rate, previous_error = self.previous
+            rise = rate - previous_rate
+            if rate > 0 and rise > self.RISE_CONFIDENCE * math.hypot(error, previous_error):
+                growth_time = rate * (mid - previous_mid) / rise # time for the rate to grow by its own size
+                if growth_time / self.samples_per_doubling < period:
+                    period = growth_time / self.samples_per_doubling
+                    self.reason = f"strain rate {rate:.3g}/s and rising"
+        if self.previous_end is None or t[0] > self.previous_end:
+            self.previous = (mid, rate, error)
+            self.previous_end = t[-1]
+        return max(period, self.min_period)
+
+    def next_period(self, period: float, elapsed, strain, samples_at_period: int):
+        """The new period for the latest samples, or None to keep `period`.
+
+        samples_at_period: samples taken since the period last changed.
+        """
+        if len(elapsed) < self.FIT_SAMPLES:
+            return None
+        target = self.target(elapsed[-self.FIT_SAMPLES:], strain[-self.FIT_SAMPLES:])
+        rung = self.ladder(target)
+        if rung < period:
+            return rung
+        # One rung at a time, so a slowdown is confirmed at every step, and with headroom
+        # so a target near a rung does not flip the period back and forth
+        slower = min(self.ladder(period) * 2, self.max_period)
+        if slower > period and samples_at_period >= self.FIT_SAMPLES and target >= self.HEADROOM * slower:
+            return slower
+        return None
@@ -0,0 +1,220 @@
+"""Live creep analytics: minimum creep rate, creep stage and rupture forecast.
+
+CreepAnalytics takes the samples of true strain in blocks as they arrive and
+fits a strain rate to each run of consecutive samples. Each fit is made as
+long as the previous one showed it needs to be for a standard error of
+REL_ERROR, so fits are short while creep is fast and long through steady
+creep; running sums make the work per sample constant. The rate followed is
+that of the latest SMOOTH_FITS fits taken together. From it come
+
+* the minimum creep rate, with a CONFIDENCE standard-error band;
+* the stage: primary until the rate is no longer clearly below what it was
+  at half the elapsed time (creep slows on a logarithmic time scale),
+  tertiary once it is clearly and TERTIARY_RISE times above the minimum.
+  Each change needs SETTLE_FITS fits in a row to confirm it, stages only
+  move forward, and the minimum is fixed from tertiary creep on;
+* in tertiary creep, a rupture forecast: the inverse strain rate falls
+  about linearly to zero at rupture, so a line through it over the latest
+  FORECAST_FITS fits meets zero at the forecast time.
+"""
+import bisect
+import collections
+import math
+
+import numpy as np
+
+
+class RateFit:
+    """Least-squares strain rate of consecutive samples, from their centred sums."""
+    __slots__ = ("t_start", "t_end", "n", "mean_t", "mean_y", "cxx", "cxy", "cyy")
+
+    def __init__(self, t_start, t_end, n, mean_t, mean_y, cxx, cxy, cyy):
+        self.t_start, self.t_end, self.n = t_start, t_end, n
+        self.mean_t, self.mean_y = mean_t, mean_y
+        self.cxx, self.cxy, self.cyy = cxx, cxy, cyy
+
+    @property
+    def t_mid(self) -> float:
+        return 0.5 * (self.t_start + self.t_end)
+
+    @property
+    def rate(self) -> float:
+        return self.cxy / self.cxx
+
+    @property
+    def error(self) -> float:
+        """Standard error of the rate."""
+        residual = max(self.cyy - self.cxy * self.rate, 0.0)
+        return math.sqrt(residual / max(self.n - 2, 1) / self.cxx)
+
+    @classmethod
+    def merge(cls, fits) -> "RateFit":
+        """One fit over the samples of several, in time order (pairwise combination of the centred sums)."""
+        fits = iter(fits)
+        a = next(fits)
+        n, mean_t, mean_y, cxx, cxy, cyy, t_end = a.n, a.mean_t, a.mean_y, a.cxx, a.cxy, a.cyy, a.t_end
+        for b in fits:
+            total = n + b.n
+            dt, dy = b.mean_t - mean_t, b.mean_y - mean_y
+            weight = n * b.n / total
+            cxx += b.cxx + dt * dt * weight
+            cxy += b.cxy + dt * dy * weight
+            cyy += b.cyy + dy * dy * weight
+            mean_t += dt * b.n / total
+            mean_y += dy * b.n / total
+            n, t_end = total, b.t_end
+        return cls(a.t_start, t_end, n, mean_t, mean_y, cxx, cxy, cyy)
+
+
+class CreepAnalytics:
+    """Minimum creep rate, creep stage and rupture forecast, updated a block of samples at a time."""
+    MIN_FIT = 20 # samples a rate fit holds at least
+    MAX_FIT = 5000 # samples a rate fit holds at most, when the rate is too small to measure to REL_ERROR
+    REL_ERROR = 0.05 # fits are made long enough for a standard error of this fraction of the rate
+    SMOOTH_FITS = 5 # latest fits the followed rate is taken over
+    CONFIDENCE = 2.0 # standard errors a difference in rate must exceed to count
+    SETTLE_FITS = 5 # fits in a row that confirm a change of stage
+    TERTIARY_RISE = 1.2 # tertiary creep: the rate is at least this many times the minimum
+    FORECAST_FITS = 10 # latest tertiary fits the rupture forecast is made from
+
+    def __init__(self):
+        self.stage = "primary"
+        self.stage_since = None # elapsed time the current stage was found to start (None for primary)
+        self.minimum: RateFit = None
+        self.rupture_time = None # forecast elapsed time of rupture
+        self.last_time = None
+        self.fits = 0
+        self._recent = collections.deque(maxlen=self.SMOOTH_FITS)
+        self._primary = [] # followed rates while in primary creep, and their times
+        self._primary_times = []
+        self._run = 0 # fits in a row calling for the next stage
+        self._run_kind = self._run_start = None
+        self._forecast = collections.deque(maxlen=self.FORECAST_FITS)
+        self._length = self.MIN_FIT # samples in the open fit when it closes
+        self._open_fit()
+
+    def _open_fit(self, t0: float = None, y0: float = None):
+        """Start a new fit; its sums are taken relative to its first sample."""
+        self._t0, self._y0 = t0, y0
+        self._n = 0
+        self._sums = np.zeros(5) # x, y, xx, xy, yy
+
+    def update(self, t, y):
+        """Add a block of samples: elapsed times t (ascending) and true strains y."""
+        t = np.asarray(t, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = np.isfinite(t) & np.isfinite(y)
+        if not keep.all():
+            t, y = t[keep], y[keep]
+        if t.size:
+            self.last_time = float(t[-1])
+        while t.size:
+            if self._t0 is None:
+                self._open_fit(t[0], y[0])
+            m = min(t.size, self._length - self._n)
+            x = t[:m] - self._t0
+            v = y[:m] - self._y0
+            self._sums += (x.sum(), v.sum(), x @ x, x @ v, v @ v)
+            self._n += m
+            self._t_end = float(t[m - 1])
+            t, y = t[m:], y[m:]
+            if self._n >= self._length:
+                self._close_fit()
+
+    def _close_fit(self):
+        """Fit the open samples and choose the length of the next fit."""
+        n = self._n
+        sx, sy, sxx, sxy, syy = self._sums
+        t_start, self._t0 = float(self._t0), None
+        cxx = sxx - sx * sx / n
+        if cxx <= 0:
+            return
+        fit = RateFit(t_start, self._t_end, n, float(t_start + sx / n), float(self._y0 + sy / n),
+                      float(cxx), float(sxy - sx * sy / n), float(syy - sy * sy / n))
+        self._add(fit)
+        # The error of a slope falls as length**-1.5: the next fit is as long as this one
+        # would have had to be for REL_ERROR, within a factor of two of it
+        relative = fit.error / abs(fit.rate) if fit.rate else math.inf
+        length = n * (relative / self.REL_ERROR) ** (2 / 3) if math.isfinite(relative) else self.MAX_FIT
+        self._length = int(min(max(length, n / 2, self.MIN_FIT), 2 * n, self.MAX_FIT))
+
+    def _add(self, fit: RateFit):
+        """Move the minimum, the stage and the forecast on with a closed fit."""
+        self.fits += 1
+        self._recent.append(fit)
+        if self.stage == "tertiary":
+            self._add_forecast(fit)
+            return
+        if len(self._recent) < self.SMOOTH_FITS:
+            return
+        rate = RateFit.merge(self._recent)
+        minimum = self.minimum
+        if minimum is not None and rate.rate >= self.TERTIARY_RISE * minimum.rate and \
+                rate.rate - minimum.rate > self.CONFIDENCE * math.hypot(rate.error, minimum.error):
+            # Clearly faster than the minimum: accelerating creep, if it lasts
+            if self._confirm(rate, "rising"):
+                self.stage, self.stage_since = "tertiary", self._run_start.t_mid
+                self._primary = self._primary_times = None
+                for recent in self._recent:
+                    self._add_forecast(recent)
+            return
+        if minimum is None or rate.rate < minimum.rate:
+            self.minimum = rate
+        if self.stage != "primary":
+            self._run = 0
+            return
+        # Steady creep: the rate is no longer clearly below what it was at half the elapsed time
+        self._primary.append(rate)
+        self._primary_times.append(rate.t_mid)
+        earlier = self._primary[bisect.bisect_left(self._primary_times, 0.5 * rate.t_mid)]
+        if earlier is not rate and rate.rate > earlier.rate - self.CONFIDENCE * math.hypot(rate.error, earlier.error):
+            if self._confirm(rate, "steady"):
+                self.stage, self.stage_since = "secondary", earlier.t_mid
+                self._primary = self._primary_times = None
+        else:
+            self._run = 0
+
+    def _confirm(self, rate: RateFit, kind: str) -> bool:
+        """Count a fit calling for the next stage; True once SETTLE_FITS in a row have."""
+        if self._run == 0 or self._run_kind != kind:
+            self._run, self._run_kind, self._run_start = 0, kind, rate
+        self._run += 1
+        return self._run >= self.SETTLE_FITS
+
+    def _add_forecast(self, fit: RateFit):
+        """Extrapolate the inverse strain rate of the latest tertiary fits to zero."""
+        if fit.rate > 0:
+            self._forecast.append((fit.t_mid, 1.0 / fit.rate))
+        if len(self._forecast) < 3:
+            return
+        t, inverse = np.array(self._forecast).T
+        slope, intercept = np.polyfit(t - t[-1], inverse, 1)
+        self.rupture_time = float(t[-1] - intercept / slope) if slope < 0 else None
+
+    def summary(self) -> dict:
+        """The results as plain values (None where unknown), e.g. for the acquisition service's status."""
+        minimum = self.minimum
+        return {
+            "stage": self.stage,
+            "stage_since": self.stage_since,
+            "minimum_rate": minimum.rate if minimum else None,
+            "minimum_error": self.CONFIDENCE * minimum.error if minimum else None,
+            "minimum_at": minimum.t_mid if minimum else None,
+            "rupture_time": self.rupture_time,
+            "last_time": self.last_time,
+        }
+
+
+def describe(summary: dict) -> dict:
+    """Lines for the GUI and the info file from a CreepAnalytics summary, by label."""
+    if summary is None or summary["minimum_rate"] is None:
+        return {"Creep Stage": "measuring"}
+    lines = {}
+    since = summary["stage_since"]
+    lines["Creep Stage"] = summary["stage"] + (f" since {since:.0f} s" if since is not None else "")
+    rate, error = summary["minimum_rate"], summary["minimum_error"]
+    lines["Minimum Creep Rate (1/s)"] = f"{rate:.4g} ({rate - error:.4g} to {rate + error:.4g}) at {summary['minimum_at']:.0f} s"
+    if summary["rupture_time"] is not None:
+        remaining = summary["rupture_time"] - summary["last_time"]
+        lines["Rupture Forecast (s)"] = f"{summary['rupture_time']:.0f} (in {remaining / 3600:.1f} h)"
+    return lines
@@ -0,0 +1,102 @@
+"""Load test: acquisition throughput, CSV saving and plot frames on the simulated bench.
+
+Runs take_readings until the simulated status signal drops, then times
+save_to_csv over the whole data set and StrainPlot.animate at the final size.
+
+Run from the repository root:
+    python benchmarks/bench_acquisition.py --period 1 --duration 86400 --speedup 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from headless import make_handler, make_plot
+from simulation import Latency
+from writer import DataWriter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--period", type=float, default=1.0, help="sample period in simulated seconds")
+    parser.add_argument("--duration", type=float, default=6 * 3600, help="simulated test length in seconds")
+    parser.add_argument("--speedup", type=float, default=1000.0, help="simulated seconds per real second")
+    parser.add_argument("--virtual", action="store_true",
+                        help="virtual clock: simulated time only advances while sleeping, measures pure CPU cost")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean query latency in simulated seconds")
+    parser.add_argument("--concurrent", action="store_true", help="overlap the DAQ and voltmeter reads")
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="fraction of instrument reads that time out")
+    parser.add_argument("--frames", type=int, default=20, help="animate() frames to time")
+    parser.add_argument("--bin", type=int, default=1, help="bin size used for the frames")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.join(tmp, "sim")
+        speedup = None if args.virtual else args.speedup
+        handler = make_handler(name, period=args.period, speedup=speedup, end_after=args.duration,
+                               concurrent_reads=args.concurrent, fault_rate=args.fault_rate,
+                               query_latency=Latency(args.latency, args.latency / 4))
+
+        # Acquisition (per-sample prints are swallowed so the terminal does not dominate)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.take_readings()
+        acq_time = time.perf_counter() - start
+        n = handler.idx
+        sim_span = float(handler.elapsed[n - 1]) if n else 0.0
+        print(f"acquisition: {n} samples over {sim_span:.0f} simulated s in {acq_time:.2f} s "
+              f"({n / acq_time:.0f} samples/s, mean period {sim_span / max(n - 1, 1):.3f} s "
+              f"for {args.period} s requested)")
+        for task in handler.scheduler.tasks:
+            print(f"  {task.summary()}")
+        if n:
+            skew = handler.temperature_time[:n] - handler.displacement_time[:n]
+            print(f"  read latency mean {1000 * handler.acq_latency[:n].mean():.1f} ms "
+                  f"max {1000 * handler.acq_latency[:n].max():.1f} ms, "
+                  f"channel skew mean {1000 * skew.mean():.1f} ms (simulated)")
+        for line in handler.sessions.summary():
+            print(f"  {line}")
+
+        # Full rewrite of the data file: save_to_csv only queues, the writer thread formats and writes
+        handler.test.last_written_index = 0
+        os.remove(handler.test.data_file_name)
+        handler.writer = DataWriter(handler.test.data_file_name, handler.test.info_file_name,
+                                    checkpoint_file_name=handler.test.checkpoint_file_name)
+        start = time.perf_counter()
+        handler.save_to_csv()
+        queue_time = time.perf_counter() - start
+        handler.writer.close()
+        save_time = time.perf_counter() - start
+        print(f"save_to_csv: {1000 * queue_time:.2f} ms on the caller, "
+              f"{n} rows written in {save_time:.3f} s ({n / save_time:.0f} rows/s)")
+
+        # Plot frames at the final size
+        handler.is_running = True
+        handler.test.update(bin_val=args.bin)
+        plot = make_plot(handler)
+        animate_time = draw_time = 0.0
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            plot.animate(frame)
+            animate_time += time.perf_counter() - start
+            start = time.perf_counter()
+            plot.fig.canvas.draw()
+            draw_time += time.perf_counter() - start
+        print(f"animate: {1000 * animate_time / args.frames:.1f} ms/frame, "
+              f"full draw: {1000 * draw_time / args.frames:.1f} ms/frame at {n} samples, bin {args.bin}, "
+              f"{plot.line1.get_xdata().size} points per line")
+
+        # Live frames: the last samples are replayed one every other tick, unchanged ticks are skipped
+        shown = max(n - args.frames // 2, 1)
+        for frame in range(args.frames):
+            if frame % 2 == 0:
+                shown = min(shown + 1, n)
+                handler.store.commit(shown)
+            plot.update_frame()
+        print(f"  {plot.frame_summary()}")
+
+
+if __name__ == "__main__":
+    main()
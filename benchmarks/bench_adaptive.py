@@ -0,0 +1,54 @@
+"""Benchmark: fixed vs adaptive sample period over a simulated test that creeps to rupture.
+
+Runs the same simulated test (primary, secondary and tertiary creep, the
+status signal dropping at rupture) once at a fixed period and once with an
+adaptive period, on a virtual clock. Reports the samples and data file size
+of each, and how many samples fall in the last hours before rupture.
+
+Run from the repository root:
+    python benchmarks/bench_adaptive.py [--min-period 1] [--max-period 300] [--hours 60]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from headless import make_handler
+from simulation import CreepCurve
+
+
+def run(directory, label, curve, hours, period, period_range=None):
+    handler = make_handler(os.path.join(directory, label), period=period, speedup=None,
+                           end_after=hours * 3600, curve=curve, period_range=period_range)
+    handler.take_readings()
+    return handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-period", type=float, default=1.0, help="fixed period, and the adaptive minimum")
+    parser.add_argument("--max-period", type=float, default=300.0)
+    parser.add_argument("--hours", type=float, default=60.0, help="simulated test length; rupture at the end")
+    parser.add_argument("--tertiary-hours", type=float, default=12.0, help="length of tertiary creep before rupture")
+    args = parser.parse_args(argv)
+
+    curve = CreepCurve(tertiary_start=(args.hours - args.tertiary_hours) * 3600, tertiary_tau=args.tertiary_hours * 3600 / 5)
+    with tempfile.TemporaryDirectory() as directory:
+        fixed = run(directory, "fixed", curve, args.hours, args.min_period)
+        adaptive = run(directory, "adaptive", curve, args.hours, args.min_period, (args.min_period, args.max_period))
+
+        print(f"{'':>10} {'samples':>9} {'data file MB':>13} {'last 6 h':>9} {'last 1 h':>9} {'last 10 min':>12}")
+        for label, handler in (("fixed", fixed), ("adaptive", adaptive)):
+            elapsed = handler.store.view("elapsed", 0, handler.idx)
+            end = float(elapsed[-1])
+            recent = [int(np.count_nonzero(elapsed > end - seconds)) for seconds in (6 * 3600, 3600, 600)]
+            size = os.path.getsize(handler.test.data_file_name) / 1e6
+            print(f"{label:>10} {handler.idx:>9} {size:>13.2f} " + " ".join(f"{n:>9}" for n in recent[:2]) + f" {recent[2]:>12}")
+        print(f"adaptive: {len(adaptive.test.freq_log)} periods logged")
+        for entry in adaptive.test.freq_log:
+            print(f"  {float(entry['Period (s)']):g} s from {float(entry['Timestamp (s)']) / 3600:.2f} h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: resuming a long test after a crash (see recovery.py).
+
+Records a test of --samples rows through TestHandler's own save path (the
+samples are synthetic, filled straight into the sample store), cuts the data
+file's last line short as a crash would, and times resume_test
+
+* with the sample store in place (only the tail of the data file is read), and
+* without it (the samples are bulk-loaded from the data file).
+
+Run from the repository root:
+    python benchmarks/bench_resume.py [--samples 2000000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tkinter as tk
+
+import numpy as np
+
+from headless import load_app, make_handler
+from simulation import SimClock, SimulatedBench
+
+GAP = 3600.0 # seconds between the crash and the resume
+
+
+def record(name, samples):
+    """A test of `samples` rows on disk, stopped without its final save having finished."""
+    handler = make_handler(name, speedup=None)
+    while handler.capacity < samples:
+        handler._grow_store()
+    t = np.arange(samples, dtype=np.float64)
+    strain = 0.01 + 1e-9 * t
+    handler.timestamps[:samples] = handler.start_time + t
+    handler.elapsed[:samples] = t
+    handler.displacement[:samples] = 1.4 * strain
+    handler.strain[:samples] = strain
+    handler.trueStrain[:samples] = np.log1p(strain)
+    handler.strainRate[:samples] = 1e-9
+    handler.temperature[:samples] = 650.0
+    handler.displacement_voltage[:samples] = 2.0 + strain
+    handler.thermocouple_voltage[:samples] = 0.027
+    # The last save reached the data file for all but the newest rows
+    handler.idx = samples - 100
+    handler.store.commit(samples - 100)
+    handler.save_to_csv()
+    handler.idx = samples
+    handler.store.commit(samples)
+    handler.writer.close()
+    handler.store.flush()
+    with open(handler.test.data_file_name, "ab") as file:
+        file.write(b"1.79e9,123.4,0.0") # a row cut short by the crash
+    return handler
+
+
+def resume(name, after):
+    """Time resume_test on a new handler, `after` seconds of wall clock later."""
+    app = load_app()
+    clock = SimClock(speedup=None, start=after)
+    bench = SimulatedBench(clock=clock)
+    handler = app.TestHandler(root=tk.Tcl(), clock=clock, resource_manager=lambda: bench)
+    if not handler.open_instruments():
+        raise RuntimeError("Could not open the simulated instruments.")
+    start = time.perf_counter()
+    if not handler.resume_test(f"{name}_data.csv"):
+        raise RuntimeError("Resume failed.")
+    seconds = time.perf_counter() - start
+    handler.writer.close()
+    return handler, seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2_000_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        name = os.path.join(directory, "long")
+        start = time.perf_counter()
+        recorded = record(name, args.samples)
+        size = os.path.getsize(f"{name}_data.csv")
+        print(f"Recorded {args.samples} samples ({size / 1e6:.0f} MB data file) in {time.perf_counter() - start:.1f} s")
+        after = recorded.start_time + args.samples + GAP
+
+        for label in ("with sample store", "from data file"):
+            if label == "from data file":
+                shutil.rmtree(f"{name}_samples")
+            handler, seconds = resume(name, after)
+            gap = handler.test.gap_log[-1]["Gap (s)"]
+            print(f"Resume {label}: {seconds:.2f} s, {handler.idx} samples, "
+                  f"{handler.test.last_written_index} in the data file, gap {gap:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
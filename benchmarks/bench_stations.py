@@ -0,0 +1,96 @@
+"""Benchmark: several simulated stations sharing one GPIB bus through a BusScheduler.
+
+Starts --stations simulated tests on a SimulatedLab, lets their status
+signals drop after --duration simulated seconds, then reports each station's
+sample lateness against its bound and how far its samples drifted from the
+ideal period grid. Run from the repository root:
+    python benchmarks/bench_stations.py [--stations 8] [--period 1] [--duration 600] [--speedup 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tkinter as tk
+
+import numpy as np
+
+from headless import load_app
+from simulation import SimClock
+from instruments import simulated_lab, station_addresses
+from stations import StationGroup
+
+
+def make_stations(directory, count, period, clock, lab, concurrent_reads):
+    app = load_app()
+    group = StationGroup()
+    handlers = []
+    resource_manager = lambda: lab # one factory, so the stations share its SessionManager
+    for station in range(count):
+        daq_address, voltmeter_address = station_addresses(station)
+        handler = app.TestHandler(root=tk.Tcl(), clock=clock, resource_manager=resource_manager,
+                                  concurrent_reads=concurrent_reads,
+                                  daq_address=daq_address, voltmeter_address=voltmeter_address)
+        group.add(handler)
+        handler.test.update(name=os.path.join(directory, f"station{station + 1}"), material="simulated", freq=period)
+        if not handler.open_instruments() or not handler.begin_test():
+            raise RuntimeError(f"Could not start {handler.station}.")
+        handlers.append(handler)
+    return group, handlers
+
+
+def drift(handler, period):
+    """Mean sample period minus the nominal period (s); lateness does not add up, so this stays near 0."""
+    elapsed = handler.store.view("elapsed", 0, handler.idx).astype(np.float64)
+    ticks = np.round((elapsed[-1] - elapsed[0]) / period)
+    return float((elapsed[-1] - elapsed[0]) / ticks - period)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=8)
+    parser.add_argument("--period", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=600.0, help="simulated seconds of each test")
+    parser.add_argument("--speedup", type=float, default=20.0)
+    parser.add_argument("--concurrent-reads", action="store_true")
+    args = parser.parse_args(argv)
+
+    clock = SimClock(speedup=args.speedup)
+    addresses = [station_addresses(k) for k in range(args.stations)]
+    with tempfile.TemporaryDirectory() as directory:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output): # per-sample voltage prints
+            lab = simulated_lab(addresses, clock=clock)
+            group, handlers = make_stations(directory, args.stations, args.period, clock, lab, args.concurrent_reads)
+            for bench in lab.benches:
+                bench.end_after = args.duration
+            start = time.perf_counter()
+            for handler in handlers:
+                handler.cont_test()
+            # Keep the last report of each bus while all its stations are running
+            summaries, timing = {}, {}
+            while not all(h.sample_task is not None and h not in h.bus.stations for h in handlers):
+                for name, bus in group.buses.items():
+                    running = [h for h in bus.stations if h.sample_task in bus.scheduler.tasks]
+                    if len(running) == sum(h.bus is bus for h in handlers):
+                        summaries[name] = bus.summary()
+                        timing.update((h, bus.station_timing(h)) for h in bus.stations)
+                time.sleep(0.1)
+            for handler in handlers:
+                handler.pool.shutdown(wait=True)
+            group.close()
+            wall = time.perf_counter() - start
+
+        print(f"{args.stations} stations, period {args.period:g} s, {args.duration:g} simulated s in {wall:.1f} s "
+              f"(speedup {args.speedup:g})")
+        for summary in summaries.values():
+            print(summary)
+        for handler in handlers:
+            line = timing[handler]
+            expected = int(args.duration / args.period)
+            print(f"  {line}, {handler.idx} samples ({handler.idx - expected:+d}), period error {1e6 * drift(handler, args.period):+.1f} us")
+
+
+if __name__ == "__main__":
+    main()
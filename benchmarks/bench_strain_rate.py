@@ -0,0 +1,68 @@
+"""Micro-benchmark: per-sample strain rate cost, np.polyfit window vs RollingSlope.
+
+Run from the repository root:
+    python benchmarks/bench_strain_rate.py [--samples N] [--windows 10 100 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from strain_rate import RollingSlope
+
+
+def make_curve(n, period=1.0, seed=0):
+    """Creep-like true strain curve sampled every `period` seconds, with noise."""
+    rng = np.random.default_rng(seed)
+    elapsed = np.arange(n, dtype=np.float64) * period
+    strain = 1e-3 * np.log1p(elapsed / 60) + 2e-8 * elapsed + rng.normal(0, 1e-6, n)
+    return elapsed.astype(np.float32), strain.astype(np.float32)
+
+
+def polyfit_path(elapsed, strain, window):
+    """The original take_readings loop: slice the window and fit a line every sample."""
+    out = np.empty(elapsed.size, dtype=np.float32)
+    out[0] = 0
+    for idx in range(1, elapsed.size):
+        start_idx = max(0, idx - (window - 1))
+        slope, _ = np.polyfit(elapsed[start_idx:idx + 1], strain[start_idx:idx + 1], 1)
+        out[idx] = slope
+    return out
+
+
+def rolling_path(elapsed, strain, window):
+    out = np.empty(elapsed.size, dtype=np.float32)
+    est = RollingSlope(window)
+    for idx in range(elapsed.size):
+        out[idx] = est.update(elapsed[idx], strain[idx])
+    return out
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args(argv)
+
+    elapsed, strain = make_curve(args.samples)
+    print(f"{'window':>8} {'polyfit us/sample':>18} {'rolling us/sample':>18} {'speedup':>8} {'max rel err':>12}")
+    for window in args.windows:
+        t_poly, ref = timeit(polyfit_path, elapsed, strain, window)
+        t_roll, got = timeit(rolling_path, elapsed, strain, window)
+        scale = np.abs(ref[window:]).max() if args.samples > window else 1.0
+        err = np.abs(got[window:] - ref[window:]).max() / scale if args.samples > window else 0.0
+        print(f"{window:>8} {1e6 * t_poly / args.samples:>18.2f} {1e6 * t_roll / args.samples:>18.2f} "
+              f"{t_poly / t_roll:>8.1f} {err:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark: thermocouple conversion, original per-sample loop vs thermocouple module.
+
+Run from the repository root:
+    python benchmarks/bench_thermocouple.py [--samples N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import thermocouple
+
+
+def loop_path(mv):
+    """The original convert_temperature: pick the coefficients, sum coeff * v**i."""
+    out = np.empty(mv.size)
+    for idx, v in enumerate(mv.tolist()):
+        if v < 0.0:
+            coeffs = thermocouple.NEGATIVE_COEFFICIENTS
+        elif 0.0 <= v <= 20.644:
+            coeffs = thermocouple.POSITIVE_COEFFICIENTS
+        else:
+            coeffs = thermocouple.HIGH_COEFFICIENTS
+        temperature = 0.0
+        for i, coeff in enumerate(coeffs):
+            temperature += coeff * (v ** i)
+        out[idx] = temperature
+    return out
+
+
+def scalar_path(mv):
+    """Live path: one reading at a time through to_celsius."""
+    return np.array([thermocouple.to_celsius(v) for v in mv.tolist()])
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    mv = np.random.default_rng(0).uniform(thermocouple.MIN_MV, thermocouple.MAX_MV, args.samples)
+    loop_n = min(args.samples, 100_000) # the loops are timed on a prefix
+    t_loop, ref = timeit(loop_path, mv[:loop_n])
+    t_build, table = timeit(thermocouple.LookupTable)
+
+    print(f"{'path':>10} {'ns/sample':>10} {'speedup':>8} {'max err (C)':>12}")
+    loop_ns = 1e9 * t_loop / loop_n
+    print(f"{'loop':>10} {loop_ns:>10.1f} {1.0:>8.1f} {0.0:>12.2e}")
+    t, got = timeit(scalar_path, mv[:loop_n])
+    print(f"{'scalar':>10} {1e9 * t / loop_n:>10.1f} {loop_ns / (1e9 * t / loop_n):>8.1f} {np.abs(got - ref).max():>12.2e}")
+    for name, fn in (("horner", thermocouple.to_celsius), ("table", table)):
+        t, got = timeit(fn, mv)
+        ns = 1e9 * t / args.samples
+        print(f"{name:>10} {ns:>10.1f} {loop_ns / ns:>8.1f} {np.abs(got[:loop_n] - ref).max():>12.2e}")
+    print(f"table built in {1000 * t_build:.1f} ms ({table.base.size} segments)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Helpers for driving TestHandler and StrainPlot without a display or GPIB hardware.
+
+The handler runs against simulation.SimulatedBench on a SimClock, Tk variables
+live in a windowless tk.Tcl() interpreter and plots render with Agg.
+"""
+import importlib.util
+import os
+import sys
+import tkinter as tk
+
+import matplotlib
+matplotlib.use("Agg")
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from simulation import SimClock, SimulatedBench
+
+_app = None
+
+
+def load_app():
+    """Import creep-test.py (its file name is not a valid module name)."""
+    global _app
+    if _app is None:
+        spec = importlib.util.spec_from_file_location("creep_test", os.path.join(REPO, "creep-test.py"))
+        _app = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_app)
+    return _app
+
+
+def make_handler(name, period=1.0, speedup=1000.0, gauge_length=1.4, concurrent_reads=False, period_range=None,
+                 data_format="csv", **bench_options):
+    """A started TestHandler on a simulated bench; data files are written to `name`_data.csv (or .ctest).
+
+    period_range: (min, max) seconds for an adaptive period starting at `period`.
+    """
+    app = load_app()
+    clock = SimClock(speedup=speedup)
+    bench = SimulatedBench(clock=clock, **bench_options)
+    handler = app.TestHandler(root=tk.Tcl(), clock=clock, resource_manager=lambda: bench,
+                              concurrent_reads=concurrent_reads, data_format=data_format)
+    handler.bench = bench
+
+    # What the entries would publish
+    handler.test.update(name=name, material="simulated", freq=period, gauge_length=gauge_length,
+                        adaptive=bool(period_range))
+    if period_range:
+        handler.test.update(min_period=period_range[0], max_period=period_range[1])
+
+    if not handler.open_instruments():
+        raise RuntimeError("Could not open the simulated instruments.")
+    if not handler.begin_test():
+        raise RuntimeError("Simulated status signal is low.")
+    return handler
+
+
+def make_plot(handler):
+    """A StrainPlot drawing into an Agg figure, without creating the Tk frame."""
+    app = load_app()
+    plot = app.StrainPlot.__new__(app.StrainPlot)
+    plot.handler = handler
+    plot.build_figure()
+    return plot
@@ -0,0 +1,371 @@
+"""Benchmark suite: acquisition, strain rate, analytics, temperature, data files and plot frames at scale, with baselines.
+
+Every case runs headless (Agg, simulated instruments) in a fresh process, so
+each gets its own peak RSS. Results are flat "case[parameters].metric"
+entries that can be saved as a JSON baseline and compared with a later run:
+
+    python benchmarks/suite.py --save before.json
+    ... change something ...
+    python benchmarks/suite.py --compare before.json    # exit status 1 on a regression or a failed case
+
+Plot frames are timed on synthetic stores of --sizes samples (1e3 to 1e8 by
+default; 1e8 needs about 1.6 GB of temporary disk and a few minutes), the
+other cases at fixed sizes. --quick stops the sizes at 1e6.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+import numpy as np
+
+from headless import REPO, load_app, make_handler, make_plot
+import matplotlib
+import matplotlib.pyplot as plt
+import testfile
+import thermocouple
+from sample_store import SampleStore
+from analytics import CreepAnalytics
+from strain_rate import BlockSlope, RollingSlope, SavitzkyGolaySlope
+from writer import DATA_COLUMNS, DataWriter
+
+SIZES = (10**3, 10**4, 10**5, 10**6, 10**7, 10**8)
+QUICK_SIZES = SIZES[:4]
+BINS = (1, 10, 100)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (ru_maxrss is in kB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def creep_curve(start: int, stop: int, period: float = 1.0, seed: int = 0):
+    """Rows [start:stop) of a synthetic test: elapsed, true strain, strain rate and temperature, as float32."""
+    rng = np.random.default_rng([seed, start])
+    t = np.arange(start, stop, dtype=np.float64) * period
+    strain = 1e-3 * np.log1p(t / 60) + 2e-11 * t + rng.normal(0, 1e-6, t.size)
+    rate = 1e-3 / (60 + t) + 2e-11 + rng.normal(0, 1e-8, t.size)
+    temperature = 600 + 0.5 * np.sin(t / 3600) + rng.normal(0, 0.05, t.size)
+    return [a.astype(np.float32) for a in (t, strain, rate, temperature)]
+
+
+def synthetic_store(path, samples: int, columns, chunk: int = 1 << 20) -> SampleStore:
+    """A store of `samples` committed rows of creep_curve, filled a chunk at a time."""
+    store = SampleStore.create(path, [(name, np.float32) for name in columns], chunk_rows=max(samples, 1))
+    for start in range(0, samples, chunk):
+        stop = min(start + chunk, samples)
+        for name, values in zip(columns, creep_curve(start, stop)):
+            store.array(name)[start:stop] = values
+        store.release(start, stop) # as acquisition does, so the filling does not count towards peak RSS
+    store.commit(samples)
+    return store
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def best_of(repeats, fn, *args) -> float:
+    return min(timed(fn, *args) for _ in range(repeats))
+
+
+# Cases: each returns {metric: (value, unit)}; units ending in "/s" are better higher
+
+def case_acquisition(samples: int):
+    """take_readings on a virtual clock: the CPU cost of one sample, instruments excluded."""
+    with tempfile.TemporaryDirectory() as directory:
+        handler = make_handler(os.path.join(directory, "sim"), speedup=None, end_after=samples)
+        seconds = timed(handler.take_readings)
+        return {"us_per_sample": (1e6 * seconds / handler.idx, "us"),
+                "samples_per_second": (handler.idx / seconds, "samples/s")}
+
+
+def case_strain_rate(samples: int):
+    t, strain, _, _ = creep_curve(0, samples)
+    def live(rate):
+        for x, y in zip(t.tolist(), strain.tolist()):
+            rate.update(x, y)
+    block = best_of(3, lambda: BlockSlope(10).update(t, strain))
+    return {"rolling_us_per_sample": (1e6 * best_of(3, lambda: live(RollingSlope(10))) / samples, "us"),
+            "savgol_us_per_sample": (1e6 * best_of(3, lambda: live(SavitzkyGolaySlope(10))) / samples, "us"),
+            "block_ns_per_sample": (1e9 * block / samples, "ns")}
+
+
+def case_analytics(samples: int):
+    """CreepAnalytics fed 3 samples at a time (a check every 3 s at a 1 s period), and all at once (a resume)."""
+    t, strain, _, _ = creep_curve(0, samples)
+    def live():
+        analytics = CreepAnalytics()
+        for start in range(0, samples, 3):
+            analytics.update(t[start:start + 3], strain[start:start + 3])
+    bulk = best_of(3, lambda: CreepAnalytics().update(t, strain))
+    return {"live_us_per_sample": (1e6 * best_of(3, live) / samples, "us"),
+            "bulk_ns_per_sample": (1e9 * bulk / samples, "ns")}
+
+
+def case_temperature(samples: int):
+    """convert_temperature one reading at a time (what read_sample does), and the vectorized conversion."""
+    handler = load_app().TestHandler(root=tk.Tcl())
+    mv = np.random.default_rng(0).uniform(thermocouple.MIN_MV, thermocouple.MAX_MV, samples)
+    def live():
+        for v in mv.tolist():
+            handler.convert_temperature(v)
+    vectorized = best_of(3, thermocouple.to_celsius, mv)
+    return {"live_us_per_sample": (1e6 * best_of(3, live) / samples, "us"),
+            "vectorized_ns_per_sample": (1e9 * vectorized / samples, "ns")}
+
+
+def case_csv(samples: int):
+    """DataWriter formatting and writing columns laid out like the sample store's."""
+    rng = np.random.default_rng(0)
+    columns = [rng.random(samples).astype(np.float64 if fmt == "%.17g" else np.float32) for _, fmt in DATA_COLUMNS]
+    with tempfile.TemporaryDirectory() as directory:
+        writer = DataWriter(os.path.join(directory, "data.csv"), os.path.join(directory, "info.csv"), fsync_interval=None)
+        start = time.perf_counter()
+        writer.write_rows(columns)
+        writer.close()
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(directory, "data.csv"))
+    return {"rows_per_second": (samples / seconds, "rows/s"), "mb_per_second": (size / 1e6 / seconds, "MB/s")}
+
+
+def data_columns(samples: int):
+    """DATA_COLUMNS for a synthetic test, the raw voltages at the instruments' resolution."""
+    t, strain, rate, temperature = creep_curve(0, samples)
+    displacement = (1.4 * strain).astype(np.float32)
+    return [1.79e9 + t.astype(np.float64), t, displacement, strain, np.log1p(strain), rate, temperature,
+            np.round(2.0 + displacement.astype(np.float64) / 0.04897, 6), np.round(0.0248 + temperature / 4e4, 7)]
+
+
+def case_testfile(samples: int):
+    """Binary test file against CSV: size, writing, reading everything and a tenth by time, CSV export."""
+    columns = data_columns(samples)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sizes = {}
+        for extension in (".csv", testfile.EXTENSION):
+            name = os.path.join(directory, f"data{extension}")
+            writer = DataWriter(name, os.path.join(directory, "info.csv"), fsync_interval=None)
+            seconds = timed(lambda: (writer.write_rows(columns), writer.close()))
+            sizes[extension] = os.path.getsize(name)
+            label = "csv" if extension == ".csv" else "binary"
+            results[f"{label}_write_rows_per_second"] = (samples / seconds, "rows/s")
+        name = os.path.join(directory, f"data{testfile.EXTENSION}")
+        results["binary_bytes_per_row"] = (sizes[testfile.EXTENSION] / samples, "B")
+        results["binary_size_pct_of_csv"] = (100 * sizes[testfile.EXTENSION] / sizes[".csv"], "%")
+        with testfile.TestFile(name) as test_file:
+            results["binary_read_rows_per_second"] = (samples / best_of(3, test_file.read), "rows/s")
+            middle = float(columns[1][samples // 2])
+            span = float(columns[1][-1]) / 20
+            results["binary_range_read_ms"] = (1000 * best_of(3, test_file.read, middle - span, middle + span), "ms")
+        seconds = timed(testfile.export_csv, name, os.path.join(directory, "export.csv"))
+        results["export_rows_per_second"] = (samples / seconds, "rows/s")
+    return results
+
+
+def case_animate(samples: int, bins, frames: int = 20):
+    """StrainPlot frames over a store of `samples` rows, for each bin size.
+
+    first_frame: the frame after the plot opens on a full store (summaries of
+    every sample built, full draw). live: the last 2 * frames rows arrive one
+    per frame; frame times whole update_frame calls (blit or redraw),
+    animate only the line and limit updates.
+    """
+    app = load_app()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = synthetic_store(os.path.join(directory, "samples"), samples, app.StrainPlot.PLOT_SERIES)
+        handler = app.TestHandler(root=tk.Tcl())
+        handler.store = store
+        handler.is_running = True
+        held_back = min(2 * frames, samples - 1)
+        for bin_size in bins:
+            handler.test.update(bin_val=bin_size)
+            plot = make_plot(handler)
+            shown = samples - held_back
+            store.commit(shown)
+            first = timed(plot.update_frame)
+            frame_times, animate_times = [], []
+            for times, step in ((frame_times, plot.update_frame), (animate_times, lambda: plot.animate(0))):
+                for _ in range(held_back // 2):
+                    shown += 1
+                    store.commit(shown)
+                    times.append(timed(step))
+            key = f"bin={bin_size}"
+            results[f"{key}.first_frame_ms"] = (1000 * first, "ms")
+            results[f"{key}.live_frame_ms"] = (1000 * float(np.median(frame_times)) if frame_times else 0.0, "ms")
+            results[f"{key}.live_animate_ms"] = (1000 * float(np.median(animate_times)) if animate_times else 0.0, "ms")
+            plt.close(plot.fig)
+        del handler, store # unmap before the directory goes
+    return results
+
+
+CASES = {
+    "acquisition": case_acquisition,
+    "strain_rate": case_strain_rate,
+    "analytics": case_analytics,
+    "temperature": case_temperature,
+    "csv": case_csv,
+    "testfile": case_testfile,
+    "animate": case_animate,
+}
+
+
+def jobs(args):
+    """(case, parameters) for every process the run starts."""
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    listed = [
+        ("acquisition", {"samples": args.acquisition_samples}),
+        ("strain_rate", {"samples": 100_000}),
+        ("analytics", {"samples": 1_000_000}),
+        ("temperature", {"samples": 100_000}),
+    ]
+    listed += [("csv", {"samples": n}) for n in (10**4, 10**5, 10**6)]
+    listed += [("testfile", {"samples": n}) for n in (10**5, 10**6)]
+    listed += [("animate", {"samples": n, "bins": list(args.bins)}) for n in sizes]
+    return [(case, params) for case, params in listed if not args.only or case in args.only]
+
+
+def run_job(case, params):
+    """Run one case in this process; returns {metric: (value, unit)} with its peak RSS."""
+    results = CASES[case](**params)
+    results["peak_rss_mb"] = (peak_rss_mb(), "MB")
+    return results
+
+
+def job_name(case, params) -> str:
+    shown = {k: f"{v:.0e}".replace("+0", "").replace("+", "") if k == "samples" else v
+             for k, v in params.items() if k != "bins"}
+    return f"{case}[{','.join(f'{k}={v}' for k, v in shown.items())}]"
+
+
+def run_suite(args):
+    """Run each job in a child process; returns the metrics and the names of the jobs that failed."""
+    results = {}
+    failed = []
+    for case, params in jobs(args):
+        name = job_name(case, params)
+        print(f"{name} ...", end=" ", flush=True)
+        start = time.perf_counter()
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), "--job", json.dumps([case, params])],
+                               stdout=subprocess.PIPE, text=True)
+        try:
+            metrics = json.loads(child.stdout.splitlines()[-1]) if child.returncode == 0 else None
+        except (IndexError, ValueError):
+            metrics = None
+        if metrics is None:
+            print("failed")
+            failed.append(name)
+            continue
+        for metric, (value, unit) in metrics.items():
+            results[f"{name}.{metric}"] = {"value": value, "unit": unit}
+        print(f"{time.perf_counter() - start:.1f} s")
+    return results, failed
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "numpy": np.__version__, "matplotlib": matplotlib.__version__}
+
+
+def higher_is_better(unit: str) -> bool:
+    return unit.endswith("/s")
+
+
+def compare(baseline, results, threshold: float, names=()):
+    """Print each metric against the baseline; returns the names of the ones worse by more than threshold.
+
+    A baseline metric of one of the jobs `names` that this run did not produce
+    (the job failed) counts as a regression too.
+    """
+    regressions = []
+    print(f"{'metric':<58} {'baseline':>11} {'now':>11} {'change':>8}")
+    for name, entry in results.items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            print(f"{name:<58} {'-':>11} {entry['value']:>11.4g}")
+            continue
+        change = entry["value"] / old["value"] - 1
+        worse = -change if higher_is_better(entry["unit"]) else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"{name:<58} {old['value']:>11.4g} {entry['value']:>11.4g} {100 * change:>+7.0f}%{flag}")
+    prefixes = tuple(f"{name}." for name in names)
+    for name, old in baseline["results"].items():
+        if name.startswith(prefixes) and name not in results:
+            print(f"{name:<58} {old['value']:>11.4g} {'-':>11} {'':>8}  MISSING")
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", help="store sizes for the plot frames (default 1e3 to 1e8)")
+    parser.add_argument("--bins", type=int, nargs="+", default=BINS, help="bin sizes for the plot frames")
+    parser.add_argument("--quick", action="store_true", help="plot sizes up to 1e6 only")
+    parser.add_argument("--acquisition-samples", type=int, default=20_000)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="run these cases only")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a baseline written by --save")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative change counted as a regression (default 0.25)")
+    parser.add_argument("--job", help=argparse.SUPPRESS) # one case, run in a child process
+    args = parser.parse_args(argv)
+    if args.sizes:
+        args.sizes = [int(n) for n in args.sizes]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.job:
+        case, params = json.loads(args.job)
+        print(json.dumps(run_job(case, params)))
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    results, failed = run_suite(args)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=1)
+            file.write("\n")
+    if baseline is None:
+        for name, entry in results.items():
+            print(f"{name:<58} {entry['value']:>11.4g} {entry['unit']}")
+        regressions = []
+    else:
+        if baseline.get("environment", {}).get("platform") != platform.platform():
+            print(f"Note: the baseline was taken on {baseline.get('environment', {}).get('platform')}")
+        names = [job_name(case, params) for case, params in jobs(args)]
+        regressions = compare(baseline, results, args.threshold, names)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {100 * args.threshold:.0f}% or missing")
+    if failed:
+        print(f"{len(failed)} jobs failed: {', '.join(failed)}")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Displacement transducer calibration and the strains derived from it.
+
+Works on single readings and on arrays alike, so the live test and the
+offline reprocessing tool (reprocess.py) share one definition.
+"""
+import numpy as np
+
+DISPLACEMENT_SLOPE = 0.04897  # in/V
+DISPLACEMENT_OFFSET = 0.53505 # in
+
+
+def displacement(volts, slope: float = DISPLACEMENT_SLOPE, offset: float = DISPLACEMENT_OFFSET):
+    """Displacement (in) from the transducer voltage on AI2."""
+    return (slope * volts) + offset
+
+
+def engineering_strain(displacement, gauge_length: float, first_strain: float):
+    """Strain relative to the reading taken when the test started."""
+    return displacement / gauge_length - first_strain
+
+
+def true_strain(strain):
+    return np.log(1 + strain)
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import *
 from tkinter import simpledialog
 from tkinter import messagebox
+from tkinter import ttk
+from tkinter import filedialog
 from tkinter.scrolledtext import ScrolledText
 from dataclasses import dataclass
 from typing import List
@@ -9,7 +11,6 @@ import numpy as np
 import math
 import time, random
 
-from matplotlib.animation import FuncAnimation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
@@ -17,23 +18,47 @@ from matplotlib.figure import SubplotParams
 
 from concurrent.futures import ThreadPoolExecutor
 import os
-import csv
 import webbrowser
-import pyvisa
-
-class Test:
-    """Object for holding all the data associated with a Test."""
-    def __init__(self):  
-        self.name = tk.StringVar()
-        self.material = tk.StringVar()
-        self.freq = tk.StringVar()
+import argparse
+import collections
+import logging
+import sys
+import tempfile
+
+import strain_rate
+from adaptive import AdaptivePeriod
+from analytics import CreepAnalytics, describe
+from parameters import FIELDS, ParameterError, ParameterSet, TestParameters
+import recovery
+import testfile
+from scheduler import Scheduler
+from writer import DataWriter, DATA_COLUMNS
+from sample_store import SampleStore
+from lod import LODPyramid, bin_mean, nan_extrema
+from handoff import UIQueue
+import thermocouple
+import calibration
+from service import AcquisitionService, ServiceClient, ServiceError
+from stations import BusScheduler, StationGroup
+from sessions import SessionManager, SessionError
+from telemetry import REGISTRY
+from instruments import DAQ_ADDRESS, VOLTMETER_ADDRESS, visa_resource_manager, overlapped_query, timed_query, ChannelScan, station_addresses
+
+log = logging.getLogger("creep-test")
+
+
+class Test(ParameterSet):
+    """Object for holding all the data associated with a Test.
+
+    Its parameters are one immutable TestParameters (self.params), replaced by update(); see parameters.py.
+    """
+    def __init__(self):
+        super().__init__()
         self.freq_log = []
-        self.notes = tk.StringVar()
-        self.gauge_length = tk.StringVar(value="1.4")
-        self.xmin = tk.StringVar(value="0")
-        self.bin_val = tk.StringVar(value="1")
+        self.gap_log = [] # times the test was resumed after stopping unexpectedly, see recovery.py
         self.data_file_name = ""
         self.info_file_name = ""
+        self.checkpoint_file_name = ""
         self.last_written_index = 0
 
 
@@ -46,60 +71,145 @@ class TestInfoEntry(tk.Frame):
     
     def build(self):
         self.grid_columnconfigure(1, weight=1)
+        # The entries' text; edits are checked and published to the test's parameters as they are typed
+        texts = self.handler.test.params.texts()
+        self.vars = {name: tk.StringVar(self, value=texts[name]) for name in FIELDS}
+        self.errors = {} # why the text of each refused entry is not used, by parameter
 
         # row 0 ---------------------------------------------
         name_lbl = tk.Label(self, text="Name:", anchor="e")
         name_lbl.grid(row=0, column=0, sticky="ew")
-        self.name_ent = tk.Entry(self, textvariable=self.handler.test.name)
+        self.name_ent = tk.Entry(self, textvariable=self.vars["name"])
         self.name_ent.grid(row=0, column=1, sticky="ew")
         
         # row 1 ---------------------------------------------
         matr_lbl = tk.Label(self, text="Material:", anchor="e")
         matr_lbl.grid(row=1, column=0, sticky="ew")
-        self.matr_ent = tk.Entry(self, textvariable=self.handler.test.material)
+        self.matr_ent = tk.Entry(self, textvariable=self.vars["material"])
         self.matr_ent.grid(row=1, column=1, sticky="ew")
 
         # row 2 ---------------------------------------------
         freq_lbl = tk.Label(self, text="Period (s):", anchor="e")
         freq_lbl.grid(row=2, column=0, sticky="ew")
-        self.freq_ent = tk.Entry(self, textvariable=self.handler.test.freq)
+        self.freq_ent = tk.Entry(self, textvariable=self.vars["freq"])
         self.freq_ent.grid(row=2, column=1, sticky="ew")
 
         # row 3 ---------------------------------------------
         gauge_length_lbl = tk.Label(self, text="Gauge Length (in):", anchor="e")
         gauge_length_lbl.grid(row=3, column=0, sticky="ew")
-        self.gauge_length_ent = tk.Entry(self, textvariable=self.handler.test.gauge_length)
+        self.gauge_length_ent = tk.Entry(self, textvariable=self.vars["gauge_length"])
         self.gauge_length_ent.grid(row=3, column=1, sticky="ew")
 
         # row 4 ---------------------------------------------
         notes_lbl = tk.Label(self, text="Notes:", anchor="e")
         notes_lbl.grid(row=4, column=0, sticky="ew")
-        self.notes_ent = tk.Entry(self, textvariable=self.handler.test.notes)
+        self.notes_ent = tk.Entry(self, textvariable=self.vars["notes"])
         self.notes_ent.grid(row=4, column=1, sticky="ew")
 
         # row 5 ---------------------------------------------
         xmin_lbl = tk.Label(self, text="x-min:", anchor="e")
         xmin_lbl.grid(row=5, column=0, sticky="ew")
-        self.xmin_ent = tk.Entry(self, textvariable=self.handler.test.xmin)
+        self.xmin_ent = tk.Entry(self, textvariable=self.vars["xmin"])
         self.xmin_ent.grid(row=5, column=1, sticky="ew")
         self.xmin_ent.config(state="disabled")
 
         # row 6 ---------------------------------------------
         bin_lbl = tk.Label(self, text="Bin Size:", anchor="e")
         bin_lbl.grid(row=6, column=0, sticky="ew")
-        self.bin_ent = tk.Entry(self, textvariable=self.handler.test.bin_val)
+        self.bin_ent = tk.Entry(self, textvariable=self.vars["bin_val"])
         self.bin_ent.grid(row=6, column=1, sticky="ew")
         self.bin_ent.config(state="disabled")
 
+        # row 7 ---------------------------------------------
+        adaptive_lbl = tk.Label(self, text="Adaptive Period:", anchor="e")
+        adaptive_lbl.grid(row=7, column=0, sticky="ew")
+        self.adaptive_chk = tk.Checkbutton(self, variable=self.vars["adaptive"], onvalue="1", offvalue="0", anchor="w")
+        self.adaptive_chk.grid(row=7, column=1, sticky="ew")
+
+        # row 8 ---------------------------------------------
+        range_lbl = tk.Label(self, text="Period Range (s):", anchor="e")
+        range_lbl.grid(row=8, column=0, sticky="ew")
+        range_frm = tk.Frame(self)
+        range_frm.grid(row=8, column=1, sticky="ew")
+        range_frm.grid_columnconfigure((0, 2), weight=1)
+        self.min_period_ent = tk.Entry(range_frm, textvariable=self.vars["min_period"], width=8)
+        self.min_period_ent.grid(row=0, column=0, sticky="ew")
+        tk.Label(range_frm, text="to").grid(row=0, column=1)
+        self.max_period_ent = tk.Entry(range_frm, textvariable=self.vars["max_period"], width=8)
+        self.max_period_ent.grid(row=0, column=2, sticky="ew")
+
+        # row 9 ---------------------------------------------
+        # Creep stage, minimum creep rate and rupture forecast (analytics.py)
+        self.analytics_lbl = tk.Label(self, anchor="w", justify="left")
+        self.analytics_lbl.grid(row=9, column=0, columnspan=2, sticky="ew")
+
+        # row 10 --------------------------------------------
+        self.error_lbl = tk.Label(self, anchor="w", justify="left", fg="red")
+        self.error_lbl.grid(row=10, column=0, columnspan=2, sticky="ew")
+
+        for name, var in self.vars.items():
+            var.trace_add("write", lambda *args, name=name: self.on_edit(name))
+        self.handler.test.subscribe(self.on_parameters)
+
+    def on_edit(self, name: str):
+        """Publish an entry's new text (on the Tk thread), or show why it is refused."""
+        error = self.handler.edit_parameter(name, self.vars[name].get())
+        if error:
+            self.errors[name] = error
+        else:
+            self.errors.pop(name, None)
+        self.error_lbl.configure(text="\n".join(self.errors.values()))
+
+    def on_parameters(self, old: TestParameters, new: TestParameters):
+        """Parameters changed, maybe on another thread: show the new ones on the Tk thread."""
+        changed = [name for name in FIELDS if getattr(old, name) != getattr(new, name)]
+        self.handler.on_ui(lambda: self.show(changed))
+
+    def show(self, names=FIELDS):
+        """Show the current parameters in the entries whose text does not already say the same."""
+        params = self.handler.test.params
+        for name in names:
+            var = self.vars[name]
+            try:
+                same = params.parse({name: var.get()}) == params
+            except ParameterError:
+                same = False
+            if not same:
+                var.set(params.text(name))
+
 
 class StrainPlot(tk.Frame):
     """Renders data from a TestHandler as it is collected."""
+    PLOT_SERIES = ("elapsed", "trueStrain", "strainRate", "temperature") # x first, then one per line
+    FRAME_INTERVAL = 500 # ms between frames
+    X_HEADROOM = 0.1 # fraction of the time span left ahead of the newest sample when the x axis grows
+    LIMIT_FILL = 0.5 # limits are recomputed once the data fills less than this fraction of them
+    CATCH_UP_ROWS = 1 << 20 # samples summarized between releases of the store's older rows
+    hold_zoom = False # keep a zoomed or panned view after the toolbar tool is put down (viewer mode)
+
     def __init__(self, parent: tk.Frame, handler: "TestHandler"):
         super().__init__(parent)
         self.handler = handler
         self.build()
+        handler.test.subscribe(self.on_parameters)
 
     def build(self):
+        self.build_figure()
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().grid(sticky="nsew", pady=(40,0))
+        
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        # Frames come from a canvas timer; update_frame does its own (blitted) drawing
+        self.ani = self.canvas.new_timer(interval=self.FRAME_INTERVAL)
+        self.ani.add_callback(self.update_frame)
+        self.ani.start()
+        self.handler.ani = self.ani
+
+    def build_figure(self):
+        """Create the figure, axes and lines (no Tk widgets, so it also works with Agg)."""
         self.fig, (self.strainplt, self.strainrateplt, self.temperatureplt) = plt.subplots(3,
             figsize=(6,6),
             dpi=100,
@@ -126,89 +236,220 @@ class StrainPlot(tk.Frame):
         self.temperatureplt.set_facecolor("w")
         self.temperatureplt.margins(0, tight=True)
 
-        self.line1, = self.strainplt.plot([], [])
-        self.line2, = self.strainrateplt.plot([], [])
-        self.line3, = self.temperatureplt.plot([], [])
-
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().grid(sticky="nsew", pady=(40,0))
-        
-        self.grid_rowconfigure(0, weight=1)
-        self.grid_columnconfigure(0, weight=1)
-
-        self.ani = FuncAnimation(self.fig, self.animate, interval=500, cache_frame_data=False) # Animation period
-        self.handler.ani = self.ani
-
-    def animate(self, interval):
+        # Animated lines are left out of full redraws and blitted over the cached background
+        self.line1, = self.strainplt.plot([], [], animated=True)
+        self.line2, = self.strainrateplt.plot([], [], animated=True)
+        self.line3, = self.temperatureplt.plot([], [], animated=True)
+        self.axes_lines = [(self.strainplt, self.line1), (self.strainrateplt, self.line2), (self.temperatureplt, self.line3)]
+
+        self.background = None
+        self.fig.canvas.mpl_connect("draw_event", self.on_draw)
+        self.visible = True # False while the plot's tab is hidden (multi-station mode)
+
+        # Frame statistics
+        self.last_frame_key = None
+        self.frames = 0
+        self.full_redraws = 0
+        self.skipped_frames = 0 # timer ticks with nothing new to draw
+        self.last_frame_time = 0.0
+        self.total_frame_time = 0.0
+        labels = self.handler.metric_labels()
+        self.animate_metric = REGISTRY.histogram("plot_animate_seconds", "Time to update the lines from the store", **labels)
+        self.frame_metric = REGISTRY.histogram("plot_frame_seconds", "Time to update and draw one frame", **labels)
+        self.redraw_metric = REGISTRY.counter("plot_full_redraws_total", "Frames drawn in full instead of blitted", **labels)
+        self.skipped_metric = REGISTRY.counter("plot_skipped_frames_total", "Timer ticks with nothing new to draw", **labels)
+
+        # Level-of-detail summaries of the store being plotted, rebuilt for a new test
+        self.lod = {}
+        self.lod_store = None
+        self.lod_level = 0
+        self.auto_xlim = None # x limits animate last set itself, see hold_zoom
+
+    def animate(self, interval) -> bool:
+        """Update the lines from the store; returns True if the axis limits moved and a full redraw is needed."""
         if self.handler.is_running:
-            if self.handler.idx == 0:
-                return
-
-
-
-            # Number of points collected so far
-            n = self.handler.idx
-
-            # Slice into existing arrays (views, no copies)
-            x_full    = self.handler.elapsed[:n]
-            ts_full   = self.handler.trueStrain[:n]
-            sr_full   = self.handler.strainRate[:n]
-            temp_full = self.handler.temperature[:n]
-
-            def bin_mean(arr, bin_size):
-                length = arr.size
-                # No binning if bin_size <=1 or too few points
-                if bin_size <= 1 or length <= 1:
-                    return arr
-                m = length // bin_size
-                # Full bins: reshape view and mean over axis=1
-                full = arr[:m * bin_size].reshape(m, bin_size).mean(axis=1)
-                # Handle leftover partial bin
-                rem = length - m * bin_size
-                if rem:
-                    tail = np.array([arr[m * bin_size :].mean()])
-                    return np.concatenate((full, tail))
-                return full
-
-            # Choose raw vs binned data
-            bin_val = int(self.handler.test.bin_val)
-            if bin_val >= 1 and bin_val < n:
-                x   = bin_mean(x_full,    bin_val)
-                ts  = bin_mean(ts_full,   bin_val)
-                sr  = bin_mean(sr_full,   bin_val)
-                temp= bin_mean(temp_full, bin_val)
+            # Number of points collected so far. Rows are committed after they are
+            # written, so the committed count is a consistent snapshot of every column
+            store = self.handler.store
+            n = len(store)
+            if n == 0:
+                return False
+
+            # Read-only views of the sample store (no copies)
+            series = {name: store.view(name, 0, n) for name in self.PLOT_SERIES}
+            x_full = series["elapsed"]
+            n = x_full.size # a read-only store's maps can lag its count until the next refresh
+
+            # Summarize only the samples that arrived since the last frame. A long catch-up
+            # (attaching to a running test) goes in steps, releasing the rows behind it, so
+            # only the newest rows of the store stay in memory
+            if self.lod_store is not store:
+                self.lod = {name: LODPyramid() for name in self.PLOT_SERIES}
+                self.lod_store = store
+            done = self.lod["elapsed"].n
+            while done < n:
+                step_start, done = done, min(done + self.CATCH_UP_ROWS, n)
+                for name, values in series.items():
+                    self.lod[name].update(values[:done])
+                store.release(step_start - store.HOT_ROWS, done - store.HOT_ROWS)
+
+            params = self.handler.test.params # the view settings, parsed when they were entered
+            x_min = params.xmin
+            # The user's view: while a toolbar tool is active, and after it in hold_zoom mode
+            toolbar = self.handler.toolbar
+            user_view = bool(toolbar is not None and toolbar.mode) or (
+                self.hold_zoom and self.auto_xlim is not None and self.strainplt.get_xlim() != self.auto_xlim)
+
+            # Samples in view, found by bisection on the ordered times (limits in the column's
+            # dtype: a Python float would make searchsorted convert the whole column first)
+            if user_view:
+                # Only the samples between the user's limits (and one either side, so the
+                # lines reach the edges), in more detail the further the view is zoomed in
+                lo, hi = (x_full.dtype.type(x) for x in self.strainplt.get_xlim())
+                start = max(int(np.searchsorted(x_full, lo)) - 1, 0)
+                stop = min(int(np.searchsorted(x_full, hi, side="right")) + 1, n)
+                start = min(start, stop - 1)
             else:
-                x, ts, sr, temp = x_full, ts_full, sr_full, temp_full
-
-
-            # Set X-axis limits using first and last elements (efficient for ordered data)
-            x_min = float(self.handler.test.xmin)
-            x_max = self.handler.elapsed[self.handler.idx - 1]
-            self.strainplt.set_xlim(x_min, x_max)  # Shared x-axis
+                start = min(int(np.searchsorted(x_full, x_full.dtype.type(x_min))), n - 1)
+                stop = n
+            count = stop - start
+            width = max(int(self.strainplt.get_window_extent().width), 1)
+            bin_val = params.bin_val
+
+            pyramid = self.lod["elapsed"]
+            if count <= width * pyramid.base:
+                # Few enough samples to draw them all, binned as requested
+                self.lod_level = 0
+                x, ts, sr, temp = (bin_mean(series[name][start:stop], bin_val) for name in self.PLOT_SERIES)
+            else:
+                # About one bucket per pixel column; Bin Size is the smallest bucket used
+                self.lod_level = pyramid.level_for(count, width, bin_val)
+                buckets = [self.lod[name].buckets(series[name], start, stop, self.lod_level) for name in self.PLOT_SERIES]
+                if bin_val > 1:
+                    x, ts, sr, temp = (b.means for b in buckets)
+                else:
+                    # Draw each bucket from its min to its max so single-sample spikes stay visible
+                    x = np.repeat(buckets[0].means, 2)
+                    ts, sr, temp = (np.column_stack((b.mins, b.maxs)).ravel() for b in buckets[1:])
 
             # Update each line’s data
             self.line1.set_data(x, ts)
             self.line2.set_data(x, sr)
             self.line3.set_data(x, temp)
 
-            # Auto-scale Y axes
-            def get_ylim(arr, padding=0.1):
-                if arr.size == 0 or np.isnan(arr).all():  # Handle empty or all-NaN arrays
-                    return (-0.1, 0.1)  # Default y-axis range
-                arr_min, arr_max = np.nanmin(arr), np.nanmax(arr)
-                if arr_min == arr_max:  # Prevent zero range
-                    return (arr_min - 0.1, arr_max + 0.1)
-                data_range = arr_max - arr_min
-                pad = padding * data_range  # padding as a percentage of data range
-                return (arr_min - pad, arr_max + pad)
-    
-            self.strainplt.set_ylim(*get_ylim(ts))
-            self.strainrateplt.set_ylim(*get_ylim(sr))
-            self.temperatureplt.set_ylim(*get_ylim(temp))
+            # Leave the limits alone while the user pans or zooms with the toolbar
+            if user_view: # toolbar mode is "" when no tool is active
+                return False
+
+            # Extremes of the samples in view come from the pyramids in O(log n); bin
+            # means are smoother than the samples, so those are scaled to what is drawn
+            if bin_val > 1:
+                extremes = [nan_extrema(arr) for arr in (ts, sr, temp)]
+            else:
+                size = pyramid.bucket_size(self.lod_level)
+                view_start = start // size * size # first drawn bucket may start before x_min
+                extremes = [self.lod[name].extrema(series[name], view_start, n) for name in self.PLOT_SERIES[1:]]
+
+            moved = self.update_xlim(x_min, float(x_full[-1]))
+            self.auto_xlim = self.strainplt.get_xlim()
+            for (ax, _), (data_min, data_max) in zip(self.axes_lines, extremes):
+                moved = self.update_ylim(ax, data_min, data_max) or moved
+            return moved
+        return False
+
+    def on_parameters(self, old: TestParameters, new: TestParameters):
+        """A new x-min or bin size puts the plot back to the view they set (from any thread)."""
+        if (new.xmin, new.bin_val) != (old.xmin, old.bin_val):
+            self.auto_xlim = None
+
+    def update_xlim(self, x_min: float, x_last: float) -> bool:
+        """Extend the shared x axis ahead of the data when it runs out; returns True if the limits changed."""
+        lo, hi = self.strainplt.get_xlim()
+        if lo == x_min and x_last <= hi and x_last - x_min >= self.LIMIT_FILL * (hi - lo):
+            return False
+        self.strainplt.set_xlim(x_min, x_last + self.X_HEADROOM * max(x_last - x_min, 1.0))
+        return True
+
+    def update_ylim(self, ax, data_min: float, data_max: float) -> bool:
+        """Autoscale a y axis when the data leaves its limits or fills too little of them; returns True if they changed.
+
+        data_min and data_max are NaN when there is no data in view.
+        """
+        def get_ylim(arr_min, arr_max, padding=0.1):
+            if math.isnan(arr_min):  # Handle empty or all-NaN data
+                return (-0.1, 0.1)  # Default y-axis range
+            if arr_min == arr_max:  # Prevent zero range
+                return (arr_min - 0.1, arr_max + 0.1)
+            data_range = arr_max - arr_min
+            pad = padding * data_range  # padding as a percentage of data range
+            return (arr_min - pad, arr_max + pad)
+
+        lo, hi = ax.get_ylim()
+        new_lo, new_hi = get_ylim(data_min, data_max)
+        if math.isnan(data_min):
+            inside = (lo, hi) == (new_lo, new_hi)
+        else:
+            inside = lo <= data_min and data_max <= hi
+        if inside and self.LIMIT_FILL * (hi - lo) <= new_hi - new_lo:
+            return False
+        ax.set_ylim(new_lo, new_hi)
+        return True
+
+    def update_frame(self):
+        """Timer callback: blit the lines over the cached background, or redraw everything if the limits moved."""
+        store = self.handler.store
+        if not self.handler.is_running or store is None or len(store) == 0:
+            return
+        if not self.visible:
+            self.skipped_frames += 1
+            self.skipped_metric.inc()
+            self.last_frame_key = None # draw as soon as the tab is shown again
+            return
+        # Skip the frame when no samples arrived and the view settings and limits are unchanged
+        params = self.handler.test.params
+        key = (store, len(store), params.xmin, params.bin_val, self.strainplt.get_xlim())
+        if key == self.last_frame_key:
+            self.skipped_frames += 1
+            self.skipped_metric.inc()
+            return
+        self.last_frame_key = key
+
+        start = time.perf_counter()
+        moved = self.animate(self.frames)
+        self.animate_metric.record(time.perf_counter() - start)
+        if moved or self.background is None:
+            self.fig.canvas.draw() # on_draw caches the new background and draws the lines
+            self.full_redraws += 1
+            self.redraw_metric.inc()
+        else:
+            self.blit()
+        self.frames += 1
+        self.last_frame_time = time.perf_counter() - start
+        self.total_frame_time += self.last_frame_time
+        self.frame_metric.record(self.last_frame_time)
+
+    def on_draw(self, event):
+        """After every full redraw (frame, resize or toolbar), cache the background without the lines."""
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for ax, line in self.axes_lines:
+            ax.draw_artist(line)
+
+    def blit(self):
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for ax, line in self.axes_lines:
+            ax.draw_artist(line)
+        canvas.blit(self.fig.bbox)
+
+    def frame_summary(self) -> str:
+        mean = self.total_frame_time / self.frames if self.frames else 0.0
+        return (f"plot: {self.frames} frames ({self.full_redraws} full redraws), frame time mean "
+                f"{1000 * mean:.1f} ms last {1000 * self.last_frame_time:.1f} ms, {self.skipped_frames} skipped")
 
 
 class TestControls(tk.Frame):
     """A widget for Test Controls."""
+    MAX_LOG_LINES = 1000 # oldest lines are dropped from the log beyond this
     def __init__(self, parent: tk.Widget, handler: "TestHandler"):
         super().__init__(parent)
         self.handler: TestHandler = handler 
@@ -249,23 +490,118 @@ class TestControls(tk.Frame):
         self.text_box.grid(row=5, column=0, sticky="ew")
 
         # row 5 col 1 --------------------------------------
+        self.diagnostics_btn = tk.Button(self)
+        self.diagnostics_btn.configure(text="Diagnostics", state="normal", command=self.show_diagnostics)
+        self.diagnostics_btn.grid(row=5, column=1, sticky="ew")
+        self.diagnostics = None
+
+        # row 5 col 2 --------------------------------------
         self.connect_btn = tk.Button(self)
         self.connect_btn.configure(text="Connect I/O", state="normal", command=self.handler.connect_IO)
         self.connect_btn.grid(row=5, column=2, sticky="ew")
 
+        # row 6 col 2 --------------------------------------
+        self.resume_btn = tk.Button(self)
+        self.resume_btn.configure(text="Resume Test...", state="disabled", command=self.handler.choose_resume)
+        self.resume_btn.grid(row=6, column=2, sticky="ew")
         
 
     def display(self, msg: str):
         self.log_text.configure(state="normal")
         self.log_text.insert("end", "".join((msg, "\n")))
+        # Keep the log bounded; the text always ends with an empty line after the last newline
+        lines = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if lines > self.MAX_LOG_LINES:
+            self.log_text.delete("1.0", f"{lines - self.MAX_LOG_LINES + 1}.0")
         self.log_text.configure(state="disabled")
         self.log_text.yview("end")
 
+    def show_diagnostics(self):
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
+        else:
+            self.diagnostics = DiagnosticsPanel(self)
+
+
+class DiagnosticsPanel(tk.Toplevel):
+    """Window listing the telemetry metrics (sample lateness, query latency, frame and save times)."""
+    REFRESH_INTERVAL = 1000 # ms between updates
+
+    def __init__(self, parent: tk.Widget):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.build()
+        self.refresh()
+
+    def build(self):
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.text = ScrolledText(self, background="white", height=30, width=120, state="disabled", wrap="none")
+        self.text.grid(row=0, column=0, columnspan=2, sticky="nsew")
+
+        self.export_btn = tk.Button(self, text="Export...", command=self.export)
+        self.export_btn.grid(row=1, column=1, sticky="e")
+
+    def refresh(self):
+        # Reading the metrics needs no lock, they may just be one update behind
+        self.text.configure(state="normal")
+        top = self.text.yview()[0]
+        self.text.delete("1.0", "end")
+        self.text.insert("end", "\n".join(REGISTRY.report()))
+        self.text.yview_moveto(top)
+        self.text.configure(state="disabled")
+        self.after(self.REFRESH_INTERVAL, self.refresh)
+
+    def export(self):
+        file_name = filedialog.asksaveasfilename(parent=self, defaultextension=".txt", initialfile="metrics.txt",
+                                                 filetypes=[("Text", "*.txt"), ("All files", "*.*")])
+        if file_name:
+            REGISTRY.export(file_name)
+
 
 class TestHandler:
-    def __init__(self, test_controls: TestControls = None, strainplot: StrainPlot = None, test_info_entry: TestInfoEntry = None, toolbar = None):
-        self.root: tk.Tk = strainApp.ROOT
+    # Per-sample columns, kept in the SampleStore and bound as attributes of the same name
+    SAMPLE_COLUMNS = [
+        ("timestamps", np.float64),
+        ("elapsed", np.float32),
+        ("displacement", np.float32),
+        ("strain", np.float32),
+        ("trueStrain", np.float32),
+        ("strainRate", np.float32),
+        ("temperature", np.float32),
+        ("lateness", np.float32), # seconds each sample ran after its deadline
+        ("displacement_time", np.float64), # elapsed time of each channel's reading
+        ("temperature_time", np.float64),
+        ("acq_latency", np.float32), # first command to last answer
+        ("displacement_voltage", np.float64), # raw AI2 volts, kept so the data can be recalibrated
+        ("thermocouple_voltage", np.float64), # raw thermocouple volts (DMM or AI1)
+    ]
+    # Store columns written to the data file, in writer.DATA_COLUMNS order
+    CSV_COLUMNS = ("timestamps", "elapsed", "displacement", "strain", "trueStrain", "strainRate", "temperature",
+                   "displacement_voltage", "thermocouple_voltage")
+
+    def __init__(self, test_controls: TestControls = None, strainplot: StrainPlot = None, test_info_entry: TestInfoEntry = None, toolbar = None,
+                 root=None, resource_manager=visa_resource_manager, clock=time, concurrent_reads=False, daq_scan=False,
+                 daq_address=DAQ_ADDRESS, voltmeter_address=VOLTMETER_ADDRESS, station=None, metrics_file=None,
+                 data_format="csv", strain_rate_filter="linear", strain_rate_window=10):
+        # root may be a windowless tk.Tcl() interpreter when running headless
+        self.root: tk.Tk = root if root is not None else strainApp.ROOT
         self.test = Test()
+        self.test.subscribe(self.on_parameters)
+
+        # Instrument backend: a factory returning a pyvisa-style ResourceManager,
+        # and a clock providing time()/sleep() (the time module, or a simulation.SimClock)
+        self.resource_manager = resource_manager
+        self.clock = clock
+        self.daq_address = daq_address
+        self.voltmeter_address = voltmeter_address
+
+        # Multi-station mode (see stations.py): the station's name, the scheduler shared
+        # by the stations on its bus and the group of all stations; None for a single test
+        self.station = station
+        self.bus: BusScheduler = None
+        self.group: StationGroup = None
 
         # Store instances
         self.test_controls = test_controls
@@ -280,435 +616,1114 @@ class TestHandler:
         self.views: List[tk.Widget] = []
         self.pool = ThreadPoolExecutor(max_workers=4)
         self.ani = None
-        self.last_save_time = time.time()
-        self.last_read_time = time.time()
-        self.last_check_time = time.time()
+        self.ui: UIQueue = None # set by the GUI, takes log lines and widget updates to the Tk thread
+        self.scheduler: Scheduler = None
+        self.sample_task = None
+        self.tasks = [] # this test's tasks on the scheduler
+        self.check_period = 3 # seconds between status/parameter checks
 
         self.firstStrain = 0
+        self.first_displacement_voltage = None # AI2 reading firstStrain was taken from
         self.testStarted = False
+        self.strain_rate_window = strain_rate_window # number of points in the strain rate fit
+        self.store_sync_interval = 30 # seconds between syncs of the sample store to disk
+        self.concurrent_reads = concurrent_reads # overlap the DAQ and voltmeter conversions each sample
+        self.daq_scan = daq_scan # read all DAQ channels in one scan instead of one AIn query each (see ChannelScan)
+        self.daq_channels = ("status", "displacement") # add "temperature" to read the thermocouple on AI1
+        self.last_status = None # status voltage from the latest sample scan (None without --scan)
+        self.last_status_time = None
+        self.control = collections.deque() # calls for the acquisition thread, see run_on_acquisition
+        self.temperature_out_of_range = 0 # readings beyond the thermocouple tables since the last save
+        self.failed_samples = 0 # samples lost to instruments not answering since the last save
+        self.adaptive_period: AdaptivePeriod = None # set by begin_test in adaptive mode
+        self.period = None # seconds between samples of the running test (self.test.params.freq once it is taken up)
+        self.sessions: SessionManager = None
+        self.metrics_file = metrics_file # telemetry written here at every save and at the end of the test
+        self.metrics_export = None # pending background export
+        self.data_format = data_format # "csv", or "binary" for a chunked test file (testfile.py)
+        self.strain_rate_filter = strain_rate_filter # a strain_rate.FILTERS name
+        self.analytics: CreepAnalytics = None # creep stage etc., fed off the acquisition thread at each check
+        self.analytics_summary = None # its latest results
+        self.analytics_run = None
+        self.analytics_done = 0 # samples fed to it
         
     def start_test(self):
-        # Read the text entries (except notes)
-        self.test.name = self.test_info_entry.name_ent.get()
-        self.test.material = self.test_info_entry.matr_ent.get()
-        self.test.freq = self.test_info_entry.freq_ent.get()
-        self.test.gauge_length = self.test_info_entry.gauge_length_ent.get()
-        self.test.xmin = self.test_info_entry.xmin_ent.get()
-        self.test.bin_val = self.test_info_entry.bin_ent.get()
-
-        # Try to convert frequency and gauge length into floats
-        try:
-            freq = float(self.test.freq)
-        except ValueError:
-            freq = 0
-        try:
-            gauge_length = float(self.test.gauge_length)
-        except ValueError:
-            gauge_length = 0
-        
-        # Require user to enter valid input before starting test
-        if (
-            (self.test.name and self.test.material)
-            and (freq > 0) and (gauge_length > 0)
-        ):
-            #check status signal
-            self.daq.write("VC3") # send 1 mA current output
-            status = float(self.daq.query("AI0")) # channel 0
-            print(status)
-            if (abs(status) <= 0.001):
-                self.test_controls.display("Please prepare machine for test.")
+        # The entries' edits are in self.test.params already; require all of them to be valid before starting test
+        if not self.test_info_entry.errors and self.parameters_valid():
+            if not self.begin_test():
+                self.display("Please prepare machine for test.")
                 return
-            
-            self.start_time = time.time()
-            self.testStarted = True
-            self.is_running = True
-            self.paused = False
-
-            # Disable the text boxes
-            self.test_info_entry.name_ent.config(state="disabled")
-            self.test_info_entry.matr_ent.config(state="disabled")
-            self.test_info_entry.gauge_length_ent.config(state="disabled")
 
-            # Enable editing of xmin and bin value
-            self.test_info_entry.xmin_ent.config(state="normal")
-            self.test_info_entry.bin_ent.config(state="normal")
-
-            # Disable the start button and enable the stop and pause buttons
-            if self.test_controls:
-                self.test_controls.start_btn.configure(state="disabled")
-                self.test_controls.stop_btn.configure(state="normal")
-                self.test_controls.pause_btn.configure(state="normal")
-
-            initial_capacity = 100
-            self.capacity = initial_capacity # initial capacity
-            self.idx = 0  # Current number of valid readings
-            
-            # Initialize arrays with NaN (to distinguish empty slots)
-            self.timestamps = np.full(initial_capacity, np.nan, dtype=np.float64)
-            self.elapsed = np.full(initial_capacity, np.nan, dtype=np.float32)
-            self.displacement = np.full(initial_capacity, np.nan, dtype=np.float32)
-            self.strain = np.full(initial_capacity, np.nan, dtype=np.float32)
-            self.trueStrain = np.full(initial_capacity, np.nan, dtype=np.float32)
-            self.strainRate = np.full(initial_capacity, np.nan, dtype=np.float32)
-            self.temperature = np.full(initial_capacity, np.nan, dtype=np.float32)
-
-            self.test.freq_log.append({"Period (s)": self.test.freq, "Timestamp (s)": 0})
-
-            self.test.data_file_name = f"{self.test.name}_data.csv"
-            self.test.info_file_name = f"{self.test.name}_info.csv"
-
-            # for first strain readings before test
-            displacementVoltage = float(self.daq.query("AI2")) # channel 2
-            print(f"Displacement Voltage for First Strain: {displacementVoltage}")
-            displacement = (0.04897 * displacementVoltage) + 0.53505
-            strain = displacement / float(self.test.gauge_length)
-            self.firstStrain = strain
-
-            self.test_controls.display("Test started.")
-            print("Started the test.")
+            self.show_started()
+            self.display("Test started.")
+            log.info("Started the test.")
             self.pool.submit(self.cont_test)
         else:
-            self.test_controls.display("Please enter valid input.")
+            self.display("Please enter valid input.")
+
+    def choose_resume(self):
+        """Ask for the data file of a test that stopped without finishing, and resume it."""
+        file_name = filedialog.askopenfilename(title="Resume Test", filetypes=[
+            ("Test data", f"*_data.csv *_data{testfile.EXTENSION}"), ("All files", "*.*")])
+        if not file_name or not self.resume_test(file_name):
+            return
+        self.show_started()
+        self.pool.submit(self.cont_test)
+
+    def show_started(self):
+        """Show the test's parameters in the entries and lock the ones a running test cannot change."""
+        if self.test_info_entry:
+            entries = self.test_info_entry
+            for entry in (entries.name_ent, entries.matr_ent, entries.freq_ent, entries.gauge_length_ent, entries.notes_ent,
+                          entries.xmin_ent, entries.bin_ent, entries.min_period_ent, entries.max_period_ent):
+                entry.config(state="normal")
+            entries.show()
+            entries.name_ent.config(state="disabled")
+            entries.matr_ent.config(state="disabled")
+            entries.gauge_length_ent.config(state="disabled")
+            entries.adaptive_chk.config(state="disabled")
+            entries.min_period_ent.config(state="disabled")
+            entries.max_period_ent.config(state="disabled")
+            if self.test.params.adaptive:
+                entries.freq_ent.config(state="disabled") # the period entry follows the adaptive period
+
+        # Disable the start buttons and enable the stop and pause buttons
+        if self.test_controls:
+            self.test_controls.start_btn.configure(state="disabled")
+            self.test_controls.resume_btn.configure(state="disabled")
+            self.test_controls.stop_btn.configure(state="normal")
+            self.test_controls.pause_btn.configure(state="normal")
+
+    def parameters_valid(self):
+        """True if self.test has a name, a material and a period range in order (the numbers were checked as they were entered)."""
+        try:
+            self.test.params.check()
+        except ParameterError as e:
+            self.display(str(e))
+            return False
+        if self.group and self.group.name_in_use(self):
+            self.display(f"Another station already ran a test named {self.test.params.name}.")
+            return False
+        existing = self.existing_files()
+        if existing:
+            self.display(f"{', '.join(existing)} already exist: resume that test, or choose another name.")
+            return False
+        return True
+
+    def existing_files(self):
+        """Files of an earlier test with this test's name, which a new test would overwrite or append to."""
+        name = self.test.params.name
+        extension = testfile.EXTENSION if self.data_format == "binary" else ".csv"
+        return [path for path in (f"{name}_data{extension}", f"{name}_samples") if os.path.exists(path)]
+
+    def edit_parameter(self, name: str, text: str):
+        """Publish an edit to a parameter's entry (on the Tk thread); returns why it was refused, or None."""
+        params = self.test.params
+        try:
+            edited = params.parse({name: text})
+            if edited != params:
+                self.check_view(edited)
+                self.test.update(**{name: text})
+        except ParameterError as e:
+            return str(e)
+        return None
+
+    def check_view(self, params: TestParameters):
+        """Refuse an x-min after the last sample, or a bin size of more samples than there are."""
+        if not self.testStarted or not self.idx:
+            return
+        if params.xmin != self.test.params.xmin and not params.xmin < self.elapsed[self.idx - 1]:
+            raise ParameterError("xmin", "x-min out of range.")
+        if params.bin_val != self.test.params.bin_val and not params.bin_val < self.idx:
+            raise ParameterError("bin_val", "Bin Size out of range.")
+
+    def on_parameters(self, old: TestParameters, new: TestParameters):
+        """A new period is taken up by the acquisition thread at its next check (called on the thread that changed it)."""
+        if new.freq != old.freq:
+            self.control.append(self.apply_period)
+
+    def begin_test(self):
+        """Check the status signal and set up the acquisition state for a new test.
+
+        Expects self.test to hold the parsed entries. Returns False if the machine is not ready.
+        """
+        reading = self.read_start_status()
+        if reading is None:
+            return False
+        
+        self.start_time = self.clock.time()
+        self.start_monotonic = self.clock.monotonic() # elapsed time is measured on the monotonic clock
+        self.idx = 0  # Current number of valid readings
+
+        # Samples go straight into memory-mapped column files next to the data file
+        name = self.test.params.name
+        self.store = SampleStore.create(f"{name}_samples", self.SAMPLE_COLUMNS)
+        extension = testfile.EXTENSION if self.data_format == "binary" else ".csv"
+        self.test.data_file_name = f"{name}_data{extension}"
+        self.test.info_file_name = f"{name}_info.csv"
+        self.test.checkpoint_file_name = f"{name}_checkpoint.json"
+        self.test.gap_log = []
+
+        # for first strain readings before test
+        displacementVoltage = reading.displacement
+        log.info("Displacement Voltage for First Strain: %s", displacementVoltage)
+        self.first_displacement_voltage = displacementVoltage
+        self.firstStrain = calibration.engineering_strain(calibration.displacement(displacementVoltage),
+                                                          self.test.params.gauge_length, 0.0)
+
+        self.prepare_acquisition()
+        self.test.freq_log.append({"Period (s)": self.test.params.text("freq"), "Timestamp (s)": 0})
+        self.save_to_csv() # info file and checkpoint, so the test can be resumed from the start
+        return True
+
+    def read_start_status(self):
+        """Check the status signal, and take the first strain reading in the same scan.
+
+        Returns the reading, or None if the machine is not ready.
+        """
+        start_scan = ChannelScan(self.daq, ("status", "displacement"), scan=self.daq_scan)
+        try:
+            reading = start_scan.read(self.clock, prefix="VC3") # VC3: send 1 mA current output
+        except SessionError as e:
+            log.error(e)
+            return None
+        status = reading.status
+        log.info("Status voltage: %s", status)
+        if (abs(status) <= 0.001):
+            return None
+        return reading
+
+    def prepare_acquisition(self):
+        """Set up the acquisition state around self.store, which already holds self.idx samples."""
+        self.testStarted = True
+        self.is_running = True
+        self.paused = False
+
+        self._bind_columns()
+        self.store_flush = None # pending background flush of the store
+        self.resident_from = 0 # rows before this were released from memory, see periodic_save
+        self.last_store_sync = time.monotonic()
+        self.strain_rate = strain_rate.FILTERS[self.strain_rate_filter](self.strain_rate_window)
+        # A resumed test's strain rate fit carries on from its latest samples
+        for i in range(max(self.idx - self.strain_rate_window, 0), self.idx):
+            self.strain_rate.update(self.elapsed[i], self.trueStrain[i])
+        self.bind_metrics()
+        # One AIn query per channel costs a turnaround each, so without a scan the status (AI0)
+        # is left to check_status, as it always was; a scan takes it in the same transaction
+        channels = self.daq_channels if self.daq_scan else tuple(c for c in self.daq_channels if c != "status")
+        self.sample_scan = ChannelScan(self.daq, channels, scan=self.daq_scan)
+        self.status_scan = ChannelScan(self.daq, ("status",), scan=self.daq_scan)
+        self.last_status = None
+
+        params = self.test.params
+        self.adaptive_period = None
+        self.period = params.freq # the period the samples are taken at
+        if params.adaptive:
+            self.adaptive_period = AdaptivePeriod(params.min_period, params.max_period)
+            # Start on a rung of the period ladder inside the range
+            self.period = self.adaptive_period.ladder(params.freq)
+            self.test.update(freq=self.period)
+        self.period_changed_idx = self.idx # sample index of the latest period change
+
+        # A resumed test's analytics catch up on its samples at the first check
+        self.analytics = CreepAnalytics()
+        self.analytics_summary = None
+        self.analytics_run = None
+        self.analytics_done = 0
+
+        self.writer = DataWriter(self.test.data_file_name, self.test.info_file_name, labels=self.metric_labels(),
+                                 checkpoint_file_name=self.test.checkpoint_file_name)
+
+    def resume_test(self, data_file_name: str):
+        """Carry on with a test that stopped without finishing (a crash or power cut), from its files.
+
+        Elapsed time counts on from the test's start, and the time without
+        samples is added to the resume log. Returns False if the test cannot
+        be resumed or the machine is not ready. See recovery.py.
+        """
+        began = time.perf_counter()
+        try:
+            files = recovery.TestFiles(data_file_name)
+            state, last_row = recovery.load_state(files)
+            params = TestParameters().parse(state["test"]) # a ParameterError is a ValueError
+        except (recovery.RecoveryError, OSError, ValueError, KeyError) as e:
+            self.display(f"Cannot resume from {data_file_name}: {e}")
+            return False
+        reading = self.read_start_status()
+        if reading is None:
+            self.display("Please prepare machine for test.")
+            return False
+
+        self.test.update(**params.texts())
+        self.test.freq_log = state["freq_log"]
+        self.test.gap_log = state["gap_log"]
+        self.test.data_file_name = files.data
+        self.test.info_file_name = files.info
+        self.test.checkpoint_file_name = files.checkpoint
+        self.start_time = state["start_time"]
+        self.first_displacement_voltage = state["first_displacement_voltage"]
+        self.firstStrain = state["first_strain"]
+        if self.group and self.group.name_in_use(self):
+            self.display(f"Another station already ran a test named {params.name}.")
+            return False
+
+        # Rows loaded from the data file have no channel times of their own, they take the sample's
+        try:
+            self.store, self.test.last_written_index = recovery.resume_samples(
+                files, self.SAMPLE_COLUMNS, self.CSV_COLUMNS, last_row,
+                same_as={"displacement_time": "elapsed", "temperature_time": "elapsed"})
+        except (OSError, ValueError, KeyError) as e:
+            self.display(f"Cannot resume from {data_file_name}: {e}")
+            return False
+        self.idx = len(self.store)
+
+        now = self.clock.time()
+        self.start_monotonic = self.clock.monotonic() - (now - self.start_time)
+        last = float(self.store.view("elapsed", self.idx - 1)[0]) if self.idx else 0.0
+        gap = now - self.start_time - last
+        self.test.gap_log.append({"Gap (s)": round(gap, 3), "Timestamp (s)": last})
+
+        self.prepare_acquisition()
+        self.save_to_csv() # rows the store had beyond the data file, and the resume log
+        self.display(f"Test resumed from sample {self.idx} after {gap:.1f}s without samples "
+                     f"(loaded in {time.perf_counter() - began:.2f}s).")
+        log.info("Resumed %s: %d samples, %d in the data file, gap %.3f s at %.3f s",
+                 params.name, self.idx, self.test.last_written_index, gap, last)
+        return True
 
     def cont_test(self):
         self.is_running = True
         self.request_stop = False
-        self.take_readings()
+        if self.bus:
+            self.bus.start(self) # the bus thread runs the tasks alongside the other stations'
+        else:
+            self.take_readings()
 
     def stop_test(self):
+        """Ask the acquisition thread to stop; it closes the instruments after its last save (finish_readings)."""
         self.request_stop = True
-        self.test_controls.pause_btn.configure(state="disabled")
-        self.test_controls.stop_btn.configure(state="disabled")
-        self.ani.event_source.stop()
-
-        print("Stopped the test.")
-        self.test_controls.display("Test stopped.")
-        self.test_info_entry.freq_ent.config(state="disabled")
-        self.test_info_entry.gauge_length_ent.config(state="disabled")
-        self.test_info_entry.notes_ent.config(state="disabled")
-        self.test_info_entry.xmin_ent.config(state="disabled")
-        self.test_info_entry.bin_ent.config(state="disabled")
+        # May run on the acquisition thread (status dropped), so widgets are updated on the Tk thread
+        self.on_ui(self.show_stopped)
+
+        log.info("Stopped the test.")
+        self.display("Test stopped.")
 
+    def close_instruments(self):
+        """Close the DAQ and voltmeter once the acquisition thread is done with them."""
         self.daq.close()
-        print("DAQ closed")
+        log.info("DAQ closed")
         self.voltmeter.close()
-        print("Voltmeter closed")
+        log.info("Voltmeter closed")
+
+    def show_stopped(self):
+        """Disable the controls and stop the plot once the test has stopped."""
+        if self.test_controls:
+            self.test_controls.pause_btn.configure(state="disabled")
+            self.test_controls.stop_btn.configure(state="disabled")
+        if self.ani:
+            self.ani.stop()
+        if self.test_info_entry:
+            self.test_info_entry.freq_ent.config(state="disabled")
+            self.test_info_entry.gauge_length_ent.config(state="disabled")
+            self.test_info_entry.notes_ent.config(state="disabled")
+            self.test_info_entry.xmin_ent.config(state="disabled")
+            self.test_info_entry.bin_ent.config(state="disabled")
 
     def toggle_pause(self):
         """Toggle the pause/resume state."""
         self.paused = not self.paused
         if self.paused:
-            print("Paused the test.")
-            self.test_controls.display("Test paused.")
+            log.info("Paused the test.")
+            self.display("Test paused.")
             self.test_controls.pause_btn.configure(text="Resume")
-            self.ani.event_source.stop()
+            self.ani.stop()
 
         else:
-            print("Resumed the test.")
-            self.test_controls.display("Test resumed.")
+            log.info("Resumed the test.")
+            self.display("Test resumed.")
             self.test_controls.pause_btn.configure(text="Pause")
-            self.ani.event_source.start()
+            self.ani.start()
 
     def connect_IO(self):
-            try:
-                self.rm = pyvisa.ResourceManager()
-            except Exception as e:
-                print(f"Error creating VISA Resource Manager: {e}")
-                return
-            
-            try:
-                resources = self.rm.list_resources()
-                print(resources)
-            except Exception as e:
-                print(f"Error listing available resources: {e}")
-                return
+        if not self.open_instruments():
+            return
 
-            # Open DAQ
-            try:
-                self.daq = self.rm.open_resource('GPIB0::9::INSTR')
-                print("DAQ open")
-            except Exception as e:
-                print(f"Failed to open DAQ instrument: {e}")
-                return
+        self.test_controls.connect_btn.configure(state="disabled")
+        self.test_controls.start_btn.configure(state="normal")
+        self.test_controls.resume_btn.configure(state="normal")
 
-            # Open Voltmeter
-            try:
-                self.voltmeter = self.rm.open_resource('GPIB0::8::INSTR')
-                print("Voltmeter open")
-            except Exception as e:
-                print(f"Failed to open voltmeter: {e}")
-                return
-            
-            self.test_controls.connect_btn.configure(state="disabled")
-            self.test_controls.start_btn.configure(state="normal")
+        self.pool.submit(self.wait_for_start)
+
+    def open_instruments(self):
+        """Open the DAQ and voltmeter through the configured backend. Returns True on success."""
+        # Sessions and the resource listing are shared with every test on the same backend
+        self.sessions = SessionManager.shared(self.resource_manager, clock=self.clock)
+        try:
+            resources = self.sessions.resources()
+            log.info("Resources: %s", resources)
+        except Exception as e:
+            log.error("Error listing available resources: %s", e)
+            return False
+
+        # Open DAQ
+        try:
+            self.daq = self.sessions.open(self.daq_address)
+            log.info("DAQ open")
+        except Exception as e:
+            log.error("Failed to open DAQ instrument: %s", e)
+            return False
 
-            self.pool.submit(self.wait_for_start)
+        # Open Voltmeter
+        try:
+            self.voltmeter = self.sessions.open(self.voltmeter_address)
+            log.info("Voltmeter open")
+        except Exception as e:
+            log.error("Failed to open voltmeter: %s", e)
+            return False
+
+        return True
 
     def wait_for_start(self):
-        while not self.testStarted:
-            current_time = time.time()
-            if (current_time - self.last_read_time) >= 3:
-                '''status = float(self.daq.query("AI0")) # channel 0
-                print(f"Status Voltage: {status}")''' #causing error when starting test
-                displacementVoltage = float(self.daq.query("AI2")) # channel 2
-                print(f"Displacement Voltage: {displacementVoltage}")
-                temperatureVoltage = 1000 * float(self.voltmeter.query("?")) # channel 1
-                print(f"Temperature Voltage: {temperatureVoltage}")
-                self.last_read_time = current_time
-        self.last_read_time = self.last_read_time - 1000 # to ensure a reading is taken once started
-
-    def _resize_arrays(self, new_capacity):
-        """Double array size while preserving existing data (amortized O(1) time)."""
-        def resize(arr):
-            new_arr = np.full(new_capacity, np.nan, dtype=arr.dtype)
-            new_arr[:self.idx] = arr[:self.idx]
-            return new_arr
-        
-        self.timestamps = resize(self.timestamps)
-        self.elapsed = resize(self.elapsed)
-        self.displacement = resize(self.displacement)
-        self.strain = resize(self.strain)
-        self.trueStrain = resize(self.trueStrain)
-        self.strainRate = resize(self.strainRate)
-        self.temperature = resize(self.temperature)
-        self.capacity = new_capacity
+        """Show the instrument readings every 3 s until the test is started."""
+        # status is left out (reading AI0 here was causing an error when starting the test)
+        channels = [name for name in self.daq_channels if name != "status"]
+        preview_scan = ChannelScan(self.daq, channels, scan=self.daq_scan)
+
+        def preview(task):
+            if self.testStarted:
+                return False
+            try:
+                reading = preview_scan.read(self.clock)
+                log.info("Displacement Voltage: %s", reading.displacement)
+                if reading.temperature is not None:
+                    temperatureVoltage = 1000 * reading.temperature # channel 1
+                else:
+                    temperatureVoltage = 1000 * float(self.voltmeter.query("?"))
+                log.info("Temperature Voltage: %s", temperatureVoltage)
+            except SessionError as e:
+                log.warning(e)
+
+        if self.bus:
+            # Previews take turns on the bus with the samples of the running stations
+            self.bus.call(lambda scheduler: scheduler.add("preview", 3, preview, delay=3, group=preview))
+            return
+        scheduler = Scheduler(self.clock)
+        scheduler.add("preview", 3, preview, delay=3)
+        scheduler.run(should_stop=lambda: self.testStarted)
+
+    def _bind_columns(self):
+        """Point the column attributes (self.elapsed etc.) at the store's current maps."""
+        for name, _ in self.SAMPLE_COLUMNS:
+            setattr(self, name, self.store.array(name))
+        self.capacity = self.store.capacity
+
+    def _grow_store(self):
+        """Add a chunk of rows to the store (no existing samples are copied)."""
+        self.store.grow()
+        self._bind_columns()
+        self.grow_metric.inc()
+        self.capacity_metric.set(self.capacity)
+
+    def metric_labels(self):
+        """Labels telling this station's metrics from the other stations' (none for a single test)."""
+        return {"station": self.station} if self.station else {}
+
+    def bind_metrics(self):
+        """Look up this test's metrics in the telemetry registry (see telemetry.py)."""
+        labels = self.metric_labels()
+        self.lateness_metric = REGISTRY.histogram("sample_lateness_seconds", "Sample taken after its deadline", **labels)
+        self.samples_metric = REGISTRY.counter("samples_total", "Samples stored", **labels)
+        self.failed_metric = REGISTRY.counter("samples_failed_total", "Sample slots lost to instruments not answering", **labels)
+        self.save_metric = REGISTRY.histogram("save_to_csv_seconds", "Time save_to_csv takes on the acquisition thread", **labels)
+        self.grow_metric = REGISTRY.counter("store_grows_total", "Times the sample store was resized", **labels)
+        self.capacity_metric = REGISTRY.gauge("store_capacity_rows", "Rows the sample store holds before it grows", **labels)
+        self.capacity_metric.set(self.capacity)
 
     def take_readings(self):
-        while self.is_running and not self.request_stop:
-            current_time = time.time()
-            if current_time - self.last_read_time >= float(self.test.freq): # Data acquisition period
-                if self.idx >= self.capacity:
-                    self._resize_arrays(2 * self.capacity)
-                    print("Doubled size of arrays")
-                
-                # Take the readings
-                self.timestamps[self.idx] = current_time
-                self.elapsed[self.idx] = self.get_time(current_time)
-                self.displacement[self.idx] = self.get_displacement()
-                self.strain[self.idx] = self.get_strain(self.displacement[self.idx])
-                self.trueStrain[self.idx] = self.get_true_strain(self.strain[self.idx])
-                if self.idx < 1:
-                    self.strainRate[self.idx] = 0
-                else:
-                    # Calculate the window of data points to use
-                    start_idx = max(0, self.idx - 9)
-                    t_window = self.elapsed[start_idx:self.idx + 1]
-                    s_window = self.trueStrain[start_idx:self.idx + 1]
-
-                    if len(t_window) > 1:
-                        # If more than 1 point, fit a line to the data and compute strain rate (slope)
-                        slope, _ = np.polyfit(t_window, s_window, 1)
-                        self.strainRate[self.idx] = slope
-                    else:
-                        # If only 1 point, strain rate is undefined, set to 0 or any default value
-                        self.strainRate[self.idx] = 0
-                self.temperature[self.idx] = self.get_temperature()
-                self.idx += 1
-
-                self.last_read_time = current_time
-
-            if current_time - self.last_check_time >= 3:
-                # CHECK FOR STATUS SIGNAL
-                status = float(self.daq.query("AI0")) # channel 0
-                if (abs(status) <= 0.001):
-                    self.test_controls.display("Test over")
-                    self.save_to_csv() # update file up to end of test
-                    self.stop_test()
-                    return
-                
-                # CHECK FOR FREQUENCY/PERIOD
-                temp = self.test_info_entry.freq_ent.get()
-                # Try to convert frequency into float
-                try:
-                    freq = float(temp)
-                    if freq != float(self.test.freq):
-                        if (freq > 0):
-                            self.test.freq = freq
-                            self.test.freq_log.append({"Period (s)": self.test.freq, "Timestamp (s)": self.elapsed[self.idx - 1]})
-                            self.test_controls.display(f"Period changed to {self.test.freq}s.")
-                        else:
-                            self.test_controls.display("Period must be a positive number.")
-                except ValueError:
-                    self.test_controls.display("Please enter valid period.")
-
-                # CHECK FOR X-MIN
-                temp = self.test_info_entry.xmin_ent.get()
-                # Try to convert xmin into float
-                try:
-                    xmin = float(temp)
-                    if xmin != float(self.test.xmin):
-                        if (xmin >= 0 and xmin < self.elapsed[self.idx - 1]):
-                            self.test.xmin = temp
-                            self.test_controls.display(f"x-min changed to {xmin}s.")
-                        else:
-                            self.test_controls.display("x-min out of range.")
-                except ValueError:
-                    self.test_controls.display("Please enter valid x-min.")
-
-                # CHECK FOR BIN_VAL
-                temp = self.test_info_entry.bin_ent.get()
-                # Try to convert bin value into int
-                try:
-                    bin_val = int(temp)
-                    if bin_val != int(self.test.bin_val):
-                        if (bin_val >= 1 and bin_val < self.idx):
-                            self.test.bin_val = temp
-                            self.test_controls.display(f"Bin Value changed to {bin_val}.")
-                        else:
-                            self.test_controls.display("Bin Value out of range.")
-                except ValueError:
-                    self.test_controls.display("Please enter valid Bin Value.")
-
-                self.last_check_time = current_time
-
-            if current_time - self.last_save_time >= max(5, float(self.test.freq)):
-                # Print saved data to log (only elapsed time, true strain, true strain rate, and temperature)
-                self.test_controls.display(f"Elapsed Time (s): {self.elapsed[self.idx - 1]:.2f}\nTrue Strain: {self.trueStrain[self.idx - 1]:.2f}\nTrue Strain Rate: {self.strainRate[self.idx - 1]:.2f}\nTemperature (C): {self.temperature[self.idx - 1]:.2f}")
-                self.test_controls.display("="*44)
-
-                # Save data to csv file
-                self.save_to_csv()
-                # Update last save time
-                self.last_save_time = current_time
+        """Run sampling, the status/parameter check and saving as separately scheduled tasks."""
+        self.add_tasks(Scheduler(self.clock))
+        try:
+            self.scheduler.run(should_stop=lambda: not self.is_running or self.request_stop)
+        except Exception:
+            # A task raised (see Scheduler.add): stop as BusScheduler.supervise does for a station
+            log.exception("Acquisition failed")
+            self.display("Acquisition failed, test stopped.")
+            self.stop_test()
+        finally:
+            self.finish_readings()
+
+    def add_tasks(self, scheduler: Scheduler, delay: float = 0.0, group=None):
+        """Schedule the sample, check and save tasks on a scheduler, all shifted by `delay` seconds."""
+        period = self.period
+        self.scheduler = scheduler
+        self.sample_task = scheduler.add("sample", period, self.read_sample, delay=delay, group=group)
+        self.check_task = scheduler.add("check", self.check_period, self.check_status, delay=delay + self.check_period, group=group)
+        self.save_task = scheduler.add("save", max(5, period), self.periodic_save, delay=delay + max(5, period), group=group)
+        self.tasks = [self.sample_task, self.check_task, self.save_task]
+        self.fit_timeouts(period)
+
+    def fit_timeouts(self, period: float):
+        """A stuck instrument must not cost more than its sample slot, see Session.fit_timeout."""
+        for session in (self.daq, self.voltmeter):
+            session.fit_timeout(period)
+
+    def finish_readings(self):
+        """Save the samples since the last periodic save, wait for the writer to finish and close the instruments."""
+        try:
+            self.finish_analytics()
+            self.save_to_csv()
+            self.writer.close()
+            self.store.flush()
+
+            prefix = f"{self.station}: " if self.station else ""
+            for task in self.tasks:
+                log.info("%s%s", prefix, task.summary())
+            if self.bus:
+                log.info(self.bus.station_timing(self))
+            for line in self.sessions.summary((self.daq_address, self.voltmeter_address)):
+                log.info(line)
+            if self.strainplot:
+                log.info(self.strainplot.frame_summary())
+            if self.metrics_file:
+                REGISTRY.export(self.metrics_file)
+        finally:
+            self.close_instruments()
+
+    def read_sample(self, task):
+        """Take one reading. Runs on the sample task at its deadline."""
+        if self.idx >= self.capacity:
+            self._grow_store()
+            log.info("Grew sample store to %d rows", self.capacity)
+        
+        # Take the readings
+        try:
+            reading, voltmeter = self.read_channels()
+        except SessionError as e:
+            # Retries ran out: this slot has no sample, the next one is still taken on time
+            self.failed_samples += 1
+            self.failed_metric.inc()
+            log.warning("Sample skipped: %s", e)
+            return
+        self.last_status = reading.status
+        self.last_status_time = reading.received
+
+        # Each channel is taken to be measured halfway through its query, and the
+        # sample is stored at the instant halfway between the two channels
+        disp_sent, disp_recv = reading.window("displacement")
+        disp_time = (disp_sent + disp_recv) / 2 - self.start_monotonic
+        if voltmeter:
+            temp_resp, temp_sent, temp_recv = voltmeter
+            thermocoupleVoltage = float(temp_resp)
+        else:
+            # Thermocouple was read on AI1, in the same scan or with its own query
+            temp_sent, temp_recv = reading.window("temperature")
+            thermocoupleVoltage = reading.temperature
+        temperatureVoltage = 1000 * thermocoupleVoltage # mV
+        temp_time = (temp_sent + temp_recv) / 2 - self.start_monotonic
+        elapsed = (disp_time + temp_time) / 2
+
+        self.timestamps[self.idx] = self.start_time + elapsed
+        self.elapsed[self.idx] = elapsed
+        self.lateness[self.idx] = task.last_lateness
+        self.displacement_time[self.idx] = disp_time
+        self.temperature_time[self.idx] = temp_time
+        self.acq_latency[self.idx] = max(reading.received, temp_recv) - min(reading.sent, temp_sent)
+        self.displacement_voltage[self.idx] = reading.displacement
+        self.thermocouple_voltage[self.idx] = thermocoupleVoltage
+        self.displacement[self.idx] = self.convert_displacement(reading.displacement)
+        self.strain[self.idx] = self.get_strain(self.displacement[self.idx])
+        self.trueStrain[self.idx] = self.get_true_strain(self.strain[self.idx])
+        # Slope of a line (or Savitzky-Golay quadratic) fit to the last strain_rate_window points (0 until there are two)
+        self.strainRate[self.idx] = self.strain_rate.update(elapsed, self.trueStrain[self.idx])
+        self.temperature[self.idx] = self.convert_temperature(temperatureVoltage)
+        self.idx += 1
+        self.store.commit(self.idx)
+        self.samples_metric.inc()
+        self.lateness_metric.record(task.last_lateness)
+
+    def read_channels(self):
+        """Scan the DAQ channels and read the voltmeter for one sample.
+
+        Returns the DAQReading and the voltmeter's (response, sent, received), or None
+        when the thermocouple is scanned on AI1. Times are on the monotonic clock.
+        With concurrent_reads the DAQ command (the scan, or AI2 without --scan) and the voltmeter
+        command go out before either answer is read.
+        """
+        scan = self.sample_scan
+        if "temperature" in scan.channels:
+            return scan.read(self.clock), None
+        if self.concurrent_reads and scan.single:
+            (response, sent, received), voltmeter = overlapped_query(
+                [(self.daq, scan.command), (self.voltmeter, "?")], self.clock)
+            return scan.parse(response, sent, received), voltmeter
+        return scan.read(self.clock), timed_query(self.voltmeter, "?", self.clock)
+
+    def check_status(self, task):
+        """End the test when the status signal drops, otherwise pick up parameter edits."""
+        # CHECK FOR STATUS SIGNAL (from the latest sample scan if it is recent enough)
+        if self.last_status is not None and self.clock.monotonic() - self.last_status_time < self.check_period:
+            status = self.last_status
+        else:
+            try:
+                status = self.status_scan.read(self.clock).status
+            except SessionError as e:
+                log.warning("Status check skipped: %s", e)
+                return
+        if (abs(status) <= 0.001):
+            self.display("Test over")
+            self.save_to_csv() # update file up to end of test
+            self.stop_test()
+            return False
+
+        # Changes requested from other threads (e.g. a new period entered in the GUI or the acquisition service)
+        while self.control:
+            self.control.popleft()()
+
+        if self.adaptive_period:
+            self.adapt_period()
+        self.update_analytics()
+
+    def adapt_period(self):
+        """Let the period follow the creep stage, within the operator's range (see adaptive.py)."""
+        n = AdaptivePeriod.FIT_SAMPLES
+        if self.idx < n:
+            return
+        period = self.adaptive_period.next_period(self.period, self.elapsed[self.idx - n:self.idx],
+                                                  self.trueStrain[self.idx - n:self.idx], self.idx - self.period_changed_idx)
+        if period is None:
+            return
+        self.change_period(period)
+        self.display(f"Period changed to {period:g}s ({self.adaptive_period.reason}).")
+
+    def update_analytics(self):
+        """Hand the samples since the last check to the analytics on the pool, unless it is still busy."""
+        if self.analytics_run is not None:
+            if not self.analytics_run.done():
+                return
+            error = self.analytics_run.exception()
+            if error is not None:
+                # A diagnostic: the test carries on without that block of samples in the analytics
+                log.error("Creep analytics failed", exc_info=error)
+            self.analytics_run = None
+        if self.idx > self.analytics_done:
+            self.analytics_run = self.pool.submit(self.run_analytics, self.analytics_done, self.idx)
+            self.analytics_done = self.idx
+
+    def run_analytics(self, start: int, stop: int):
+        """Feed committed samples [start:stop] to the analytics (they are never modified again)."""
+        self.analytics.update(self.store.view("elapsed", start, stop), self.store.view("trueStrain", start, stop))
+        self.analytics_summary = self.analytics.summary()
+        self.on_ui(self.show_analytics)
+
+    def finish_analytics(self):
+        """Bring the analytics up to the last sample for the final info file; a failure is only logged."""
+        try:
+            if self.analytics_run is not None:
+                self.analytics_run.result()
+            self.run_analytics(self.analytics_done, self.idx)
+        except Exception:
+            log.exception("Creep analytics failed")
+        self.analytics_run = None
+        self.analytics_done = self.idx
+
+    def show_analytics(self):
+        if self.test_info_entry:
+            lines = describe(self.analytics_summary)
+            self.test_info_entry.analytics_lbl.configure(text="\n".join(f"{key}: {value}" for key, value in lines.items()))
+
+    def periodic_save(self, task):
+        if self.idx == 0:
+            return
+        # Print saved data to log (only elapsed time, true strain, true strain rate, and temperature)
+        self.display(f"Elapsed Time (s): {self.elapsed[self.idx - 1]:.2f}\nTrue Strain: {self.trueStrain[self.idx - 1]:.2f}\nTrue Strain Rate: {self.strainRate[self.idx - 1]:.2f}\nTemperature (C): {self.temperature[self.idx - 1]:.2f}")
+        self.display("="*44)
+        if self.temperature_out_of_range:
+            self.display(f"WARNING: {self.temperature_out_of_range} temperature voltages out of range since the last save")
+            self.temperature_out_of_range = 0
+        if self.failed_samples:
+            self.display(f"WARNING: {self.failed_samples} samples skipped since the last save, an instrument did not answer")
+            self.failed_samples = 0
+
+        # Save data to csv file
+        self.save_to_csv()
+        if self.writer.error is not None:
+            # A block of rows failed to reach the data file (disk full, ...): stop rather than acquire on without saving
+            self.display(f"Test stopped, the data file could not be written: {self.writer.error}")
+            self.stop_test()
+            return False
+        # Older rows live on in the store's files; only the newest stay in memory
+        cold = self.idx - self.store.HOT_ROWS
+        if cold > self.resident_from:
+            self.store.release(self.resident_from, cold)
+            self.resident_from = cold
+
+        # Push the sample store's pages to disk off the acquisition thread, at most every
+        # store_sync_interval wall-clock seconds (pages being written back stall writes to them)
+        if time.monotonic() - self.last_store_sync >= self.store_sync_interval:
+            if self.store_flush is None or self.store_flush.done():
+                self.store_flush = self.pool.submit(self.store.flush)
+                self.last_store_sync = time.monotonic()
+
+        if self.metrics_file and (self.metrics_export is None or self.metrics_export.done()):
+            self.metrics_export = self.pool.submit(REGISTRY.export, self.metrics_file)
+
+    def apply_period(self):
+        """Sample at the period in the parameters if it changed (on the acquisition thread, see on_parameters)."""
+        freq = self.test.params.freq
+        if freq != self.period:
+            self.change_period(freq)
+            self.display(f"Period changed to {freq:g}s.")
+
+    def change_period(self, freq: float):
+        """Sample every `freq` seconds from the next sample on, and log the change."""
+        self.period = freq
+        self.test.update(freq=freq)
+        self.test.freq_log.append({"Period (s)": self.test.params.text("freq"), "Timestamp (s)": self.elapsed[self.idx - 1]})
+        self.period_changed_idx = self.idx
+        if self.scheduler:
+            # Next sample is one new period after the last deadline
+            self.scheduler.set_period(self.sample_task, freq)
+            self.scheduler.set_period(self.save_task, max(5, freq))
+            self.fit_timeouts(freq)
+
+    def run_on_acquisition(self, fn):
+        """Run fn on the acquisition thread at its next check (now if no test is running)."""
+        if self.scheduler and not self.scheduler.stopped and self.is_running and not self.request_stop:
+            self.control.append(fn)
+        else:
+            fn()
 
     def save_to_csv(self):
+        """Hand new samples and the info file to the background writer (does not touch the disk)."""
+        start = time.perf_counter()
         # Get current data index and last saved index
         current_idx = self.idx
         start_idx = self.test.last_written_index
         
         # Only proceed if there's new data
         if start_idx < current_idx:
-            # Extract new data slices directly from numpy arrays
-            new_timestamps = self.timestamps[start_idx:current_idx]
-            new_elapsed = self.elapsed[start_idx:current_idx]
-            new_displacement = self.displacement[start_idx:current_idx]
-            new_strain = self.strain[start_idx:current_idx]
-            new_true_strain = self.trueStrain[start_idx:current_idx]
-            new_strain_rate = self.strainRate[start_idx:current_idx]
-            new_temp = self.temperature[start_idx:current_idx]
-
-            fieldnames = ['Epoch Time (s)', 'Elapsed Time (s)', 'Displacement (in)', 'Engineering Strain', 'True Strain', 
-                        'True Strain Rate (1/s)', 'Temperature (C)']
-            
-            with open(self.test.data_file_name, mode='a', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                
-                # Write header only for empty files
-                if file.tell() == 0:
-                    writer.writeheader()
-
-                # Write all new entries
-                for i in range(len(new_elapsed)):
-                    writer.writerow({
-                        'Epoch Time (s)': new_timestamps[i],  
-                        'Elapsed Time (s)': new_elapsed[i],
-                        'Displacement (in)': new_displacement[i],
-                        'Engineering Strain': new_strain[i],
-                        'True Strain': new_true_strain[i],
-                        'True Strain Rate (1/s)': new_strain_rate[i],
-                        'Temperature (C)': new_temp[i]
-                    })
+            # Committed rows are never modified again, so the writer gets zero-copy views
+            self.writer.write_rows([
+                self.store.view(name, start_idx, current_idx)
+                for name in self.CSV_COLUMNS
+            ])
             self.test.last_written_index = current_idx
 
-        self.test.notes = self.test_info_entry.notes_ent.get()
-        with open(self.test.info_file_name, mode='w', newline='') as file:
-            file.write("="*50 + "\n")
-            file.write(f"Name: {self.test.name}\n")
-            file.write(f"Material: {self.test.material}\n")
-            file.write(f"Gauge Length (in): {self.test.gauge_length}\n")
-            file.write(f"Notes: {self.test.notes}\n")
-            for entry in self.test.freq_log:
-                file.write(f"Period Log: {entry['Period (s)']} at {entry['Timestamp (s)']}\n")
-            file.write("="*50 + "\n")
-
-    # -200°C to 0°C
-    NEGATIVE_COEFFICIENTS = [
-        0.000000e+00,   # c0
-        2.5173462e+01,  # c1
-        -1.1662878e+00, # c2
-        -1.0833638e+00, # c3
-        -8.9773540e-01, # c4
-        -3.7342377e-01, # c5
-        -8.6632643e-02, # c6
-        -1.0450598e-02, # c7
-        -5.1920577e-04  # c8
-    ]
+        self.writer.write_info(self.info_text())
+        self.writer.write_checkpoint(recovery.format_checkpoint(self.checkpoint_state()))
+        self.save_metric.record(time.perf_counter() - start)
+
+    def checkpoint_state(self):
+        """What a resumed test needs that the data file does not hold, see recovery.py."""
+        return {
+            "test": self.test.params.texts(),
+            "start_time": self.start_time,
+            "first_displacement_voltage": self.first_displacement_voltage,
+            "first_strain": self.firstStrain,
+            "freq_log": self.test.freq_log,
+            "gap_log": self.test.gap_log,
+        }
+
+    def info_text(self):
+        params = self.test.params
+        lines = ["="*50]
+        lines.append(f"Name: {params.name}")
+        lines.append(f"Material: {params.material}")
+        lines.append(f"Gauge Length (in): {params.text('gauge_length')}")
+        lines.append(f"Displacement Calibration (in/V, in): {calibration.DISPLACEMENT_SLOPE}, {calibration.DISPLACEMENT_OFFSET}")
+        lines.append(f"First Displacement Voltage (V): {self.first_displacement_voltage}")
+        lines.append(f"Notes: {params.notes}")
+        if params.adaptive:
+            lines.append(f"Adaptive Period Range (s): {params.text('min_period')} to {params.text('max_period')}")
+        for entry in self.test.freq_log:
+            lines.append(f"Period Log: {entry['Period (s)']} at {entry['Timestamp (s)']}")
+        for entry in self.test.gap_log:
+            lines.append(f"Resume Gap: {entry['Gap (s)']} s at {entry['Timestamp (s)']}")
+        lines.append(f"Strain Rate Fit: {self.strain_rate_filter}, {self.strain_rate_window} samples")
+        if self.analytics_summary:
+            lines.extend(f"{key}: {value}" for key, value in describe(self.analytics_summary).items())
+        lines.append("="*50)
+        return "\n".join(lines) + "\n"
 
-    # 0°C to 500°C
-    POSITIVE_COEFFICIENTS = [
-        0.0000000e+00,   # c0
-        2.508355e+01,    # c1
-        7.860106e-02,    # c2
-        -2.503131e-01,   # c3
-        8.315270e-02,    # c4
-        -1.228034e-02,   # c5
-        9.804036e-04,    # c6
-        -4.413030e-05,   # c7
-        1.057734e-06,    # c8
-        -1.052755e-08    # c9
-    ]
+    def display(self, msg: str):
+        """Show a message in the log box, or on stdout when there is no GUI. Safe from any thread."""
+        if self.ui:
+            self.ui.log(msg)
+        elif self.test_controls:
+            self.test_controls.display(msg)
+        else:
+            log.info(msg)
 
-    # 500°C to 1372°C
-    HIGH_COEFFICIENTS = [
-    -1.318058e+02,  # c0
-     4.830222e+01,  # c1
-    -1.646031e+00,  # c2
-     5.464731e-02,  # c3
-    -9.650715e-04,  # c4
-     8.802193e-06,  # c5
-    -3.110810e-08   # c6
-    ]
+    def on_close(self):
+        """Called when the window closes."""
+        pass
 
-    def get_time(self, time):
-        return time - self.start_time
+    def on_ui(self, fn):
+        """Run fn on the Tk thread (directly when there is no GUI)."""
+        if self.ui:
+            self.ui.call(fn)
+        else:
+            fn()
 
-    def get_displacement(self):
-        displacementVoltage = float(self.daq.query("AI2")) # channel 2
-        print(f"Displacement Voltage: {displacementVoltage}")
-        displacement = (0.04897 * displacementVoltage) + 0.53505
-        return displacement
+    def convert_displacement(self, displacementVoltage):
+        log.debug("Displacement Voltage: %s", displacementVoltage)
+        return calibration.displacement(displacementVoltage)
 
     def get_strain(self, displacement):
-        strain = displacement / float(self.test.gauge_length) - self.firstStrain
-        return strain
+        return calibration.engineering_strain(displacement, self.test.params.gauge_length, self.firstStrain)
     
     def get_true_strain(self, strain):
-        true_strain = np.log(1 + strain)
-        return true_strain
+        return calibration.true_strain(strain)
     
-    def get_strain_rate(self, strainDiff, timeDiff):
-        strain_rate = strainDiff / timeDiff
-        return strain_rate
-
-    def get_temperature(self):
-        #temperatureVoltage = 1000 * float(self.daq.query("AI1")) # channel 1
-        temperatureVoltage = 1000 * float(self.voltmeter.query("?")) # channel 1
-        print(f"Temperature Voltage: {temperatureVoltage}")
-        
-        if temperatureVoltage < 0.0:
-            coeffs = self.NEGATIVE_COEFFICIENTS
-        elif 0.0 <= temperatureVoltage <= 20.644:
-            coeffs = self.POSITIVE_COEFFICIENTS
-        else:
-            coeffs = self.HIGH_COEFFICIENTS
-        
-        if temperatureVoltage > 54.886 or temperatureVoltage < -5.891:
-            print("WARNING: Temperature voltage out of range")
+    def convert_temperature(self, temperatureVoltage):
+        """Type K thermocouple voltage (mV) to temperature (C)."""
+        log.debug("Temperature Voltage: %s", temperatureVoltage)
+        # Counted here and reported once per save rather than warned about every sample
+        if thermocouple.out_of_range(temperatureVoltage):
+            self.temperature_out_of_range += 1
+        return thermocouple.to_celsius(temperatureVoltage)
+
+
+class RemoteTestHandler(TestHandler):
+    """TestHandler for a GUI attached to an acquisition service (--attach).
+
+    The service owns the instruments, the test and its files; this side sends
+    it the operator's commands and plots the sample store read-only, so the
+    window can be closed and reopened without stopping the test.
+    """
+    POLL_PERIOD = 0.5 # seconds between status requests while following a test
+
+    def __init__(self, client: ServiceClient, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.next_log = 0 # sequence number of the next service log line to show
+        self.service_test = {} # the service's parameters as last sent or received
+        self.store = None
+        self.idx = 0
+
+    def request(self, command, **args):
+        """Send a command to the service; shows the error and returns None if it was refused."""
+        try:
+            return self.client.request(command, **args)
+        except ServiceError as e:
+            self.display(str(e))
+            return None
+
+    def attach(self):
+        """Pick up a test already running in the service (called once the widgets exist)."""
+        status = self.request("status", since=0)
+        if status is None:
+            return
+        if status["connected"] and self.test_controls:
+            self.test_controls.connect_btn.configure(state="disabled")
+            self.test_controls.start_btn.configure(state="normal")
+            self.test_controls.resume_btn.configure(state="normal")
+        if not status["running"]:
+            return
+
+        # The entries show the service's values; a running test only allows some edits
+        self.service_test = status["test"]
+        self.test.update(**status["test"])
+        self.show_started()
+        if self.test_controls and status["paused"]:
+            self.toggle_pause()
+
+        self.open_store(status["store"])
+        self.display("Attached to the running test.")
+        self.pool.submit(self.cont_test)
+
+    def open_store(self, path):
+        self.store = SampleStore.open(path, readonly=True)
+        self.refresh()
+
+    def refresh(self):
+        """Pick up the samples committed by the service."""
+        self.idx = self.store.refresh()
+        self._bind_columns()
+
+    def existing_files(self):
+        return [] # the service checks for the files on its side
+
+    def open_instruments(self):
+        status = self.request("connect")
+        return status is not None
+
+    def connect_IO(self):
+        if self.open_instruments():
+            self.test_controls.connect_btn.configure(state="disabled")
+            self.test_controls.start_btn.configure(state="normal")
+            self.test_controls.resume_btn.configure(state="normal")
 
-        temperature = 0.0
-        for i, coeff in enumerate(coeffs):
-            temperature += coeff * (temperatureVoltage ** i)
-        return temperature
+    def begin_test(self):
+        try:
+            status = self.client.request("start", **self.test.params.texts())
+        except ServiceError as e:
+            log.error(e)
+            return False
+        self.service_test = status["test"]
+        self.testStarted = True
+        self.paused = False
+        self.open_store(status["store"])
+        return True
+
+    def resume_test(self, data_file_name: str):
+        # The service resumes the test from its files; the data file must be on the service's machine
+        status = self.request("resume", data_file=os.path.abspath(data_file_name))
+        if status is None:
+            return False
+        self.service_test = status["test"]
+        self.test.update(**status["test"])
+        self.testStarted = True
+        self.paused = False
+        self.open_store(status["store"])
+        return True
+
+    def cont_test(self):
+        """Follow the service's test: its log lines, its samples and the parameters."""
+        self.is_running = True
+        self.request_stop = False
+        while not self.request_stop:
+            status = self.request("status", since=self.next_log)
+            if status is None:
+                break
+            for msg in status["log"]:
+                self.display(msg)
+            self.next_log = status["next_log"]
+            self.refresh()
+            if status.get("analytics") != self.analytics_summary:
+                self.analytics_summary = status.get("analytics")
+                self.on_ui(self.show_analytics)
+            freq = status["test"]["freq"]
+            if self.test.params.adaptive and freq != self.service_test.get("freq"):
+                # The service changed the period
+                self.service_test["freq"] = freq
+                self.test.update(freq=freq)
+            if not status["running"]:
+                self.on_ui(self.show_stopped)
+                break
+            self.send_parameters()
+            time.sleep(self.POLL_PERIOD)
+
+    def on_parameters(self, old: TestParameters, new: TestParameters):
+        """The service takes up edits itself, see send_parameters."""
+
+    def send_parameters(self):
+        """Send the parameters edited since the last poll to the service (on the poll thread, so in order).
+
+        The service changes the period, writes the notes and keeps the plot
+        settings for the next GUI that attaches.
+        """
+        texts = self.test.params.texts()
+        edits = {name: texts[name] for name in ("freq", "notes", "xmin", "bin_val") if texts[name] != self.service_test.get(name)}
+        if edits and self.request("set", **edits) is not None:
+            self.service_test.update(edits)
+
+    def stop_test(self):
+        self.request("stop")
+        self.request_stop = True
+        self.on_ui(self.show_stopped)
+        log.info("Stopped the test.")
+        self.display("Test stopped.")
+
+    def toggle_pause(self):
+        super().toggle_pause()
+        self.request("pause", paused=self.paused)
+
+    def on_close(self):
+        # Stop following; the test carries on in the service
+        self.request_stop = True
+        self.client.close()
+
+
+class ViewerHandler(TestHandler):
+    """TestHandler for reviewing a test's data file (--view), with no instruments.
+
+    A coarse overview of the file (testfile.sample_rows) is plotted at once
+    while the whole file streams into a sample store in the background. The
+    plot then switches to it, and its level-of-detail pyramids fill in the
+    detail as the user zooms in. Only x-min and the bin size can be edited.
+    The creep stage, minimum creep rate and rupture forecast are worked out
+    as the file loads (analytics.py).
+    """
+    OVERVIEW_ROWS = 4096 # rows plotted while the file loads
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.store = None
+        self.idx = 0
+        # Stores of the files loaded (on Windows the files of a store still mapped stay behind)
+        self.directory = tempfile.TemporaryDirectory(prefix="creep-view-", ignore_cleanup_errors=True)
+        self.generation = 0 # counts the files opened, so the load of an earlier one stops
+
+    def setup(self, file_name: str = None):
+        """Turn the test controls into the viewer's (called once the widgets exist)."""
+        controls = self.test_controls
+        for button in (controls.start_btn, controls.stop_btn, controls.pause_btn, controls.resume_btn):
+            button.grid_remove()
+        controls.connect_btn.configure(text="Open...", command=self.choose_file)
+        self.show_test()
+        self.strainplot.hold_zoom = True
+        if file_name:
+            self.open_file(file_name)
+
+    def choose_file(self):
+        file_name = filedialog.askopenfilename(title="Open Test", filetypes=[
+            ("Test data", f"*_data.csv *_data{testfile.EXTENSION}"), ("All files", "*.*")])
+        if file_name:
+            self.open_file(file_name)
+
+    def open_file(self, file_name: str) -> bool:
+        """Plot an overview of a test's data file now, and load all of it in the background."""
+        try:
+            files = recovery.TestFiles(file_name)
+            overview = testfile.sample_rows(file_name, self.OVERVIEW_ROWS)
+        except (recovery.RecoveryError, testfile.TestFileError, OSError, ValueError) as e:
+            self.display(f"Cannot open {file_name}: {e}")
+            return False
+        if not overview[testfile.TIME_COLUMN].size:
+            self.display(f"{file_name} holds no samples.")
+            return False
+        self.generation += 1
+        self.read_test(files, overview)
+        self.analytics_summary = None
+        self.show_analytics()
+        if self.strainplot:
+            self.strainplot.auto_xlim = None # a new test starts from the whole-test view
+
+        # The test's own sample store holds every sample already, if it ends with the data file
+        last_time = overview[DATA_COLUMNS[0][0]][-1]
+        if os.path.isdir(files.samples):
+            store = SampleStore.open(files.samples, readonly=True)
+            names = set(store.names)
+            if len(store) and names.issuperset(StrainPlot.PLOT_SERIES) and "timestamps" in names \
+                    and store.view("timestamps", len(store) - 1)[0] == last_time:
+                self.show_store(store)
+                self.show_test()
+                self.display(f"Opened {file_name} ({len(store)} samples).")
+                self.pool.submit(self.analyse, CreepAnalytics(), store.view("elapsed"), store.view("trueStrain"), self.generation)
+                return True
+
+        columns = [(name, dtype) for name, dtype in self.SAMPLE_COLUMNS if name in StrainPlot.PLOT_SERIES]
+        overview_store = SampleStore.create(os.path.join(self.directory.name, f"overview{self.generation}"), columns)
+        self.fill(overview_store, overview, 0)
+        self.show_store(overview_store)
+        self.show_test()
+        self.display(f"Loading {file_name}...")
+        self.pool.submit(self.load, files, columns, self.generation, float(overview[testfile.TIME_COLUMN][-1]))
+        return True
+
+    def read_test(self, files: recovery.TestFiles, overview: dict):
+        """The test's parameters from its checkpoint, its binary file's metadata or its info file."""
+        first_row = [overview[header][0] for header, _ in DATA_COLUMNS]
+        try:
+            state = recovery.read_checkpoint(files.checkpoint)
+            if state is None and files.binary:
+                with testfile.TestFile(files.data) as test_file:
+                    state = test_file.metadata.get("test")
+            if state is None:
+                state = recovery.state_from_info(files, first_row)
+            fields = state["test"]
+        except (recovery.RecoveryError, testfile.TestFileError, OSError, KeyError) as e:
+            log.info("No test parameters for %s: %s", files.data, e)
+            fields = {"name": files.name}
+        # The whole test is in view to begin with; parameters the files lack keep their defaults
+        fields = {name: value for name, value in fields.items() if name in FIELDS}
+        params = TestParameters().parse(dict(fields, xmin=0, bin_val=1), skip_invalid=True)
+        self.test.update(**params.texts())
+
+    def fill(self, store: SampleStore, block: dict, rows: int) -> int:
+        """Copy a block of data file columns into the store after its first `rows` rows; returns the new count."""
+        stop = rows + len(block[testfile.TIME_COLUMN])
+        while store.capacity < stop:
+            store.grow()
+        for (header, _), name in zip(DATA_COLUMNS, self.CSV_COLUMNS):
+            if name in store.names:
+                store.array(name)[rows:stop] = block[header]
+        store.commit(stop)
+        return stop
+
+    def load(self, files: recovery.TestFiles, columns, generation: int, duration: float):
+        """Stream the whole data file into a sample store (on the pool), then plot it."""
+        store = SampleStore.create(os.path.join(self.directory.name, f"samples{generation}"), columns)
+        analytics = CreepAnalytics()
+        rows = reported = 0
+        try:
+            for block in testfile.data_blocks(files.data):
+                if generation != self.generation:
+                    return # another file was opened
+                start, rows = rows, self.fill(store, block, rows)
+                self.analyse(analytics, block[testfile.TIME_COLUMN], block["True Strain"], generation)
+                # Only the newest rows stay in memory, like a running test's
+                store.release(start - store.HOT_ROWS, rows - store.HOT_ROWS)
+                done = int(10 * block[testfile.TIME_COLUMN][-1] / duration) if duration > 0 else 0
+                if done > reported and done < 10:
+                    reported = done
+                    self.display(f"Loaded {10 * done}%.")
+        except (testfile.TestFileError, OSError, ValueError) as e:
+            self.display(f"Loading {files.data} failed: {e}")
+            return
+
+        def show():
+            if generation == self.generation:
+                self.show_store(store)
+                self.display(f"Loaded {rows} samples.")
+        self.on_ui(show)
+
+    def analyse(self, analytics: CreepAnalytics, elapsed, true_strain, generation: int):
+        """Feed the test's samples to its analytics (on the pool) and show the results."""
+        analytics.update(elapsed, true_strain)
+        if generation == self.generation:
+            self.analytics_summary = analytics.summary()
+            self.on_ui(self.show_analytics)
+
+    def show_store(self, store: SampleStore):
+        """Plot the samples of a store (in the view the user is looking at, if zoomed)."""
+        self.store = store
+        self.idx = len(store)
+        self.elapsed = store.view("elapsed") # x-min is checked against the last elapsed time
+        self.testStarted = self.is_running = True
+        if self.strainplot:
+            self.strainplot.last_frame_key = None
+
+    def show_test(self):
+        """Show the test's parameters once a file is open; only the view entries can be edited."""
+        entries = self.test_info_entry
+        if not entries:
+            return
+        if self.store is not None:
+            self.show_started()
+        for entry in (entries.name_ent, entries.matr_ent, entries.freq_ent, entries.gauge_length_ent, entries.notes_ent,
+                      entries.min_period_ent, entries.max_period_ent, entries.adaptive_chk):
+            entry.config(state="disabled")
+        state = "disabled" if self.store is None else "normal"
+        entries.xmin_ent.config(state=state)
+        entries.bin_ent.config(state=state)
+
+    def on_close(self):
+        self.generation += 1
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.store = None
+        self.directory.cleanup()
 
 
 class MainFrame(tk.Frame):
     """Main Frame for the application."""
-    def __init__(self, parent: tk.Frame):
+    def __init__(self, parent: tk.Frame, client: ServiceClient = None, view: str = None, **handler_options):
+        """view: open the window as a viewer (ViewerHandler) of this data file ("" to choose one later)."""
         super().__init__(parent)
         self.parent: tk.Frame = parent
-        self.handler = TestHandler(test_controls=None, test_info_entry=None, toolbar=None)
+        if client:
+            self.handler = RemoteTestHandler(client, test_controls=None, test_info_entry=None, toolbar=None, **handler_options)
+        elif view is not None:
+            self.handler = ViewerHandler(test_controls=None, test_info_entry=None, toolbar=None, **handler_options)
+        else:
+            self.handler = TestHandler(test_controls=None, test_info_entry=None, toolbar=None, **handler_options)
         self.strainplot: StrainPlot = None
         self.build()
+        if client:
+            self.handler.attach()
+        elif view is not None:
+            self.handler.setup(view)
 
     def build(self):
         """Builds the UI"""
@@ -738,11 +1753,15 @@ class MainFrame(tk.Frame):
         test_controls.grid(row=1, column=0, sticky="nsew")
         self.handler.test_controls = test_controls
 
+        # Log lines and widget updates from the acquisition thread, drained on the Tk thread
+        self.handler.ui = UIQueue(self, log_sink=test_controls.display)
+        self.handler.ui.start()
+
 
 class strainApp(tk.Frame):
     """Core object for the application.
     Used to define widget styles."""
-    def __init__(self, parent):
+    def __init__(self, parent, **handler_options):
         super().__init__(parent)
         parent.resizable(True, True)
         parent.grid_rowconfigure(0, weight=1)
@@ -751,9 +1770,11 @@ class strainApp(tk.Frame):
         
         self.winfo_toplevel().protocol("WM_DELETE_WINDOW", self.close)
 
-        MainFrame(self).grid(sticky="nsew")
+        self.main = MainFrame(self, **handler_options)
+        self.main.grid(sticky="nsew")
 
     def close(self) -> None:
+        self.main.handler.on_close()
         '''self.handler.daq.close()
         print("DAQ closed")
         self.handler.voltmeter.close()
@@ -761,17 +1782,182 @@ class strainApp(tk.Frame):
         self.quit()
 
 
+class StationsApp(tk.Frame):
+    """Several stations in one window (--stations), one notebook tab each.
+
+    Each tab is a MainFrame with its own test, sample store, data files and
+    plot; the stations' acquisition is shared out by the BusScheduler of
+    their GPIB board, whose timing is shown under the tabs.
+    """
+    STATUS_INTERVAL = 1000 # ms between updates of the timing line
+
+    def __init__(self, parent, stations: int, **handler_options):
+        super().__init__(parent)
+        parent.resizable(True, True)
+        parent.grid_rowconfigure(0, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+        parent.tk_setPalette(background="#FAFAFA")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.winfo_toplevel().protocol("WM_DELETE_WINDOW", self.close)
+
+        self.group = StationGroup()
+        self.notebook = ttk.Notebook(self)
+        self.notebook.grid(row=0, column=0, sticky="nsew")
+        self.frames: List[MainFrame] = []
+        for station in range(stations):
+            daq_address, voltmeter_address = station_addresses(station)
+            frame = MainFrame(self.notebook, daq_address=daq_address, voltmeter_address=voltmeter_address,
+                              station=f"Station {station + 1}", **handler_options)
+            self.group.add(frame.handler)
+            self.notebook.add(frame, text=frame.handler.station)
+            self.frames.append(frame)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+        self.status = tk.Label(self, anchor="w", justify="left")
+        self.status.grid(row=1, column=0, sticky="ew")
+        self.after(self.STATUS_INTERVAL, self.show_status)
+
+    def selected(self) -> "MainFrame":
+        return self.nametowidget(self.notebook.select())
+
+    def on_tab_changed(self, event):
+        """Only the plot on the visible tab is drawn."""
+        selected = self.selected()
+        for frame in self.frames:
+            frame.strainplot.visible = frame is selected
+
+    def show_status(self):
+        """Bus utilization, and the sample timing of the station on the visible tab."""
+        handler = self.selected().handler
+        lines = [bus.summary() for bus in self.group.buses.values()]
+        if handler in handler.bus.stations:
+            lines.append(handler.bus.station_timing(handler))
+        self.status.configure(text="    ".join(lines))
+        self.after(self.STATUS_INTERVAL, self.show_status)
+
+    def close(self) -> None:
+        for frame in self.frames:
+            frame.handler.on_close()
+        self.group.close()
+        self.quit()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Creep test acquisition and live plotting.")
+    parser.add_argument("--simulate", action="store_true",
+                        help="use the simulated DAQ and voltmeter instead of the GPIB instruments")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="how much faster than real time the simulated test runs (default 1)")
+    parser.add_argument("--end-after", type=float, default=None,
+                        help="seconds into a simulated test when the status signal drops")
+    parser.add_argument("--concurrent-reads", action="store_true",
+                        help="send the DAQ and voltmeter commands before reading either answer")
+    parser.add_argument("--scan", dest="daq_scan", action="store_true",
+                        help="read the DAQ channels with one scan command instead of one AIn query each "
+                             "(untried on a real HP 3497A; also reads the channels between, e.g. AI1 for AI0 and AI2)")
+    parser.add_argument("--serve", action="store_true",
+                        help="run acquisition as a service without a window; a GUI started with --attach controls it")
+    parser.add_argument("--attach", action="store_true",
+                        help="open the GUI as a client of a running acquisition service")
+    parser.add_argument("--address", default=None,
+                        help="pipe or socket of the acquisition service (default: per-user temp location)")
+    parser.add_argument("--log-level", default="info", choices=("debug", "info", "warning", "error", "off"),
+                        help="console logging; debug adds the per-sample voltages (default info)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the telemetry as plain text on http://127.0.0.1:PORT/")
+    parser.add_argument("--metrics-file", default=None,
+                        help="write the telemetry to this file at every save and at the end of the test")
+    parser.add_argument("--data-format", default="csv", choices=("csv", "binary"),
+                        help="data file as CSV, or as a compressed binary test file indexed by time (see testfile.py)")
+    parser.add_argument("--strain-rate-filter", default="linear", choices=tuple(strain_rate.FILTERS),
+                        help="live strain rate: slope of a line, or Savitzky-Golay quadratic, over the window (default linear)")
+    parser.add_argument("--strain-rate-window", type=int, default=10,
+                        help="samples in each live strain rate fit (default 10)")
+    parser.add_argument("--stations", type=int, default=1,
+                        help="run this many creep stations in one window, see instruments.station_addresses")
+    parser.add_argument("--view", nargs="?", const="", default=None, metavar="DATA_FILE",
+                        help="review a test's data file without instruments (choose the file in the window if none is given)")
+    args = parser.parse_args(argv)
+    if args.stations < 1:
+        parser.error("--stations must be at least 1")
+    if args.view is not None and (args.serve or args.attach or args.stations > 1):
+        parser.error("--view cannot be combined with --serve, --attach or --stations")
+    if args.stations > 1 and (args.serve or args.attach):
+        parser.error("--stations cannot be combined with --serve or --attach")
+    return args
+
+
+def handler_options(args):
+    """TestHandler keyword arguments selecting the instrument backend and acquisition mode."""
+    options = {"concurrent_reads": args.concurrent_reads, "daq_scan": args.daq_scan, "metrics_file": args.metrics_file,
+               "data_format": args.data_format, "strain_rate_filter": args.strain_rate_filter,
+               "strain_rate_window": args.strain_rate_window}
+    if not args.simulate:
+        return options
+    from simulation import SimClock
+    from instruments import simulated_resource_manager
+    clock = SimClock(speedup=args.speedup)
+    options["clock"] = clock
+    if args.stations > 1:
+        # One simulated lab, so the stations share its buses
+        from instruments import simulated_lab
+        lab = simulated_lab([station_addresses(k) for k in range(args.stations)], clock=clock, end_after=args.end_after)
+        options["resource_manager"] = lambda: lab
+    else:
+        options["resource_manager"] = lambda: simulated_resource_manager(clock=clock, end_after=args.end_after)
+    return options
+
+
+def serve(args):
+    """Run the acquisition service until a client sends shutdown."""
+    handler = TestHandler(root=tk.Tcl(), **handler_options(args))
+    AcquisitionService(handler, args.address).serve_forever()
+
+
+def configure_telemetry(args):
+    """Console logging at the chosen level, and the metrics endpoint if one was asked for."""
+    if args.log_level == "off":
+        logging.disable(logging.CRITICAL)
+    else:
+        logging.basicConfig(level=args.log_level.upper(), format="%(message)s", stream=sys.stdout)
+    if args.metrics_port is not None:
+        REGISTRY.serve(args.metrics_port)
+        log.info("Metrics on http://127.0.0.1:%d/", args.metrics_port)
+
+
 def main():
     """The Tkinter entry point of the program; enters mainloop."""
+    args = parse_args()
+    configure_telemetry(args)
+    if args.serve:
+        serve(args)
+        return
+    if args.view is not None:
+        # No test, so no instruments and no load dialogs
+        root = tk.Tk()
+        root.title("Creep Test Viewer")
+        strainApp.ROOT = root
+        root.geometry("1000x650")
+        strainApp(root, view=args.view).grid(sticky="nsew")
+        root.mainloop()
+        return
+
+    options = {} if args.attach else handler_options(args)
+    if args.attach:
+        # Instrument options belong to the service; the GUI only needs its address
+        options["client"] = ServiceClient(args.address)
+        running = options["client"].request("status")["running"]
     root = tk.Tk()
     root.title("Creep Test")
     strainApp.ROOT = root
     root.geometry("1000x650") # window size
     root.withdraw() # temporarily hide window
 
-    def get_load():
+    def get_load(prefix=""):
         while True:
-            appliedLoad = simpledialog.askstring("Applied Load (g)", "Enter applied load (g):")
+            appliedLoad = simpledialog.askstring(f"{prefix}Applied Load (g)", "Enter applied load (g):")
             if not appliedLoad:
                 messagebox.showwarning("Invalid Input", "Please enter a valid value for the applied load.")
                 continue
@@ -785,9 +1971,9 @@ def main():
                 messagebox.showwarning("Invalid Input", "Please enter a valid value for the applied load.")
                 continue
 
-    def get_area():
+    def get_area(prefix=""):
         while True:
-            area = simpledialog.askstring("Cross Sectional Area (m^2)", "Enter cross sectional area (m^2):")
+            area = simpledialog.askstring(f"{prefix}Cross Sectional Area (m^2)", "Enter cross sectional area (m^2):")
             if not area:
                 messagebox.showwarning("Invalid Input", "Please enter a valid value for the cross sectional area.")
                 continue
@@ -801,23 +1987,29 @@ def main():
                 messagebox.showwarning("Invalid Input", "Please enter a valid value for the cross sectional area.")
                 continue
 
-    while True:
-        appliedLoad = get_load()
-        area = get_area()
+    for station in range(args.stations):
+        prefix = f"Station {station + 1}: " if args.stations > 1 else ""
+        while not (args.attach and running): # no setup dialogs when attaching to a running test
+            appliedLoad = get_load(prefix)
+            area = get_area(prefix)
 
-        intendedLoad = (appliedLoad + 274) / 1000 * 3 # pre-load: 274 g, convert to kg, 3:1 load
-        intendedForce = intendedLoad * 9.80665 # F = mg
-        intendedStress = (intendedForce / area) / (10 ** 6) # P = F/A, convert to MPa
+            intendedLoad = (appliedLoad + 274) / 1000 * 3 # pre-load: 274 g, convert to kg, 3:1 load
+            intendedForce = intendedLoad * 9.80665 # F = mg
+            intendedStress = (intendedForce / area) / (10 ** 6) # P = F/A, convert to MPa
 
-        response = messagebox.askquestion("Confirmation of Intended Stress", f"Verify intended stress of {intendedStress:.2f} MPa.")
+            response = messagebox.askquestion(f"{prefix}Confirmation of Intended Stress", f"Verify intended stress of {intendedStress:.2f} MPa.")
 
-        if response == "no":
-            continue  # Continue loop to ask input again
-        else:
-            break
+            if response == "no":
+                continue  # Continue loop to ask input again
+            else:
+                break
 
     root.deiconify() # unhide window
-    strainApp(root).grid(sticky="nsew")
+    if args.stations > 1:
+        root.geometry("1000x700") # room for the tabs and the timing line
+        StationsApp(root, args.stations, **options).grid(sticky="nsew")
+    else:
+        strainApp(root, **options).grid(sticky="nsew")
     root.mainloop()
 
 if __name__ == "__main__":
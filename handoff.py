@@ -0,0 +1,68 @@
+"""Handing GUI work from the acquisition thread to the Tk thread."""
+import collections
+import threading
+
+
+class UIQueue:
+    """Log lines and calls posted from any thread, run on the Tk thread every `interval` ms.
+
+    Tk widgets may only be touched from the thread running the mainloop. Other
+    threads post here instead: deque.append and deque.popleft are atomic, so
+    posting never takes a lock and never waits on the GUI. Each tick the Tk
+    side drains everything posted so far, joins consecutive log lines into a
+    single write to `log_sink`, and runs posted calls in the order they came.
+    """
+    def __init__(self, root, log_sink=None, interval: int = 100):
+        self.root = root
+        self.log_sink = log_sink # called on the Tk thread with a block of lines
+        self.interval = interval
+        self._items = collections.deque()
+        self._tk_thread = threading.get_ident() # the queue is created on the Tk thread
+        self._job = None
+
+    def log(self, msg: str):
+        """Queue a line for the log; safe from any thread."""
+        self._items.append((None, msg))
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the Tk thread: now if already on it, otherwise at the next tick."""
+        if threading.get_ident() == self._tk_thread:
+            fn(*args)
+        else:
+            self._items.append((fn, args))
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(self.interval, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def drain(self):
+        """Run everything posted so far (on the Tk thread)."""
+        lines = []
+        while True:
+            try:
+                fn, args = self._items.popleft()
+            except IndexError:
+                break
+            if fn is None:
+                lines.append(args)
+                continue
+            # Keep calls in order with the lines logged before them
+            self._write(lines)
+            lines = []
+            fn(*args)
+        self._write(lines)
+
+    def _write(self, lines):
+        if lines and self.log_sink is not None:
+            self.log_sink("\n".join(lines))
+
+    def _tick(self):
+        try:
+            self.drain()
+        finally:
+            self._job = self.root.after(self.interval, self._tick)
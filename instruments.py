@@ -0,0 +1,174 @@
+"""Instrument backends for the creep test.
+
+A backend is a factory returning an object with the pyvisa ResourceManager
+interface (list_resources / open_resource). The real bench goes through
+pyvisa and GPIB; the simulated bench answers the same commands in-process.
+"""
+from dataclasses import dataclass
+
+# GPIB addresses on the bench
+DAQ_ADDRESS = "GPIB0::9::INSTR"        # HP 3497A data acquisition/control unit
+VOLTMETER_ADDRESS = "GPIB0::8::INSTR"  # Fluke 8440A digital multimeter
+
+# A GPIB bus takes 15 devices including the controller, so 7 stations of two instruments
+STATIONS_PER_BUS = 7
+
+
+def station_addresses(station: int):
+    """(DAQ, voltmeter) addresses of a station in multi-station mode.
+
+    Station 0 is the original bench. Each further station on a bus uses the
+    next pair of primary addresses from 10 up, and every STATIONS_PER_BUS
+    stations start on the next GPIB board.
+    """
+    board, slot = divmod(station, STATIONS_PER_BUS)
+    if slot == 0:
+        daq, voltmeter = 9, 8
+    else:
+        daq, voltmeter = 8 + 2 * slot, 9 + 2 * slot
+    return f"GPIB{board}::{daq}::INSTR", f"GPIB{board}::{voltmeter}::INSTR"
+
+
+def bus_of(address: str) -> str:
+    """The interface board part of a VISA address ("GPIB0")."""
+    return address.split("::")[0]
+
+
+def visa_resource_manager():
+    """ResourceManager for the real instruments (needs pyvisa and a VISA library)."""
+    import pyvisa
+    return pyvisa.ResourceManager()
+
+
+def simulated_resource_manager(clock=None, **options):
+    """ResourceManager serving a simulated DAQ and voltmeter, see simulation.SimulatedBench."""
+    from simulation import SimulatedBench
+    return SimulatedBench(clock=clock, **options)
+
+
+def simulated_lab(addresses, clock=None, **options):
+    """ResourceManager serving a simulated bench at each (DAQ, voltmeter) address pair, see simulation.SimulatedLab."""
+    from simulation import SimulatedLab
+    return SimulatedLab(addresses, clock=clock, **options)
+
+
+def overlapped_query(requests, clock):
+    """Query several instruments with their conversions overlapping on the bus.
+
+    Every command in `requests` (a list of (instrument, command) pairs) is sent
+    before any answer is read, so the instruments measure at the same time and
+    the bus only carries the short command and response transfers one after
+    another. Returns one (response, sent, received) tuple per request, with
+    times from clock.monotonic().
+    """
+    sent = []
+    for instrument, command in requests:
+        sent.append(clock.monotonic())
+        instrument.write(command)
+
+    results = []
+    for (instrument, _), t_sent in zip(requests, sent):
+        response = instrument.read()
+        results.append((response, t_sent, clock.monotonic()))
+    return results
+
+
+def timed_query(instrument, command, clock):
+    """A single query, returned in the same (response, sent, received) form as overlapped_query."""
+    t_sent = clock.monotonic()
+    response = instrument.query(command)
+    return response, t_sent, clock.monotonic()
+
+
+@dataclass(frozen=True)
+class DAQReading:
+    """One scan of the HP 3497A analog inputs, in volts. Channels not scanned are None."""
+    status: float = None        # AI0, status signal
+    temperature: float = None   # AI1, thermocouple
+    displacement: float = None  # AI2, displacement transducer
+    sent: float = None          # clock.monotonic() when the scan command went out
+    received: float = None      # clock.monotonic() when the last answer came back
+    queries: dict = None        # channel name: (sent, received) of its own AIn query, without a scan
+
+    @property
+    def time(self) -> float:
+        """Time the channels are taken to be measured, halfway through the transaction."""
+        return (self.sent + self.received) / 2
+
+    def window(self, name: str):
+        """(sent, received) of the query that read a channel: its own AIn query, or the whole scan."""
+        if self.queries and name in self.queries:
+            return self.queries[name]
+        return self.sent, self.received
+
+
+class ChannelScan:
+    """Reads a list of HP 3497A analog input channels in one command/response turnaround.
+
+    With scan=False (the default) every channel is read with its own AIn
+    query, as the test always has. With scan=True the scan command sets the
+    first and last channel of a contiguous range and steps through it, and
+    the DAQ answers with one comma separated reading per channel. The scan
+    command has only been tried on the simulated DAQ, not on a real 3497A.
+    A scan also reads the channels between the requested ones (AI1 when only
+    AI0 and AI2 are wanted, see `extra`); their readings are dropped, at the
+    cost of one conversion each.
+    """
+    CHANNELS = {"status": 0, "temperature": 1, "displacement": 2}
+    SCAN_COMMAND = "AF{first}AL{last}AS"
+
+    def __init__(self, daq, channels=("status", "displacement"), scan: bool = False):
+        unknown = set(channels) - set(self.CHANNELS)
+        if unknown:
+            raise ValueError(f"Unknown DAQ channels: {', '.join(sorted(unknown))}")
+        self.daq = daq
+        self.channels = tuple(channels)
+        self.scan = scan
+        self.numbers = sorted(self.CHANNELS[name] for name in self.channels)
+        self.first, self.last = self.numbers[0], self.numbers[-1]
+        # Channels a scan reads without being asked for
+        self.extra = tuple(n for n in range(self.first, self.last + 1) if n not in self.numbers) if scan else ()
+
+    @property
+    def single(self) -> bool:
+        """True if `command` reads every channel in one turnaround (a scan, or a single channel)."""
+        return self.scan or len(self.numbers) == 1
+
+    @property
+    def command(self) -> str:
+        """Command that starts the scan; write it, then read() the answer. Without a scan it reads the first channel only."""
+        if self.scan:
+            return self.SCAN_COMMAND.format(first=self.first, last=self.last)
+        return f"AI{self.numbers[0]}"
+
+    def parse(self, response: str, sent: float = None, received: float = None) -> DAQReading:
+        """Turn the answer to `command` into a DAQReading."""
+        values = [float(v) for v in response.strip().split(",")]
+        if self.scan:
+            if len(values) != self.last - self.first + 1:
+                raise ValueError(f"Scan of AI{self.first}-AI{self.last} returned {len(values)} readings.")
+            by_number = {self.first + i: v for i, v in enumerate(values)}
+        else:
+            by_number = {self.numbers[0]: values[0]}
+        fields = {name: by_number.get(self.CHANNELS[name]) for name in self.channels}
+        queries = None if self.scan else {self.channels[0]: (sent, received)}
+        return DAQReading(sent=sent, received=received, queries=queries, **fields)
+
+    def read(self, clock, prefix: str = "") -> DAQReading:
+        """Scan the channels. `prefix` is sent ahead of the scan in the same command (e.g. "VC3")."""
+        if self.scan:
+            response, sent, received = timed_query(self.daq, prefix + self.command, clock)
+            return self.parse(response, sent, received)
+
+        # One query per channel, each timed on its own
+        if prefix:
+            self.daq.write(prefix)
+        fields = {}
+        queries = {}
+        for name in self.channels:
+            response, channel_sent, channel_received = timed_query(self.daq, f"AI{self.CHANNELS[name]}", clock)
+            fields[name] = float(response)
+            queries[name] = (channel_sent, channel_received)
+        sent = min(t for t, _ in queries.values())
+        received = max(t for _, t in queries.values())
+        return DAQReading(sent=sent, received=received, queries=queries, **fields)
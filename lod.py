@@ -0,0 +1,223 @@
+"""Level-of-detail summaries for plotting long sample series."""
+import math
+
+import numpy as np
+
+
+def bin_mean(arr, bin_size):
+    """Mean of consecutive bins of `bin_size` samples; a partial last bin is kept."""
+    length = arr.size
+    # No binning if bin_size <=1 or too few points
+    if bin_size <= 1 or length <= 1:
+        return arr
+    m = length // bin_size
+    # Full bins: reshape view and mean over axis=1
+    full = arr[:m * bin_size].reshape(m, bin_size).mean(axis=1)
+    # Handle leftover partial bin
+    rem = length - m * bin_size
+    if rem:
+        tail = np.array([arr[m * bin_size :].mean()])
+        return np.concatenate((full, tail))
+    return full
+
+
+def nan_extrema(arr):
+    """Min and max of arr ignoring NaN; (nan, nan) if it has no numbers."""
+    if arr.size == 0:
+        return math.nan, math.nan
+    return float(np.fmin.reduce(arr)), float(np.fmax.reduce(arr))
+
+
+class _Level:
+    """Min, max and sum of the buckets at one level, in arrays that double as they fill.
+
+    With `keep`, only the newest buckets are held: once twice that many are
+    held the older ones are dropped, and `first` is the index of the oldest
+    bucket still held.
+    """
+    def __init__(self, dtype, keep: int = None):
+        self.count = 0 # buckets summarized so far
+        self.first = 0
+        self.keep = keep
+        self.mins = np.empty(64, dtype=dtype)
+        self.maxs = np.empty(64, dtype=dtype)
+        self.sums = np.empty(64, dtype=np.float64)
+
+    def append(self, mins, maxs, sums):
+        start = self.count - self.first
+        end = start + mins.size
+        if end > self.mins.size:
+            size = max(end, 2 * self.mins.size)
+            for name in ("mins", "maxs", "sums"):
+                old = getattr(self, name)
+                new = np.empty(size, dtype=old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+        self.mins[start:end] = mins
+        self.maxs[start:end] = maxs
+        self.sums[start:end] = sums
+        self.count += mins.size
+
+    def range(self, b0: int, b1: int):
+        """Mins, maxs and sums of buckets [b0:b1], which must be held."""
+        return (self.mins[b0 - self.first:b1 - self.first], self.maxs[b0 - self.first:b1 - self.first],
+                self.sums[b0 - self.first:b1 - self.first])
+
+    def trim(self):
+        held = self.count - self.first
+        if self.keep is None or held < 2 * self.keep:
+            return
+        drop = held - self.keep
+        for values in (self.mins, self.maxs, self.sums):
+            values[:self.keep] = values[drop:held]
+        self.first += drop
+
+
+class Buckets:
+    """Per-bucket min, max and mean of a range of samples, oldest first."""
+    def __init__(self, mins, maxs, means):
+        self.mins = mins
+        self.maxs = maxs
+        self.means = means
+
+
+class LODPyramid:
+    """Multi-resolution min/max/mean summary of one append-only series.
+
+    Level 0 is the raw series itself (not stored here). Level L >= 1 holds a
+    bucket for every `base * factor**(L-1)` samples. update() only summarizes
+    samples that arrived since the last call, so keeping the pyramid current
+    costs amortized O(1) per sample, and buckets() returns any range at any
+    level in time proportional to the number of buckets returned. Bucket
+    extremes ignore NaN, and extrema() finds the min and max of any range in
+    O(log n) from whole buckets plus a few raw samples at its ends.
+
+    Each level holds only its newest `keep` buckets, so memory does not grow
+    with the series: a fine level covers the recent past and the coarsest
+    ones the whole series, which is what a view ending at the newest sample
+    needs (level_for never picks more than `keep` buckets). Older buckets are
+    summarized again from the raw series (a memory-mapped store) when asked for.
+    """
+    KEEP = 4096 # buckets held per level, more than any plot is wide in pixels
+
+    def __init__(self, base: int = 16, factor: int = 4, keep: int = KEEP):
+        self.base = base
+        self.factor = factor
+        self.keep = keep
+        self.levels = []
+        self.n = 0 # raw samples summarized
+
+    def bucket_size(self, level: int) -> int:
+        return 1 if level == 0 else self.base * self.factor ** (level - 1)
+
+    def level_for(self, count: int, width: int, bin_size: int = 1) -> int:
+        """Smallest level with buckets of at least bin_size samples and at most `width` buckets over `count` samples."""
+        width = min(width, self.keep // 2) if self.keep else width
+        needed = max(bin_size, math.ceil(count / max(width, 1)))
+        level = 0
+        while self.bucket_size(level) < needed and level < len(self.levels):
+            level += 1
+        return level
+
+    def update(self, raw: np.ndarray):
+        """Summarize raw[self.n:] (raw is the whole series so far, e.g. a store view)."""
+        # A long catch-up goes in steps, so no level grows far beyond `keep` in between
+        step = self.base * self.keep if self.keep else raw.size
+        while self.n < raw.size:
+            self._update(raw, min(self.n + step, raw.size))
+
+    def _update(self, raw: np.ndarray, n: int):
+        self.n = n
+
+        # Each level is built from the complete buckets of the level below
+        src_mins = src_maxs = src_sums = raw
+        src_count = n
+        src_first = 0
+        group = self.base
+        index = 0
+        while True:
+            complete = src_count // group
+            if index == len(self.levels):
+                if complete == 0:
+                    break
+                self.levels.append(_Level(raw.dtype, self.keep))
+            level = self.levels[index]
+            if complete > level.count:
+                s0, s1 = level.count * group - src_first, complete * group - src_first
+                level.append(np.fmin.reduce(src_mins[s0:s1].reshape(-1, group), axis=1),
+                             np.fmax.reduce(src_maxs[s0:s1].reshape(-1, group), axis=1),
+                             src_sums[s0:s1].reshape(-1, group).sum(axis=1, dtype=np.float64))
+            src_mins, src_maxs, src_sums = level.mins, level.maxs, level.sums
+            src_count = level.count
+            src_first = level.first
+            group = self.factor
+            index += 1
+        # Trimmed only once the level above has taken the buckets it needs
+        for level in self.levels:
+            level.trim()
+
+    def summarize(self, raw: np.ndarray, b0: int, b1: int, size: int):
+        """Mins, maxs and means of buckets [b0:b1] of `size` samples, straight from the raw series."""
+        values = raw[b0 * size:b1 * size].reshape(-1, size)
+        return (np.fmin.reduce(values, axis=1), np.fmax.reduce(values, axis=1),
+                values.mean(axis=1, dtype=np.float64))
+
+    def buckets(self, raw: np.ndarray, start: int, stop: int, level: int) -> Buckets:
+        """Buckets covering raw samples [start:stop] at `level`.
+
+        The first bucket may start a little before `start`. Samples at the end
+        that do not fill a whole bucket are covered by finer levels, so the
+        newest data is always shown.
+        """
+        parts = []
+        while start < stop:
+            if level == 0:
+                part = raw[start:stop]
+                parts.append((part, part, part))
+                break
+            size = self.bucket_size(level)
+            lvl = self.levels[level - 1]
+            b0 = start // size
+            b1 = min(stop // size, lvl.count)
+            if b1 > b0:
+                if b0 < lvl.first:
+                    parts.append(self.summarize(raw, b0, min(b1, lvl.first), size))
+                if b1 > lvl.first:
+                    mins, maxs, sums = lvl.range(max(b0, lvl.first), b1)
+                    parts.append((mins, maxs, sums / size))
+                start = b1 * size
+            level -= 1
+
+        if not parts:
+            empty = raw[:0]
+            return Buckets(empty, empty, empty)
+        if len(parts) == 1:
+            return Buckets(*parts[0])
+        return Buckets(*(np.concatenate(p) for p in zip(*parts)))
+
+    def extrema(self, raw: np.ndarray, start: int, stop: int):
+        """Min and max of raw[start:stop] ignoring NaN; (nan, nan) if it has no numbers."""
+        mins, maxs = [], []
+        self._cover(raw, start, stop, len(self.levels), mins, maxs)
+        if not mins:
+            return math.nan, math.nan
+        return nan_extrema(np.array(mins))[0], nan_extrema(np.array(maxs))[1]
+
+    def _cover(self, raw, start, stop, level, mins, maxs):
+        """Collect extremes of [start:stop] from the coarsest whole buckets inside it, finer levels at the ends."""
+        while level > 0 and start < stop:
+            size = self.bucket_size(level)
+            lvl = self.levels[level - 1]
+            b0 = max(-(-start // size), lvl.first) # anything older is covered by finer levels or raw
+            b1 = min(stop // size, lvl.count)
+            if b1 > b0:
+                held_mins, held_maxs, _ = lvl.range(b0, b1)
+                mins.append(np.fmin.reduce(held_mins))
+                maxs.append(np.fmax.reduce(held_maxs))
+                self._cover(raw, start, b0 * size, level - 1, mins, maxs)
+                start = b1 * size
+            level -= 1
+        if stop > start:
+            lo, hi = nan_extrema(raw[start:stop])
+            mins.append(lo)
+            maxs.append(hi)
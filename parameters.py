@@ -0,0 +1,174 @@
+"""Test parameters: parsed and checked once, shared between threads as one immutable value.
+
+The operator enters the parameters as text. TestParameters holds them parsed
+(the period as a float, the bin size as an int, ...) and checked, and every
+change makes a new TestParameters instead of modifying the current one.
+ParameterSet publishes the current value and calls its listeners with the
+old and new values when it changes, so
+
+* the acquisition thread and the plot read the parameters with one
+  attribute read: no Tk calls off the Tk thread, and no parsing per sample
+  or per frame;
+* the GUI publishes edits as they are typed, from traces on the entries' Tk
+  variables on the Tk thread (see TestInfoEntry), and shows the changes made
+  elsewhere (the adaptive period, the acquisition service, a resumed test).
+
+Parameters are written to the info file, the checkpoint and the acquisition
+service's messages as text, see TestParameters.text.
+"""
+import dataclasses
+import math
+import threading
+
+# In the order the acquisition service and checkpoints list them
+FIELDS = ("name", "material", "freq", "gauge_length", "notes", "xmin", "bin_val",
+          "adaptive", "min_period", "max_period")
+
+
+class ParameterError(ValueError):
+    """A parameter's value is not valid; `name` is the parameter's."""
+    def __init__(self, name: str, message: str):
+        super().__init__(message)
+        self.name = name
+
+
+def _positive(message):
+    def parse(value) -> float:
+        number = float(value)
+        if not (math.isfinite(number) and number > 0):
+            raise ValueError
+        return number
+    parse.message = message
+    return parse
+
+
+def _non_negative(message):
+    def parse(value) -> float:
+        number = float(value)
+        if not (math.isfinite(number) and number >= 0):
+            raise ValueError
+        return number
+    parse.message = message
+    return parse
+
+
+def _count(message):
+    def parse(value) -> int:
+        number = int(value)
+        if number < 1:
+            raise ValueError
+        return number
+    parse.message = message
+    return parse
+
+
+def _text(value) -> str:
+    return str(value)
+
+
+def _flag(value) -> bool:
+    if isinstance(value, bool) or value in ("1", "0"):
+        return value in (True, "1")
+    raise ValueError
+
+
+_text.message = None
+_flag.message = "Adaptive period must be 1 or 0."
+RANGE_MESSAGE = "Period range must be two positive numbers, the smaller first."
+
+# How each parameter is parsed from its text (or taken as a value of its type), and why it is refused
+PARSERS = {
+    "name": _text,
+    "material": _text,
+    "freq": _positive("Period must be a positive number."),
+    "gauge_length": _positive("Gauge length must be a positive number."),
+    "notes": _text,
+    "xmin": _non_negative("x-min must be a number of seconds, 0 or more."),
+    "bin_val": _count("Bin Size must be a whole number, 1 or more."),
+    "adaptive": _flag,
+    "min_period": _positive(RANGE_MESSAGE),
+    "max_period": _positive(RANGE_MESSAGE),
+}
+
+
+def format_number(value: float) -> str:
+    """Shortest text of a number that reads back as the same number ("2", not "2.0")."""
+    text = f"{value:g}"
+    return text if float(text) == value else repr(value)
+
+
+@dataclasses.dataclass(frozen=True)
+class TestParameters:
+    """A test's parameters, parsed; replaced as a whole when one of them changes."""
+    name: str = ""
+    material: str = ""
+    freq: float = 1.0 # sample period (s)
+    gauge_length: float = 1.4 # in
+    notes: str = ""
+    xmin: float = 0.0 # plots start here (s)
+    bin_val: int = 1 # samples averaged into each plotted point
+    adaptive: bool = False # the period follows the creep stage (adaptive.py)
+    min_period: float = 1.0 # range of the adaptive period (s)
+    max_period: float = 300.0
+
+    def parse(self, values: dict, skip_invalid: bool = False) -> "TestParameters":
+        """These parameters with some replaced by new values, given as text or as values of their type.
+
+        Raises ParameterError for the first invalid value, or leaves invalid values out with skip_invalid.
+        """
+        changes = {}
+        for name, value in values.items():
+            parser = PARSERS.get(name)
+            if parser is None:
+                raise ParameterError(name, f"Unknown parameter {name!r}.")
+            try:
+                changes[name] = parser(value)
+            except (TypeError, ValueError):
+                if not skip_invalid:
+                    raise ParameterError(name, parser.message) from None
+        return dataclasses.replace(self, **changes) if changes else self
+
+    def check(self):
+        """Raise ParameterError unless a test can start with these parameters."""
+        if not (self.name and self.material):
+            raise ParameterError("name" if not self.name else "material", "Please enter a name and a material.")
+        if self.adaptive and self.min_period > self.max_period:
+            raise ParameterError("min_period", RANGE_MESSAGE)
+
+    def text(self, name: str) -> str:
+        """A parameter as it is written to the info file and checkpoint and shown in its entry."""
+        value = getattr(self, name)
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, float):
+            return format_number(value)
+        return str(value)
+
+    def texts(self) -> dict:
+        return {name: self.text(name) for name in FIELDS}
+
+
+class ParameterSet:
+    """Publishes a test's current TestParameters (self.params) to the threads that use them.
+
+    Reading self.params needs no lock: it is only ever replaced by a new
+    value. Listeners are called as listener(old, new) after each change, on
+    the thread that made it, so they must not touch Tk widgets themselves.
+    """
+    def __init__(self, params: TestParameters = None):
+        self.params = params or TestParameters()
+        self.listeners = []
+        self._lock = threading.Lock() # edits come from the Tk thread, the acquisition thread and the service
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def update(self, **values) -> TestParameters:
+        """Parse, check and publish new values of some parameters; raises ParameterError and changes nothing if one is invalid."""
+        with self._lock:
+            old = self.params
+            new = self.params = old.parse(values)
+        if new != old:
+            for listener in self.listeners:
+                listener(old, new)
+        return new
@@ -0,0 +1,255 @@
+"""Crash recovery: resume a test from the tail of its data file instead of re-reading it.
+
+While a test runs the writer keeps NAME_checkpoint.json next to the data and
+info files. It holds what the data file does not: the parameters, the start
+time, the first strain reading and the period log. Resuming a test that
+stopped without finishing (see TestHandler.resume_test) then takes
+
+* the tail of NAME_data.csv, read by seeking to the end of the file: a line
+  the crash left unfinished is cut off, and the last whole row is the last
+  sample the data file holds (a binary NAME_data.ctest is indexed from its
+  record headers instead, see testfile.py);
+* the samples for the plots, taken as they are from the test's sample store
+  (NAME_samples) when it holds that row, and otherwise bulk-loaded from the
+  data file in large vectorized chunks.
+
+Neither step parses the file row by row, so a test of millions of samples
+resumes in seconds. Samples the store committed after the last save are
+kept and written to the data file by the next save. Tests recorded before
+checkpoints were kept resume from their info file and first data row, and
+binary test files carry the checkpoint in their metadata too.
+
+The time between the last sample and the resumed test's first is recorded
+in the resume log of the info file and the checkpoint.
+"""
+import json
+import os
+
+import numpy as np
+
+import calibration
+import testfile
+from sample_store import SampleStore
+from writer import DATA_COLUMNS, read_info
+
+DATA_SUFFIXES = ("_data.csv", f"_data{testfile.EXTENSION}")
+TAIL_BLOCK = 1 << 16 # bytes read back from the end of the data file at a time
+FORMAT = 1 # checkpoint layout version
+
+
+class RecoveryError(Exception):
+    """The test cannot be resumed from its files."""
+
+
+class TestFiles:
+    """The files of a test, named after its data file NAME_data.csv."""
+    def __init__(self, data_file_name: str):
+        suffix = next((suffix for suffix in DATA_SUFFIXES if data_file_name.endswith(suffix)), None)
+        if suffix is None:
+            raise RecoveryError(f"{data_file_name} is not a test data file (NAME{' or NAME'.join(DATA_SUFFIXES)}).")
+        base = data_file_name[:-len(suffix)]
+        self.name = os.path.basename(base)
+        self.data = data_file_name
+        self.binary = suffix != DATA_SUFFIXES[0]
+        self.info = f"{base}_info.csv"
+        self.checkpoint = f"{base}_checkpoint.json"
+        self.samples = f"{base}_samples"
+
+
+def format_checkpoint(state: dict) -> str:
+    """Checkpoint file text for a test's state (numpy scalars are written as floats)."""
+    return json.dumps(dict(state, format=FORMAT), indent=1, default=float) + "\n"
+
+
+def read_checkpoint(file_name: str):
+    """The state saved by format_checkpoint, or None if there is no checkpoint."""
+    if not os.path.exists(file_name):
+        return None
+    try:
+        with open(file_name) as file:
+            state = json.load(file)
+    except ValueError as e:
+        raise RecoveryError(f"Checkpoint {file_name} is unreadable: {e}")
+    if state.get("format") != FORMAT:
+        raise RecoveryError(f"Checkpoint {file_name} has an unknown format.")
+    return state
+
+
+def state_from_info(files: TestFiles, first_row):
+    """The checkpoint state of a test recorded without checkpoints, from its info file and first data row."""
+    info = read_info(files.info)
+    if "First Displacement Voltage (V)" not in info or first_row is None:
+        raise RecoveryError(f"{files.info} and the data file do not say how the test started.")
+    first_voltage = float(info["First Displacement Voltage (V)"])
+    gauge_length = info.get("Gauge Length (in)", "")
+    freq_log, gap_log = [], []
+    with open(files.info, newline="") as file:
+        # Repeated keys, which read_info keeps only the last of
+        for line in file:
+            key, _, value = line.rstrip("\r\n").partition(": ")
+            if key == "Period Log":
+                period, _, at = value.partition(" at ")
+                freq_log.append({"Period (s)": period, "Timestamp (s)": float(at)})
+            elif key == "Resume Gap":
+                gap, _, at = value.partition(" s at ")
+                gap_log.append({"Gap (s)": float(gap), "Timestamp (s)": float(at)})
+    periods = info.get("Adaptive Period Range (s)")
+    min_period, _, max_period = periods.partition(" to ") if periods else ("1", "", "300")
+    return {
+        "test": {"name": files.name, "material": info.get("Material", ""),
+                 "freq": freq_log[-1]["Period (s)"] if freq_log else "1",
+                 "gauge_length": gauge_length, "notes": info.get("Notes", ""), "xmin": "0", "bin_val": "1",
+                 "adaptive": "1" if periods else "0", "min_period": min_period, "max_period": max_period},
+        "start_time": float(first_row[0] - first_row[1]), # epoch minus elapsed time
+        "first_displacement_voltage": first_voltage,
+        "first_strain": calibration.engineering_strain(calibration.displacement(first_voltage), float(gauge_length), 0.0),
+        "freq_log": freq_log,
+        "gap_log": gap_log,
+    }
+
+
+def _parse_row(line: bytes):
+    """A data row as floats, or None if it is not a whole row."""
+    try:
+        row = np.array(line.decode("ascii").strip().split(","), dtype=np.float64)
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return row if row.size == len(DATA_COLUMNS) else None
+
+
+def repair_tail(file_name: str):
+    """The first and last whole rows of a data file (None if it has none).
+
+    Reads back from the end of the file and truncates whatever follows the
+    last whole row: a line cut short, or the zeros a power cut can leave.
+    """
+    headers = [name for name, _ in DATA_COLUMNS]
+    with open(file_name, "r+b") as file:
+        if file.readline().decode("ascii", "replace").rstrip("\r\n").split(",") != headers:
+            raise RecoveryError(f"{file_name} does not have the columns of this version's data files.")
+        data_start = file.tell()
+        first = _parse_row(file.readline())
+        end = file.seek(0, os.SEEK_END)
+        tail, tail_start, row = b"", end, None
+        while end > data_start:
+            # Hold at least two line ends (or the whole file) so the last line is whole
+            while tail.count(b"\n") < 2 and tail_start > data_start:
+                step = min(TAIL_BLOCK, tail_start - data_start)
+                tail_start -= step
+                file.seek(tail_start)
+                tail = file.read(step) + tail
+            last_end = tail.rfind(b"\n")
+            line_start = tail.rfind(b"\n", 0, max(last_end, 0)) + 1
+            row = _parse_row(tail[line_start:last_end]) if last_end >= 0 else None
+            if row is not None:
+                end = tail_start + last_end + 1
+                break
+            # No whole row at the end: drop the last line and look at the one before
+            end = tail_start + line_start if last_end >= 0 else data_start
+            tail = tail[:end - tail_start]
+        if file.seek(0, os.SEEK_END) > end:
+            file.truncate(end)
+        last = row if end > data_start else None
+    return (first if last is not None else None), last
+
+
+def binary_tail(file_name: str):
+    """The first and last rows of a binary test file (None if it has none), and its metadata.
+
+    A record cut short is left for TestFileWriter to cut off when it appends.
+    """
+    try:
+        with testfile.TestFile(file_name) as test_file:
+            if test_file.columns and test_file.names != [name for name, _ in DATA_COLUMNS]:
+                raise RecoveryError(f"{file_name} does not have the columns of this version's data files.")
+            if not len(test_file):
+                return None, None, test_file.metadata
+            return test_file.row(0), test_file.row(-1), test_file.metadata
+    except testfile.TestFileError as e:
+        raise RecoveryError(str(e))
+
+
+def load_state(files: TestFiles):
+    """The test's checkpoint state and the last row of its data file."""
+    if not os.path.exists(files.data):
+        raise RecoveryError(f"{files.data} does not exist.")
+    metadata = {}
+    if files.binary:
+        first, last, metadata = binary_tail(files.data)
+    else:
+        first, last = repair_tail(files.data)
+    state = read_checkpoint(files.checkpoint) or metadata.get("test")
+    if state is None:
+        state = state_from_info(files, first)
+    return state, last
+
+
+def _store_rows(store: SampleStore, last_row):
+    """Rows of the store held in the data file (None if it lacks the file's last row) and rows to keep.
+
+    Rows after the data file's are kept up to the first that does not follow
+    on in time (pages a power cut lost read back as zeros).
+    """
+    n = len(store)
+    timestamps = store.view("timestamps")
+    elapsed = store.view("elapsed")
+    written = 0
+    if last_row is not None:
+        written = int(np.searchsorted(timestamps, last_row[0])) + 1
+        if written > n or timestamps[written - 1] != last_row[0] or elapsed[written - 1] != np.float32(last_row[1]):
+            return None, 0
+    start = max(written - 1, 0)
+    later = timestamps[start:n]
+    bad = np.flatnonzero(~(np.diff(later) > 0) | ~np.isfinite(later[1:]))
+    return written, (start + 1 + int(bad[0]) if bad.size else n)
+
+
+def load_samples(files: TestFiles, columns, csv_columns, same_as: dict = None) -> SampleStore:
+    """A new sample store for the test holding every row of its data file (replacing the store it had).
+
+    csv_columns: the store column of each data file column, in file order.
+    Other columns are NaN, or a copy of the column `same_as` maps them to.
+    """
+    store = SampleStore.create(files.samples, columns, replace=True)
+    same_as = same_as or {}
+    rows = 0
+    headers = [header for header, _ in DATA_COLUMNS]
+    for block in testfile.data_blocks(files.data):
+        stop = rows + len(block[headers[0]])
+        while store.capacity < stop:
+            store.grow()
+        for header, name in zip(headers, csv_columns):
+            store.array(name)[rows:stop] = block[header]
+        for name in store.names:
+            if name not in csv_columns:
+                source = same_as.get(name)
+                store.array(name)[rows:stop] = store.array(source)[rows:stop] if source else np.nan
+        rows = stop
+    store.commit(rows)
+    return store
+
+
+def resume_samples(files: TestFiles, columns, csv_columns, last_row, same_as: dict = None):
+    """The test's sample store, and how many of its rows the data file holds.
+
+    The existing store is used if it has `columns` and holds the data file's
+    last row; otherwise (no store, one of an older layout, or one that lost
+    rows in a power cut) it is rebuilt from the data file, see load_samples.
+    """
+    if os.path.isdir(files.samples):
+        try:
+            store = SampleStore.open(files.samples, readonly=False)
+        except (OSError, ValueError, KeyError):
+            store = None # unreadable description
+        if store is not None:
+            try:
+                store.check_columns(columns)
+                written, keep = _store_rows(store, last_row)
+            except ValueError:
+                written = None
+            if written is not None:
+                store.commit(keep)
+                return store, written
+            store.close()
+    store = load_samples(files, columns, csv_columns, same_as)
+    return store, len(store)
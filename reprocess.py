@@ -0,0 +1,195 @@
+"""Recompute a test's data file with a new calibration, streaming it in fixed-size chunks.
+
+    python reprocess.py NAME_data.csv --gauge-length 1.5 --displacement-slope 0.049 --thermocouple table
+
+Displacement, strain, true strain, strain rate and temperature are recomputed
+from the raw voltage columns with vectorized operations, one chunk of rows at
+a time, so memory stays constant whatever the length of the test. Files
+recorded before the raw voltages were kept can still get a new gauge length
+or first strain from their displacement column. The strain rate is fit the
+way the test fit it, as its info file records. The result is written to
+NAME_recal_data.csv and NAME_recal_info.csv unless -o is given.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import calibration
+import thermocouple
+from strain_rate import BLOCK_FILTERS
+from writer import DATA_COLUMNS, LINE_END, format_rows, read_chunks, read_info_lines
+
+ELAPSED = "Elapsed Time (s)"
+DISPLACEMENT = "Displacement (in)"
+STRAIN = "Engineering Strain"
+TRUE_STRAIN = "True Strain"
+STRAIN_RATE = "True Strain Rate (1/s)"
+TEMPERATURE = "Temperature (C)"
+DISPLACEMENT_VOLTAGE = "Displacement Voltage (V)"
+THERMOCOUPLE_VOLTAGE = "Thermocouple Voltage (V)"
+
+GAUGE_LENGTH_KEY = "Gauge Length (in)"
+CALIBRATION_KEY = "Displacement Calibration (in/V, in)"
+FIRST_VOLTAGE_KEY = "First Displacement Voltage (V)"
+STRAIN_RATE_FIT_KEY = "Strain Rate Fit"
+
+
+class Recalibration:
+    """The new calibration, and how each output column is derived from an input chunk."""
+    def __init__(self, headers, info, args):
+        self.columns = {name: i for i, name in enumerate(headers)}
+        missing = {ELAPSED, DISPLACEMENT, STRAIN, TRUE_STRAIN, STRAIN_RATE, TEMPERATURE} - set(self.columns)
+        if missing:
+            raise SystemExit(f"Data file lacks columns: {', '.join(sorted(missing))}")
+        raw_displacement = DISPLACEMENT_VOLTAGE in self.columns
+
+        # Calibration the file was recorded with, from its info file
+        old_slope, old_offset = calibration.DISPLACEMENT_SLOPE, calibration.DISPLACEMENT_OFFSET
+        if CALIBRATION_KEY in info:
+            old_slope, old_offset = (float(v) for v in info[CALIBRATION_KEY].split(","))
+        self.old_gauge_length = float(info[GAUGE_LENGTH_KEY]) if GAUGE_LENGTH_KEY in info else None
+
+        self.slope = old_slope if args.displacement_slope is None else args.displacement_slope
+        self.offset = old_offset if args.displacement_offset is None else args.displacement_offset
+        if (self.slope, self.offset) != (old_slope, old_offset) and not raw_displacement:
+            raise SystemExit("A new displacement calibration needs the raw displacement voltage column, "
+                             "which this file was recorded without.")
+        self.recalibrate = raw_displacement and (self.slope, self.offset) != (old_slope, old_offset)
+        self.gauge_length = args.gauge_length if args.gauge_length is not None else self.old_gauge_length
+        if self.gauge_length is None:
+            raise SystemExit("No gauge length in the info file; pass --gauge-length.")
+
+        self.first_strain = args.first_strain
+        self.first_voltage = args.first_displacement_voltage
+        if self.first_voltage is None and FIRST_VOLTAGE_KEY in info and info[FIRST_VOLTAGE_KEY] != "None":
+            self.first_voltage = float(info[FIRST_VOLTAGE_KEY])
+        self.old_calibration = (old_slope, old_offset)
+
+        self.thermocouple = args.thermocouple
+        if self.thermocouple != "keep" and THERMOCOUPLE_VOLTAGE not in self.columns:
+            print("No raw thermocouple voltage column, temperatures are kept as recorded.")
+            self.thermocouple = "keep"
+        self.table = thermocouple.LookupTable() if self.thermocouple == "table" else None
+        # Strain rate fit the live test used, from its info file ("savgol, 10 samples"); older files used a 10-point line
+        fit, window = "linear", 10
+        if STRAIN_RATE_FIT_KEY in info:
+            fit, _, samples = info[STRAIN_RATE_FIT_KEY].partition(", ")
+            try:
+                window = int(samples.split()[0])
+            except (IndexError, ValueError):
+                raise SystemExit(f"Unreadable {STRAIN_RATE_FIT_KEY} in the info file; pass --strain-rate-window.") from None
+        self.strain_rate_filter = args.strain_rate_filter or fit
+        self.strain_rate_window = args.strain_rate_window or window
+        if self.strain_rate_filter not in BLOCK_FILTERS:
+            raise SystemExit(f"Unknown strain rate fit {self.strain_rate_filter!r} in the info file; pass --strain-rate-filter.")
+        self.strain_rate = BLOCK_FILTERS[self.strain_rate_filter](self.strain_rate_window)
+        self.out_of_range = 0
+
+    def resolve_first_strain(self, chunk):
+        """First strain for the new calibration, from the recorded first voltage or backed out of the first row."""
+        if self.first_strain is not None:
+            return
+        if self.first_voltage is None:
+            if self.old_gauge_length is None:
+                raise SystemExit("No first displacement voltage or gauge length recorded; pass --first-strain.")
+            # strain = displacement / gauge_length - firstStrain held when the file was written
+            old_first = chunk[0, self.columns[DISPLACEMENT]] / self.old_gauge_length - chunk[0, self.columns[STRAIN]]
+            old_slope, old_offset = self.old_calibration
+            self.first_voltage = (old_first * self.old_gauge_length - old_offset) / old_slope
+        self.first_strain = calibration.displacement(self.first_voltage, self.slope, self.offset) / self.gauge_length
+
+    def apply(self, chunk):
+        """Recompute the derived columns of a chunk in place."""
+        c = self.columns
+        if self.recalibrate:
+            chunk[:, c[DISPLACEMENT]] = calibration.displacement(chunk[:, c[DISPLACEMENT_VOLTAGE]], self.slope, self.offset)
+        strain = calibration.engineering_strain(chunk[:, c[DISPLACEMENT]], self.gauge_length, self.first_strain)
+        chunk[:, c[STRAIN]] = strain
+        chunk[:, c[TRUE_STRAIN]] = calibration.true_strain(strain)
+        chunk[:, c[STRAIN_RATE]] = self.strain_rate.update(chunk[:, c[ELAPSED]], chunk[:, c[TRUE_STRAIN]])
+        if self.thermocouple != "keep":
+            mv = 1000 * chunk[:, c[THERMOCOUPLE_VOLTAGE]]
+            self.out_of_range += int(np.count_nonzero(thermocouple.out_of_range(mv)))
+            chunk[:, c[TEMPERATURE]] = self.table(mv) if self.table else thermocouple.to_celsius(mv)
+
+    def info_lines(self, pairs, source):
+        """Info file for the output: the original lines (read_info_lines), with the calibration that was applied."""
+        updated = {GAUGE_LENGTH_KEY: self.gauge_length, CALIBRATION_KEY: f"{self.slope}, {self.offset}"}
+        if self.first_voltage is not None:
+            updated[FIRST_VOLTAGE_KEY] = self.first_voltage
+        updated["First Strain"] = self.first_strain
+        updated[STRAIN_RATE_FIT_KEY] = f"{self.strain_rate_filter}, {self.strain_rate_window} samples"
+        updated["Reprocessed From"] = source
+
+        # Repeated keys (Period Log, Resume Gap) are copied through in order; updated keys take their first line
+        lines = []
+        written = set()
+        for key, value in pairs:
+            if key in updated:
+                if key in written:
+                    continue
+                value = updated[key]
+                written.add(key)
+            lines.append(f"{key}: {value}")
+        lines.extend(f"{key}: {value}" for key, value in updated.items() if key not in written)
+        return ["=" * 50] + lines + ["=" * 50]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute a creep test data file with a new calibration.")
+    parser.add_argument("data_file", help="NAME_data.csv written by creep-test.py")
+    parser.add_argument("-o", "--output", help="output data file (default NAME_recal_data.csv)")
+    parser.add_argument("--info", help="info file of the test (default NAME_info.csv)")
+    parser.add_argument("--gauge-length", type=float, help="gauge length (in), default from the info file")
+    parser.add_argument("--displacement-slope", type=float, help="transducer calibration slope (in/V)")
+    parser.add_argument("--displacement-offset", type=float, help="transducer calibration offset (in)")
+    parser.add_argument("--first-displacement-voltage", type=float,
+                        help="AI2 voltage the first strain is taken from, default from the info file")
+    parser.add_argument("--first-strain", type=float, help="first strain to subtract, overrides the voltage")
+    parser.add_argument("--thermocouple", choices=("poly", "table", "keep"), default="poly",
+                        help="recompute temperatures with the polynomials, the lookup table, or keep them")
+    parser.add_argument("--strain-rate-filter", choices=tuple(BLOCK_FILTERS),
+                        help="strain rate fit, default the one the test used (from the info file)")
+    parser.add_argument("--strain-rate-window", type=int, help="points in each strain rate fit, default from the info file")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="rows processed at a time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stem = args.data_file[:-len("_data.csv")] if args.data_file.endswith("_data.csv") else os.path.splitext(args.data_file)[0]
+    info_file = args.info or f"{stem}_info.csv"
+    output = args.output or f"{stem}_recal_data.csv"
+    output_stem = output[:-len("_data.csv")] if output.endswith("_data.csv") else os.path.splitext(output)[0]
+    info_pairs = read_info_lines(info_file)
+    info = dict(info_pairs)
+
+    start = time.perf_counter()
+    rows = 0
+    with open(args.data_file, newline="") as source, open(output, "w", newline="", buffering=1 << 20) as target:
+        headers = source.readline().rstrip("\r\n").split(",")
+        recal = Recalibration(headers, info, args)
+        formats = dict(DATA_COLUMNS)
+        row_formats = [formats.get(name, "%.17g") for name in headers]
+        target.write(",".join(headers) + LINE_END)
+        for chunk in read_chunks(source, args.chunk_rows):
+            if rows == 0:
+                recal.resolve_first_strain(chunk)
+            recal.apply(chunk)
+            target.write(format_rows(chunk.T, row_formats))
+            rows += len(chunk)
+
+    with open(f"{output_stem}_info.csv", "w", newline="") as file:
+        file.write("\n".join(recal.info_lines(info_pairs, os.path.basename(args.data_file))) + "\n")
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(args.data_file) / 1e6
+    print(f"Reprocessed {rows} rows in {seconds:.2f} s ({size / seconds:.1f} MB/s) into {output}")
+    if recal.out_of_range:
+        print(f"WARNING: {recal.out_of_range} thermocouple voltages out of range")
+
+
+if __name__ == "__main__":
+    main()
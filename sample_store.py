@@ -0,0 +1,172 @@
+"""Append-only columnar sample storage backed by memory-mapped files.
+
+A store is a directory holding one raw binary file per column, a small JSON
+description of the columns and an 8-byte file with the number of committed
+rows. Columns grow in fixed chunks by extending the files and mapping them
+again, so existing rows are never copied and views handed out earlier stay
+valid. Rows are written first and committed after, so after a crash the
+store reopens with every row up to the last commit.
+
+Only the newest rows need to stay in memory: release() lets the operating
+system drop the pages of older rows from the process, and they are read
+back from the files if they are used again. The store's resident memory
+then stays constant however long the test runs.
+"""
+import json
+import mmap
+import os
+
+import numpy as np
+
+COLUMNS_FILE = "columns.json"
+COUNT_FILE = "count.bin"
+
+
+class SampleStore:
+    """Columns of samples in memory-mapped files under `path`.
+
+    Use SampleStore.create() for a new store and SampleStore.open() for an
+    existing one (readonly=True for viewers such as the GUI).
+    """
+    HOT_ROWS = 1 << 16 # newest rows callers of release() keep resident
+
+    def __init__(self, path: str, columns, chunk_rows: int, readonly: bool):
+        self.path = path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.chunk_rows = int(chunk_rows)
+        self.readonly = readonly
+        self._mode = "r" if readonly else "r+"
+        self._count = np.memmap(os.path.join(path, COUNT_FILE), dtype=np.int64, mode=self._mode, shape=(1,))
+        self._maps = {}
+        self._arrays = {} # plain ndarray views of the maps, np.memmap slicing is slow
+        self.capacity = 0
+        self._map_columns(self._file_rows())
+
+    @classmethod
+    def create(cls, path: str, columns, chunk_rows: int = 1 << 16, replace: bool = False) -> "SampleStore":
+        """Create an empty store; raises FileExistsError if there is one at `path` already, unless `replace`."""
+        if not replace and os.path.exists(os.path.join(path, COLUMNS_FILE)):
+            raise FileExistsError(f"A sample store already exists at {path}.")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, COLUMNS_FILE), "w") as file:
+            json.dump({"chunk_rows": int(chunk_rows),
+                       "columns": [[name, np.dtype(dtype).str] for name, dtype in columns]}, file, indent=1)
+        with open(os.path.join(path, COUNT_FILE), "wb") as file:
+            file.write(np.zeros(1, dtype=np.int64).tobytes())
+        for name, dtype in columns:
+            with open(cls._column_file(path, name), "wb") as file:
+                file.truncate(int(chunk_rows) * np.dtype(dtype).itemsize)
+        return cls(path, columns, chunk_rows, readonly=False)
+
+    @classmethod
+    def open(cls, path: str, readonly: bool = True) -> "SampleStore":
+        """Open an existing store; only the column files are mapped, nothing is read."""
+        with open(os.path.join(path, COLUMNS_FILE)) as file:
+            desc = json.load(file)
+        return cls(path, [tuple(c) for c in desc["columns"]], desc["chunk_rows"], readonly)
+
+    @staticmethod
+    def _column_file(path, name):
+        return os.path.join(path, f"{name}.bin")
+
+    def _file_rows(self) -> int:
+        """Rows every column file has room for."""
+        return min(os.path.getsize(self._column_file(self.path, name)) // dtype.itemsize
+                   for name, dtype in self.columns)
+
+    def _map_columns(self, rows: int):
+        for name, dtype in self.columns:
+            self._maps[name] = np.memmap(self._column_file(self.path, name), dtype=dtype,
+                                         mode=self._mode, shape=(rows,))
+            self._arrays[name] = self._maps[name].view(np.ndarray)
+        self.capacity = rows
+
+    def __len__(self) -> int:
+        return int(self._count[0])
+
+    @property
+    def names(self):
+        return [name for name, _ in self.columns]
+
+    def check_columns(self, columns):
+        """Raise ValueError unless the store has exactly these columns, of these types."""
+        expected = [(name, np.dtype(dtype)) for name, dtype in columns]
+        if self.columns != expected:
+            raise ValueError(f"The sample store at {self.path} has other columns than this version's.")
+
+    def array(self, name: str) -> np.ndarray:
+        """The whole mapped column including uncommitted room (for the writer of the store)."""
+        return self._arrays[name]
+
+    def view(self, name: str, start: int = 0, stop: int = None) -> np.ndarray:
+        """Read-only, zero-copy view of committed rows [start:stop]."""
+        n = len(self)
+        stop = n if stop is None else min(stop, n)
+        view = self._arrays[name][start:stop]
+        view.flags.writeable = False
+        return view
+
+    def grow(self):
+        """Add one chunk of rows to every column. Existing rows stay where they are."""
+        if self.readonly:
+            raise ValueError("Store was opened read-only.")
+        rows = self.capacity + self.chunk_rows
+        for name, dtype in self.columns:
+            with open(self._column_file(self.path, name), "r+b") as file:
+                file.truncate(rows * dtype.itemsize)
+        self._map_columns(rows)
+
+    def commit(self, count: int):
+        """Mark the first `count` rows as complete."""
+        self._count[0] = count
+
+    def release(self, start: int, stop: int):
+        """Drop the pages of rows [start:stop] from this process's memory; the rows stay in the files.
+
+        Dirty pages are still written back, and rows used again are read back
+        in. Whole pages only; does nothing where madvise is not available.
+        """
+        start, stop = max(start, 0), min(stop, self.capacity)
+        if stop <= start or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        for name, dtype in self.columns:
+            mapped = getattr(self._maps.get(name), "_mmap", None) # the mmap under np.memmap
+            if mapped is None:
+                continue
+            first = start * dtype.itemsize // mmap.PAGESIZE * mmap.PAGESIZE
+            end = stop * dtype.itemsize // mmap.PAGESIZE * mmap.PAGESIZE
+            if end > first:
+                mapped.madvise(mmap.MADV_DONTNEED, first, end - first)
+
+    def refresh(self) -> int:
+        """For readers: pick up rows committed by the writer since the last call. Returns the row count."""
+        if len(self) > self.capacity:
+            self._map_columns(self._file_rows())
+        return len(self)
+
+    def flush(self):
+        """Write mapped pages to disk, columns before the row count.
+
+        Uses fsync on the files rather than np.memmap.flush: the mapping shares
+        the page cache with the file, and fsync releases the GIL while msync does not.
+        """
+        if self.readonly or not self._maps:
+            return
+        for name in self.names:
+            self._fsync(self._column_file(self.path, name))
+        self._fsync(os.path.join(self.path, COUNT_FILE))
+
+    @staticmethod
+    def _fsync(file_name):
+        fd = os.open(file_name, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Flush and drop this store's maps (views handed out earlier keep theirs)."""
+        self.flush()
+        self._maps.clear()
+        self._arrays.clear()
+        self._count = np.array([len(self)], dtype=np.int64)
@@ -0,0 +1,134 @@
+"""Deadline-based periodic task scheduling for acquisition."""
+import logging
+import math
+import time
+
+log = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """A function run every `period` seconds at absolute deadlines on the scheduler clock."""
+    def __init__(self, name: str, period: float, fn, deadline: float, group=None):
+        self.name = name
+        self.period = float(period)
+        self.fn = fn
+        self.deadline = deadline  # next time the task is due
+        self.group = group  # tasks sharing a group are removed together, see Scheduler.add
+
+        # Timing statistics
+        self.runs = 0
+        self.skipped = 0  # ticks dropped because the task fell a whole period behind
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.max_duration = 0.0  # longest run of fn, how long it can hold up the other tasks
+        self.total_duration = 0.0
+
+    @property
+    def mean_lateness(self) -> float:
+        return self.total_lateness / self.runs if self.runs else 0.0
+
+    @property
+    def mean_duration(self) -> float:
+        return self.total_duration / self.runs if self.runs else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.name}: {self.runs} runs, lateness mean {1000 * self.mean_lateness:.1f} ms "
+                f"max {1000 * self.max_lateness:.1f} ms, {self.skipped} skipped, "
+                f"run time max {1000 * self.max_duration:.1f} ms")
+
+
+class Scheduler:
+    """Runs periodic tasks on one thread, sleeping until each absolute deadline.
+
+    Deadlines advance by whole periods from the previous deadline, never from
+    the time a task actually ran, so lateness does not accumulate into drift.
+    A task that falls more than a period behind skips the missed ticks and
+    counts them instead of running them back to back.
+
+    `clock` needs monotonic() and sleep(): the time module, or a simulation.SimClock.
+    """
+    def __init__(self, clock=time, max_sleep: float = 0.1):
+        self.clock = clock
+        self.max_sleep = max_sleep  # longest single sleep, bounds how long a stop request waits
+        self.tasks = []
+        self.stopped = False
+
+    def add(self, name: str, period: float, fn, delay: float = 0.0, group=None) -> PeriodicTask:
+        """Schedule fn(task) every `period` seconds, first after `delay` seconds.
+
+        If fn returns False the scheduler stops. Tasks added with a `group`
+        (e.g. the tasks of one station sharing the scheduler with others) are
+        instead removed together, and the other tasks keep running; an
+        exception from a grouped task is logged and treated the same way.
+        Tasks are only added and removed on the thread running the scheduler.
+        """
+        if period <= 0:
+            raise ValueError(f"Period of {name} must be positive.")
+        task = PeriodicTask(name, period, fn, self.clock.monotonic() + delay, group)
+        self.tasks.append(task)
+        return task
+
+    def remove(self, group):
+        """Drop every task of a group."""
+        self.tasks = [task for task in self.tasks if task.group is not group]
+
+    def set_period(self, task: PeriodicTask, period: float):
+        """Change the period from the next tick on, keeping the phase of the last deadline."""
+        if period <= 0:
+            raise ValueError(f"Period of {task.name} must be positive.")
+        task.deadline += period - task.period
+        task.period = float(period)
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self, should_stop=lambda: False):
+        """Run tasks until stop() is called, should_stop() is true or a task returns False."""
+        self.stopped = False
+        while not (self.stopped or should_stop()):
+            if not self.tasks:
+                self.clock.sleep(self.max_sleep)
+                continue
+            task = min(self.tasks, key=lambda t: t.deadline)
+            if not self._sleep_until(task.deadline, should_stop):
+                break
+
+            now = self.clock.monotonic()
+            task.last_lateness = now - task.deadline
+            task.runs += 1
+            task.total_lateness += task.last_lateness
+            task.max_lateness = max(task.max_lateness, task.last_lateness)
+
+            try:
+                result = task.fn(task)
+            except Exception:
+                if task.group is None:
+                    raise
+                # A station's handler is the group of its tasks, and names the station
+                log.exception("Task %s of %s failed", task.name, getattr(task.group, "station", task.group))
+                result = False
+            duration = self.clock.monotonic() - now
+            task.total_duration += duration
+            task.max_duration = max(task.max_duration, duration)
+            if result is False:
+                if task.group is None:
+                    self.stopped = True
+                else:
+                    self.remove(task.group)
+
+            task.deadline += task.period
+            behind = math.floor((self.clock.monotonic() - task.deadline) / task.period)
+            if behind > 0:
+                task.deadline += behind * task.period
+                task.skipped += behind
+
+    def _sleep_until(self, deadline: float, should_stop) -> bool:
+        """Sleep until the deadline; returns False if a stop was requested meanwhile."""
+        while True:
+            if self.stopped or should_stop():
+                return False
+            remaining = deadline - self.clock.monotonic()
+            if remaining <= 0:
+                return True
+            self.clock.sleep(min(remaining, self.max_sleep))
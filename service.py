@@ -0,0 +1,302 @@
+"""Acquisition service: runs a TestHandler without a GUI and takes control messages over a local pipe.
+
+The service process owns the instruments, the sample store and the data
+files. A GUI attaches as a client: it sends control messages (connect,
+start, resume, stop, pause, set, status) and maps the sample store read-only, so the
+GUI can be closed and opened again during a test without the acquisition
+noticing. On Windows the pipe is a named pipe, elsewhere a Unix socket.
+
+Messages are (command, arguments) tuples and replies are ("ok", payload) or
+("error", message).
+
+Only the user who started the service can drive it: the socket lives in a
+directory only that user can open, and each service makes a new random
+key, which clients read from a file only that user can read (key_file).
+"""
+import collections
+import getpass
+import hashlib
+import logging
+import os
+import secrets
+import sys
+import tempfile
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from parameters import FIELDS, ParameterError
+
+log = logging.getLogger(__name__)
+
+
+def runtime_dir() -> str:
+    """A directory for the service's socket and key that only the current user can open."""
+    if sys.platform == "win32":
+        path = os.path.join(tempfile.gettempdir(), "creep-test") # the temp directory is per user on Windows
+    else:
+        path = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"creep-test-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if sys.platform != "win32":
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise ServiceError(f"{path} is not private to this user.")
+    return path
+
+
+def default_address() -> str:
+    if sys.platform == "win32":
+        return rf"\\.\pipe\creep-test-{getpass.getuser()}"
+    return os.path.join(runtime_dir(), "service.sock")
+
+
+def key_file(address: str) -> str:
+    """Where the service listening on `address` keeps its key."""
+    return os.path.join(runtime_dir(), hashlib.sha256(address.encode()).hexdigest()[:16] + ".key")
+
+
+def read_key(address: str) -> bytes:
+    try:
+        with open(key_file(address), "rb") as file:
+            return file.read()
+    except OSError as e:
+        raise ServiceError(f"No acquisition service at {address}: {e}")
+
+
+class ServiceError(Exception):
+    """The service refused a request or could not be reached."""
+
+
+class ServiceLog:
+    """Stands in for the GUI's UIQueue in the service: keeps the latest log lines for clients."""
+    def __init__(self, max_lines: int = 1000):
+        self.lines = collections.deque(maxlen=max_lines)
+        self.next_seq = 0 # sequence number of the next line
+        self._lock = threading.Lock()
+
+    def log(self, msg: str):
+        log.info(msg)
+        with self._lock:
+            self.lines.append((self.next_seq, msg))
+            self.next_seq += 1
+
+    def call(self, fn, *args):
+        fn(*args) # no widgets to protect
+
+    def since(self, seq: int):
+        """Lines logged from sequence number `seq` on, and the number to ask for next."""
+        with self._lock:
+            return [msg for n, msg in self.lines if n >= seq], self.next_seq
+
+
+class AcquisitionService:
+    """Serves control messages for a headless TestHandler, one thread per connected client."""
+    # Test parameters a client sends with "start" and gets back with "status", as text (see parameters.py)
+    TEST_FIELDS = FIELDS
+
+    def __init__(self, handler, address: str = None):
+        self.handler = handler
+        self.address = address or default_address()
+        self.log = ServiceLog()
+        handler.ui = self.log
+        self.connected = False
+        self.acquisition = None # future of the running cont_test
+        self._lock = threading.Lock() # one command at a time
+        self._listener = None
+        self._authkey = None
+        self._shutdown = False
+
+    @property
+    def running(self) -> bool:
+        return self.acquisition is not None and not self.acquisition.done()
+
+    def serve_forever(self):
+        """Serve clients until one sends shutdown, then close the listener and return."""
+        self._remove_stale_socket()
+        self._authkey = secrets.token_bytes(32)
+        self._listener = Listener(self.address, authkey=self._authkey)
+        if sys.platform != "win32":
+            os.chmod(self.address, 0o600) # an --address outside runtime_dir() is private too
+        # Written only now, so a service already on the address keeps its key
+        with open(os.open(key_file(self.address), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as file:
+            file.write(self._authkey)
+        log.info("Acquisition service listening on %s", self.address)
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e: # failed handshake
+                    if self._shutdown:
+                        break
+                    log.warning("Rejected connection: %s", e)
+                    continue
+                if self._shutdown:
+                    conn.close() # the wake-up connection from _wake
+                    break
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+            try:
+                os.remove(key_file(self.address))
+            except OSError:
+                pass
+
+    def _wake(self):
+        """Connect to the listener once, so accept() returns and sees _shutdown.
+
+        Closing a listening socket from another thread does not wake an accept()
+        blocked on it (on Linux it would wait for the next connection).
+        """
+        try:
+            Client(self.address, authkey=self._authkey).close()
+        except (OSError, EOFError, AuthenticationError):
+            pass
+
+    def _remove_stale_socket(self):
+        """A Unix socket file left by a service that died would block the address."""
+        if sys.platform == "win32" or not os.path.exists(self.address):
+            return
+        try:
+            key = read_key(self.address)
+        except ServiceError:
+            key = secrets.token_bytes(32)
+        try:
+            Client(self.address, authkey=key).close()
+        except AuthenticationError:
+            pass # something answers that does not know the key: still in use
+        except OSError:
+            os.remove(self.address)
+            return
+        raise ServiceError(f"Another service is already listening on {self.address}.")
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    command, args = conn.recv()
+                except (EOFError, OSError):
+                    return # client went away; the test carries on
+                do = getattr(self, f"do_{command}", None)
+                with self._lock:
+                    if self.acquisition is not None and self.acquisition.done():
+                        # finish_readings closed the instruments; the next test connects again
+                        self.connected = False
+                        self.acquisition = None
+                    try:
+                        if do is None:
+                            raise ServiceError(f"Unknown command {command!r}.")
+                        reply = ("ok", do(**args))
+                    except ServiceError as e:
+                        reply = ("error", str(e))
+                    except Exception as e:
+                        reply = ("error", f"{command} failed: {e}")
+                conn.send(reply)
+                if command == "shutdown":
+                    self._shutdown = True
+                    self._wake()
+                    return
+
+    # Commands ------------------------------------------------------------
+
+    def do_connect(self):
+        if not self.connected:
+            if not self.handler.open_instruments():
+                raise ServiceError("Could not open the instruments.")
+            self.connected = True
+        return self.do_status()
+
+    def do_start(self, **fields):
+        if self.running:
+            raise ServiceError("A test is already running.")
+        if not self.connected:
+            raise ServiceError("Instruments are not connected.")
+        handler = self.handler
+        try:
+            handler.test.update(**{name: value for name, value in fields.items() if name in self.TEST_FIELDS})
+        except ParameterError as e:
+            raise ServiceError(str(e))
+        if not handler.parameters_valid():
+            raise ServiceError("Please enter valid input.")
+        if not handler.begin_test():
+            raise ServiceError("Please prepare machine for test.")
+        handler.display("Test started.")
+        self.acquisition = handler.pool.submit(handler.cont_test)
+        return self.do_status()
+
+    def do_resume(self, data_file: str):
+        """Resume a test that stopped without finishing from its files (see recovery.py)."""
+        if self.running:
+            raise ServiceError("A test is already running.")
+        if not self.connected:
+            raise ServiceError("Instruments are not connected.")
+        handler = self.handler
+        if not handler.resume_test(data_file):
+            raise ServiceError(f"Could not resume the test from {data_file}.")
+        self.acquisition = handler.pool.submit(handler.cont_test)
+        return self.do_status()
+
+    def do_stop(self):
+        if self.running:
+            # The acquisition thread finishes its sample and final save, then closes the instruments
+            self.handler.stop_test()
+            self.acquisition.result()
+        return self.do_status()
+
+    def do_pause(self, paused: bool):
+        # Pausing freezes the plots; the service only remembers it for clients that attach later
+        self.handler.paused = paused
+        return self.do_status()
+
+    def do_set(self, **fields):
+        # A new period is taken up by the acquisition thread at its next check (see TestHandler.on_parameters)
+        try:
+            self.handler.test.update(**{name: value for name, value in fields.items() if name in self.TEST_FIELDS})
+        except ParameterError as e:
+            raise ServiceError(str(e))
+        return self.do_status()
+
+    def do_status(self, since: int = None):
+        handler = self.handler
+        store = getattr(handler, "store", None)
+        status = {
+            "connected": self.connected,
+            "running": self.running,
+            "paused": handler.paused,
+            "store": os.path.abspath(store.path) if store is not None else None,
+            "samples": len(store) if store is not None else 0,
+            "test": handler.test.params.texts(),
+            "analytics": handler.analytics_summary, # creep stage etc., see analytics.py
+        }
+        if since is not None:
+            status["log"], status["next_log"] = self.log.since(since)
+        return status
+
+    def do_shutdown(self):
+        self.do_stop()
+        return None
+
+
+class ServiceClient:
+    """Connection from a GUI to the acquisition service."""
+    def __init__(self, address: str = None):
+        self.address = address or default_address()
+        try:
+            self.conn = Client(self.address, authkey=read_key(self.address))
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise ServiceError(f"No acquisition service at {self.address}: {e}")
+        self._lock = threading.Lock() # requests come from the Tk thread and the poll thread
+
+    def request(self, command: str, **args):
+        """Send a command and return its reply payload; raises ServiceError if it was refused."""
+        with self._lock:
+            try:
+                self.conn.send((command, args))
+                kind, payload = self.conn.recv()
+            except (EOFError, OSError) as e:
+                raise ServiceError(f"Lost the acquisition service: {e}")
+        if kind == "error":
+            raise ServiceError(payload)
+        return payload
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,235 @@
+"""Shared instrument sessions: cached discovery, one lock per bus, bounded timeouts, retries and latency statistics.
+
+A SessionManager wraps the ResourceManager of an instrument backend (see
+instruments.py). It lists the resources once, hands out one Session per
+address however many times it is opened, and serializes every transfer on a
+GPIB board behind that board's lock. Sessions have the write/read/query
+interface of a pyvisa resource, so ChannelScan and overlapped_query use them
+unchanged. A read that times out or fails with an I/O error is retried: the
+instrument is cleared, the command sent again and the answer read again,
+after a short backoff that doubles each attempt. When the retries run out the
+read raises SessionError, so a stuck instrument costs a bounded amount of
+time instead of hanging acquisition.
+
+Every answered command adds its latency (command sent to answer read) to
+statistics kept per instrument and command, see SessionManager.summary.
+"""
+import logging
+import threading
+import time
+
+from instruments import bus_of
+from telemetry import REGISTRY
+
+log = logging.getLogger(__name__)
+
+
+class SessionError(Exception):
+    """An instrument could not be opened, or did not answer within the retries."""
+
+
+def transient_errors():
+    """Exception types worth a retry: timeouts and I/O errors from the OS and from pyvisa (if installed)."""
+    errors = [TimeoutError, OSError]
+    try:
+        from pyvisa.errors import VisaIOError
+    except ImportError:
+        pass
+    else:
+        errors.append(VisaIOError)
+    return tuple(errors)
+
+
+class LatencyStats:
+    """Latency of one command on one instrument, kept in the telemetry registry."""
+    SMOOTHING = 0.01 # weight of the newest answer in the recent mean (about the last 100)
+
+    def __init__(self, address: str, command: str):
+        labels = {"instrument": address, "command": command}
+        self.histogram = REGISTRY.histogram("query_latency_seconds", "Command sent to answer read", **labels)
+        self.retries = REGISTRY.counter("query_retries_total", "Reads retried after a timeout or I/O error", **labels)
+        self.failures = REGISTRY.counter("query_failures_total", "Reads that failed every retry", **labels)
+        self.recent = None # exponentially weighted mean of the latest answers
+
+    def add(self, seconds: float):
+        self.histogram.record(seconds)
+        self.recent = seconds if self.recent is None else self.recent + self.SMOOTHING * (seconds - self.recent)
+
+    @property
+    def count(self) -> int:
+        return self.histogram.count
+
+    @property
+    def mean(self) -> float:
+        return self.histogram.mean if self.histogram.count else 0.0
+
+    @property
+    def degraded(self) -> bool:
+        """True when the latest answers are coming back much slower than the average."""
+        return self.count >= 100 and self.recent > 2 * self.mean
+
+
+class Session:
+    """An open instrument: pyvisa-style write/read/query with the bus lock, retries and latency accounting."""
+    def __init__(self, manager: "SessionManager", address: str, resource):
+        self.manager = manager
+        self.address = address
+        self.resource = resource
+        self.lock = manager.bus_lock(address)
+        self.is_open = True
+        self._pending = None # (command, time sent) awaiting read()
+
+    def write(self, command: str):
+        self._attempt(command, lambda: self.resource.write(command))
+        self._pending = (command, self.manager.clock.monotonic())
+
+    def read(self) -> str:
+        if self._pending is None:
+            raise SessionError(f"{self.address}: read without a command.")
+        command, sent = self._pending
+        self._pending = None
+        response = self._attempt(command, self.resource.read, resend=True)
+        self.manager.stats(self.address, command).add(self.manager.clock.monotonic() - sent)
+        return response
+
+    def query(self, command: str) -> str:
+        self.write(command)
+        return self.read()
+
+    def fit_timeout(self, period: float):
+        """Shorten the timeout so a read and all its retries take at most half a sample period.
+
+        The timeout is kept above MIN_TIMEOUT and a few times the instrument's
+        usual latency, so only an instrument that is really stuck times out.
+        """
+        manager = self.manager
+        timeout = min(manager.timeout, period / (2 * (manager.retries + 1)))
+        usual = max((stats.mean for (address, _), stats in list(manager.latency.items()) if address == self.address), default=0.0)
+        timeout = max(timeout, manager.MIN_TIMEOUT, 4 * usual)
+        with self.lock:
+            self.resource.timeout = int(1000 * timeout)
+
+    def _attempt(self, command: str, operation, resend: bool = False):
+        """Run operation under the bus lock, retrying transient errors with backoff."""
+        manager = self.manager
+        for attempt in range(manager.retries + 1):
+            if not self.is_open:
+                raise SessionError(f"{self.address} is closed.")
+            try:
+                with self.lock:
+                    if attempt and resend:
+                        # Drop whatever the first try left behind and ask again
+                        self._clear()
+                        self.resource.write(command)
+                    return operation()
+            except manager.transient as e:
+                stats = manager.stats(self.address, command)
+                if attempt == manager.retries:
+                    stats.failures.inc()
+                    raise SessionError(f"{self.address} did not answer {command!r} after {attempt + 1} tries: {e}") from e
+                stats.retries.inc()
+                log.warning("%s %r: %s, retrying", self.address, command, e)
+                manager.clock.sleep(manager.backoff * 2 ** attempt)
+
+    def _clear(self):
+        """Device clear, where the backend has it."""
+        clear = getattr(self.resource, "clear", None)
+        if clear is not None:
+            clear()
+
+    def close(self):
+        """Close the instrument; waits for a transfer in progress on the bus to finish."""
+        with self.lock:
+            if self.is_open:
+                self.is_open = False
+                self.resource.close()
+        self.manager.forget(self)
+
+
+class SessionManager:
+    """One backend ResourceManager with its discovered resources and open sessions, shared by every test using it."""
+    TIMEOUT = 1.0 # seconds an instrument gets to answer
+    MIN_TIMEOUT = 0.1 # shortest timeout Session.fit_timeout sets
+    RETRIES = 2 # further tries after a timeout or I/O error
+    BACKOFF = 0.02 # seconds before the first retry, doubling after each
+    READ_TERMINATION = "\r\n" # what the HP 3497A and Fluke 8440A end their answers with
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, resource_manager, clock=time) -> "SessionManager":
+        """The manager for a backend factory, created on first use."""
+        with cls._shared_lock:
+            if resource_manager not in cls._shared:
+                cls._shared[resource_manager] = cls(resource_manager, clock)
+            return cls._shared[resource_manager]
+
+    def __init__(self, resource_manager, clock=time):
+        self.factory = resource_manager
+        self.clock = clock
+        self.timeout = self.TIMEOUT
+        self.retries = self.RETRIES
+        self.backoff = self.BACKOFF
+        self.transient = transient_errors()
+        self.rm = None
+        self.discovered = None
+        self.sessions = {}
+        self.latency = {} # (address, command) -> LatencyStats
+        self._locks = {}
+        self._lock = threading.RLock() # guards the dicts above
+
+    def resources(self, refresh: bool = False):
+        """The backend's resources, listed on first use only (listing can take seconds on GPIB)."""
+        with self._lock:
+            if self.rm is None:
+                self.rm = self.factory()
+            if self.discovered is None or refresh:
+                self.discovered = tuple(self.rm.list_resources())
+            return self.discovered
+
+    def open(self, address: str) -> Session:
+        """The session for an address, opened with the manager's timeout if it is not open yet."""
+        if address not in self.resources():
+            self.resources(refresh=True) # may have been switched on since it was listed
+        with self._lock:
+            session = self.sessions.get(address)
+            if session is not None and session.is_open:
+                return session
+            resource = self.rm.open_resource(address)
+            resource.timeout = int(1000 * self.timeout) # pyvisa takes ms
+            resource.read_termination = self.READ_TERMINATION
+            session = self.sessions[address] = Session(self, address, resource)
+            return session
+
+    def forget(self, session: Session):
+        with self._lock:
+            if self.sessions.get(session.address) is session:
+                del self.sessions[session.address]
+
+    def bus_lock(self, address: str):
+        """Lock held for each transfer on the address's bus."""
+        with self._lock:
+            return self._locks.setdefault(bus_of(address), threading.RLock())
+
+    def stats(self, address: str, command: str) -> LatencyStats:
+        key = (address, command)
+        stats = self.latency.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.latency.setdefault(key, LatencyStats(address, command))
+        return stats
+
+    def summary(self, addresses=None):
+        """One line per instrument and command: answers, latency, retries and failures."""
+        lines = []
+        for (address, command), stats in sorted(self.latency.items()):
+            if addresses is not None and address not in addresses:
+                continue
+            line = (f"{address} {command!r}: {stats.count} answers, latency mean {1000 * stats.mean:.1f} ms "
+                    f"recent {1000 * (stats.recent or 0.0):.1f} ms p99 {1000 * stats.histogram.percentile(0.99):.1f} ms "
+                    f"max {1000 * stats.histogram.max:.1f} ms, {stats.retries.value} retries, {stats.failures.value} failures")
+            if stats.degraded:
+                line += " (slowing down)"
+            lines.append(line)
+        return lines
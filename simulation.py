@@ -0,0 +1,344 @@
+"""Simulated HP 3497A / Fluke 8440A bench for running the creep test without GPIB hardware.
+
+SimulatedBench stands in for a pyvisa ResourceManager. The instruments it
+opens answer the same commands as the real ones (AI0/AI1/AI2, VC3 and ?),
+follow a configurable creep curve with noise, take a configurable time per
+conversion and bus transfer, and drop the status signal at the end of the test.
+
+All simulated time comes from a SimClock, which can run faster than the wall
+clock (or purely virtually) so days of a test can be replayed in minutes.
+"""
+from dataclasses import dataclass, field
+import math
+import re
+import threading
+import time
+
+import numpy as np
+
+from instruments import DAQ_ADDRESS, VOLTMETER_ADDRESS
+
+
+class SimClock:
+    """Clock with the time()/monotonic()/sleep() interface of the time module.
+
+    With a speedup the clock follows the wall clock, `speedup` times faster.
+    With speedup=None it is virtual: time only moves when sleep() is called,
+    which is only meaningful for code that sleeps instead of polling.
+    """
+    def __init__(self, speedup: float = 1.0, start: float = None):
+        if speedup is not None and speedup <= 0:
+            raise ValueError("speedup must be positive (or None for a virtual clock).")
+        self.speedup = speedup
+        self.origin = time.time() if start is None else start
+        self._real_start = time.perf_counter()
+        self._virtual = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        if self.speedup is None:
+            return self._virtual
+        return (time.perf_counter() - self._real_start) * self.speedup
+
+    perf_counter = monotonic
+
+    def time(self) -> float:
+        return self.origin + self.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        if self.speedup is None:
+            with self._lock:
+                self._virtual += seconds
+        else:
+            time.sleep(seconds / self.speedup)
+
+
+@dataclass
+class CreepCurve:
+    """Displacement transducer voltage (AI2) over a test, as a function of seconds since loading.
+
+    Primary creep saturates exponentially, secondary creep is linear and
+    tertiary creep grows exponentially from `tertiary_start` until rupture.
+    """
+    initial: float = 2.0              # V before the load is applied
+    primary: float = 0.4              # V gained during primary creep
+    primary_tau: float = 2 * 3600.0   # s
+    secondary_rate: float = 1e-6      # V/s
+    tertiary_start: float = None      # s, None for no tertiary stage
+    tertiary_tau: float = 6 * 3600.0  # s
+
+    def voltage(self, t: float) -> float:
+        if t <= 0:
+            return self.initial
+        v = self.initial + self.primary * (1 - math.exp(-t / self.primary_tau)) + self.secondary_rate * t
+        if self.tertiary_start is not None and t > self.tertiary_start:
+            # Continues the secondary slope smoothly, capped so exp() cannot overflow
+            x = min((t - self.tertiary_start) / self.tertiary_tau, 50.0)
+            v += self.secondary_rate * self.tertiary_tau * (math.expm1(x) - x)
+        return v
+
+
+@dataclass
+class Thermocouple:
+    """Type K thermocouple output in mV (about 20.6 mV at 500 C), with a slow sinusoidal drift."""
+    millivolts: float = 20.6
+    drift: float = 0.02          # mV amplitude
+    drift_period: float = 3600.0 # s
+
+    def millivolts_at(self, t: float) -> float:
+        return self.millivolts + self.drift * math.sin(2 * math.pi * t / self.drift_period)
+
+
+@dataclass
+class Latency:
+    """A simulated delay in seconds."""
+    mean: float = 0.02
+    jitter: float = 0.005  # standard deviation
+
+    def sample(self, rng: np.random.Generator) -> float:
+        if self.jitter <= 0:
+            return self.mean
+        return max(0.0, rng.normal(self.mean, self.jitter))
+
+
+class SimulatedInstrument:
+    """Base for the simulated instruments: shares the bus lock and clock of its bench.
+
+    A query command starts a conversion when it is written; read() waits for
+    the conversion to finish and then transfers the answer. Conversions on
+    different instruments overlap, bus transfers do not.
+    """
+    QUERIES = ()
+
+    def __init__(self, bench: "SimulatedBench", address: str):
+        self.bench = bench
+        self.address = address
+        self.clock = bench.clock
+        self.rng = bench.rng
+        self.timeout = 2000  # ms, kept for pyvisa compatibility
+        self.is_open = True
+        self.queries = 0
+        self._pending = None  # (value, time the conversion is done)
+
+    def _transfer(self):
+        """Hold the bus for one command or response transfer."""
+        if not self.is_open:
+            raise ValueError(f"{self.address} is closed.")
+        self.clock.sleep(self.bench.transfer_latency.sample(self.rng))
+
+    def write(self, command: str):
+        command = command.strip()
+        with self.bench.bus:
+            self._transfer()
+            answer = self.handle_command(command)
+            if answer is not None:
+                # Every channel after the first adds its own conversion time
+                count = len(answer) if isinstance(answer, list) else 1
+                conversion = self.bench.query_latency.sample(self.rng) + (count - 1) * self.bench.channel_time
+                self._pending = (answer, self.clock.monotonic() + conversion)
+        return len(command)
+
+    def read(self) -> str:
+        if self._pending is None:
+            raise ValueError(f"{self.address} has no answer pending.")
+        value, ready = self._pending
+        self._pending = None
+        if self.bench.fault_rate and self.rng.random() < self.bench.fault_rate:
+            # The answer never comes: the read waits out the timeout, as a pyvisa read would
+            self.clock.sleep(self.timeout / 1000)
+            raise TimeoutError(f"{self.address} timed out.")
+        self.clock.sleep(ready - self.clock.monotonic())  # still converting
+        with self.bench.bus:
+            self._transfer()
+            self.queries += 1
+        if isinstance(value, list):
+            return ",".join(f"{v:+.5E}" for v in value) + "\r\n"
+        return f"{value:+.5E}\r\n"
+
+    def query(self, command: str) -> str:
+        self.write(command)
+        return self.read()
+
+    def handle_command(self, command: str):
+        """Act on a command; returns the answer to read back, or None if there is none."""
+        if command in self.QUERIES:
+            return self.handle_query(command)
+        self.handle_write(command)
+        return None
+
+    def handle_write(self, command: str):
+        raise ValueError(f"{self.address} does not accept {command!r}.")
+
+    def handle_query(self, command: str) -> float:
+        raise ValueError(f"{self.address} does not answer {command!r}.")
+
+    def clear(self):
+        """Device clear: forget the pending answer."""
+        self._pending = None
+
+    def close(self):
+        self.is_open = False
+
+
+class SimulatedDAQ(SimulatedInstrument):
+    """HP 3497A: AI0 status, AI1 thermocouple, AI2 displacement, VC3 current output on.
+
+    Commands can be chained ("VC3AF0AL2AS"). AFn/ALn set the first and last
+    channel of a scan and AS scans them, answering one reading per channel.
+    """
+    QUERIES = ("AI0", "AI1", "AI2")
+    TOKEN = re.compile(r"([A-Z]{2})(\d*)")
+
+    def __init__(self, bench: "SimulatedBench", address: str):
+        super().__init__(bench, address)
+        self.first = self.last = 0
+
+    def handle_command(self, command: str):
+        answer = None
+        tokens = self.TOKEN.findall(command)
+        if "".join(op + arg for op, arg in tokens) != command.replace(" ", ""):
+            raise ValueError(f"{self.address} does not accept {command!r}.")
+        for op, arg in tokens:
+            if op == "AI":
+                answer = self.handle_query(op + arg)
+            elif op == "AF":
+                self.first = int(arg)
+            elif op == "AL":
+                self.last = int(arg)
+            elif op == "AS":
+                answer = [self.handle_query(f"AI{ch}") for ch in range(self.first, self.last + 1)]
+            else:
+                self.handle_write(op + arg)
+        return answer
+
+    def handle_write(self, command: str):
+        if command == "VC3":
+            self.bench.load()
+        else:
+            super().handle_write(command)
+
+    def handle_query(self, command: str) -> float:
+        bench = self.bench
+        if command == "AI0":
+            return bench.status_voltage() + self.rng.normal(0, bench.status_noise)
+        if command == "AI1":
+            return bench.thermocouple_volts()
+        if command == "AI2":
+            return bench.curve.voltage(bench.test_time()) + self.rng.normal(0, bench.displacement_noise)
+        return super().handle_query(command)
+
+
+class SimulatedVoltmeter(SimulatedInstrument):
+    """Fluke 8440A reading the thermocouple in volts on `?`."""
+    QUERIES = ("?",)
+
+    def handle_query(self, command: str) -> float:
+        if command == "?":
+            return self.bench.thermocouple_volts()
+        return super().handle_query(command)
+
+
+@dataclass
+class SimulatedBench:
+    """Drop-in replacement for pyvisa.ResourceManager serving a simulated DAQ and voltmeter.
+
+    The test clock starts when the DAQ receives VC3. The status signal (AI0)
+    reads `status_level` volts from then on and drops to 0 V `end_after`
+    seconds into the test, as it does when the specimen ruptures.
+    """
+    clock: SimClock = None
+    curve: CreepCurve = field(default_factory=CreepCurve)
+    thermocouple: Thermocouple = field(default_factory=Thermocouple)
+    query_latency: Latency = field(default_factory=Latency)  # conversion time after a query command
+    transfer_latency: Latency = field(default_factory=lambda: Latency(0.003, 0.0005))  # bus time per transfer
+    channel_time: float = 0.005        # s of conversion for each extra channel in a scan
+    displacement_noise: float = 2e-4   # V standard deviation on AI2
+    temperature_noise: float = 2e-3    # mV standard deviation on the thermocouple
+    status_noise: float = 1e-5         # V standard deviation on AI0
+    status_level: float = 5.0          # V on AI0 while the machine is loaded
+    end_after: float = None            # s into the test when the status signal drops
+    fault_rate: float = 0.0            # fraction of reads that time out
+    seed: int = 0
+    daq_address: str = DAQ_ADDRESS
+    voltmeter_address: str = VOLTMETER_ADDRESS
+    bus: object = None                 # lock shared by the benches of a SimulatedLab
+
+    def __post_init__(self):
+        if self.clock is None:
+            self.clock = SimClock()
+        self.rng = np.random.default_rng(self.seed)
+        if self.bus is None:
+            self.bus = threading.RLock()  # one GPIB bus, one transaction at a time
+        self.loaded_at = None
+        self.instruments = {
+            self.daq_address: SimulatedDAQ(self, self.daq_address),
+            self.voltmeter_address: SimulatedVoltmeter(self, self.voltmeter_address),
+        }
+
+    # pyvisa ResourceManager interface
+    def list_resources(self):
+        return tuple(self.instruments)
+
+    def open_resource(self, address: str):
+        try:
+            instrument = self.instruments[address]
+        except KeyError:
+            raise ValueError(f"No simulated instrument at {address}.") from None
+        instrument.is_open = True
+        return instrument
+
+    def close(self):
+        for instrument in self.instruments.values():
+            instrument.close()
+
+    # signal models
+    def load(self):
+        if self.loaded_at is None:
+            self.loaded_at = self.clock.monotonic()
+
+    def test_time(self) -> float:
+        if self.loaded_at is None:
+            return 0.0
+        return self.clock.monotonic() - self.loaded_at
+
+    def status_voltage(self) -> float:
+        if self.loaded_at is None:
+            return 0.0
+        if self.end_after is not None and self.test_time() >= self.end_after:
+            return 0.0
+        return self.status_level
+
+    def thermocouple_volts(self) -> float:
+        mv = self.thermocouple.millivolts_at(self.test_time()) + self.rng.normal(0, self.temperature_noise)
+        return mv / 1000
+
+
+class SimulatedLab:
+    """ResourceManager for several simulated stations, one SimulatedBench each.
+
+    Stations on the same GPIB board share its bus lock, so their transfers
+    queue behind each other as they would on the real bus.
+    """
+    def __init__(self, addresses, clock: SimClock = None, **options):
+        self.clock = clock if clock is not None else SimClock()
+        buses = {}
+        self.benches = []
+        for seed, (daq, voltmeter) in enumerate(addresses):
+            bus = buses.setdefault(daq.split("::")[0], threading.RLock())
+            self.benches.append(SimulatedBench(clock=self.clock, seed=seed, daq_address=daq,
+                                               voltmeter_address=voltmeter, bus=bus, **options))
+
+    def list_resources(self):
+        return tuple(address for bench in self.benches for address in bench.instruments)
+
+    def open_resource(self, address: str):
+        for bench in self.benches:
+            if address in bench.instruments:
+                return bench.open_resource(address)
+        raise ValueError(f"No simulated instrument at {address}.")
+
+    def close(self):
+        for bench in self.benches:
+            bench.close()
@@ -0,0 +1,141 @@
+"""Multi-station acquisition: several creep frames on shared GPIB buses, driven from one process.
+
+Every station is a TestHandler with its own Test, sample store, writer and
+plot. The stations on one GPIB board share a BusScheduler, a single thread
+running all their sample, check and save tasks at absolute deadlines: only
+one transaction is on the bus at a time, and since deadlines advance by
+whole periods no station's sampling drifts however busy the bus is. A
+station that starts is phased into the middle of the widest gap between the
+sample deadlines already on its bus.
+
+A task is only ever held up by tasks that started before its deadline, so
+while the bus has time to spare a sample is at most one run of every other
+task on the bus late, plus the operating system's timer jitter.
+timing_report() gives that bound for each station next to its measured
+lateness.
+"""
+import collections
+import logging
+import threading
+
+from instruments import bus_of
+from scheduler import Scheduler
+
+log = logging.getLogger(__name__)
+
+
+class BusScheduler:
+    """Runs the acquisition tasks of every station on one GPIB bus, on one thread."""
+    SUPERVISE_PERIOD = 0.25 # seconds between picking up started and stopped stations
+    REPORT_PERIOD = 600 # seconds between timing reports on stdout
+
+    def __init__(self, name: str, clock):
+        self.name = name
+        self.clock = clock
+        self.scheduler = Scheduler(clock)
+        self.stations = [] # handlers whose tasks are on the bus
+        self.control = collections.deque() # calls for the bus thread, see call
+        self.scheduler.add("supervise", self.SUPERVISE_PERIOD, self.supervise)
+        self.scheduler.add("report", self.REPORT_PERIOD, self.report, delay=self.REPORT_PERIOD)
+        self.thread = threading.Thread(target=self.scheduler.run, name=f"bus {name}", daemon=True)
+
+    def call(self, fn):
+        """Run fn(scheduler) on the bus thread within SUPERVISE_PERIOD (safe from any thread)."""
+        self.control.append(fn)
+
+    def start(self, handler):
+        """Put the tasks of a station whose test has begun on the bus."""
+        self.call(lambda scheduler: self._add_station(handler))
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def _add_station(self, handler):
+        handler.add_tasks(self.scheduler, delay=self.phase(handler.period), group=handler)
+        self.stations.append(handler)
+        log.info("%s on %s: first sample in %.3f s", handler.station, self.name, handler.sample_task.deadline - self.clock.monotonic())
+
+    def phase(self, period: float) -> float:
+        """Delay before a new station's first sample, in the widest gap between the sample deadlines on the bus."""
+        now = self.clock.monotonic()
+        offsets = sorted((task.deadline - now) % period for task in self.scheduler.tasks if task.name == "sample")
+        if not offsets:
+            return 0.0
+        gaps = [(end - start, start) for start, end in zip(offsets, offsets[1:] + [offsets[0] + period])]
+        width, start = max(gaps)
+        return (start + width / 2) % period
+
+    def supervise(self, task):
+        """Add the stations that started and retire the ones that stopped."""
+        while self.control:
+            self.control.popleft()(self.scheduler)
+        for handler in list(self.stations):
+            active = any(t.group is handler for t in self.scheduler.tasks)
+            if active and handler.is_running and not handler.request_stop:
+                continue
+            self.scheduler.remove(handler)
+            self.stations.remove(handler)
+            if not handler.request_stop:
+                # One of its tasks failed (see Scheduler.add); the other stations carry on
+                handler.display("Acquisition failed, test stopped.")
+                handler.stop_test()
+            # Closing the writer waits for the disk, so it is done off the bus thread
+            handler.pool.submit(handler.finish_readings)
+
+    def report(self, task):
+        log.info("\n".join(self.timing_report()))
+
+    def utilization(self, tasks=None) -> float:
+        """Fraction of the bus thread's time the tasks take on average."""
+        tasks = list(self.scheduler.tasks) if tasks is None else tasks
+        return sum(t.mean_duration / t.period for t in tasks)
+
+    def summary(self) -> str:
+        return f"{self.name}: {len(self.stations)} stations, bus utilization {100 * self.utilization():.0f}%"
+
+    def station_timing(self, handler) -> str:
+        """Measured sample lateness of a station against its worst-case bound."""
+        tasks = list(self.scheduler.tasks)
+        sample = handler.sample_task
+        # Worst case: the sample comes due just after every other task started a run
+        bound = sum(t.max_duration for t in tasks if t is not sample)
+        guaranteed = self.utilization(tasks) < 1 and bound < sample.period
+        return (f"{handler.station}: period {sample.period:g} s, lateness mean {1000 * sample.mean_lateness:.1f} ms "
+                f"max {1000 * sample.max_lateness:.1f} ms, bound {1000 * bound:.1f} ms"
+                f"{'' if guaranteed else ' (bus overloaded)'}, {sample.skipped} skipped")
+
+    def timing_report(self):
+        return [self.summary()] + ["  " + self.station_timing(handler) for handler in list(self.stations)]
+
+
+class StationGroup:
+    """The stations of a multi-station run, and a BusScheduler for each GPIB board they are on."""
+    def __init__(self):
+        self.handlers = []
+        self.buses = {}
+
+    def add(self, handler):
+        """Give a handler the bus scheduler of its instruments, and a station name if it has none."""
+        name = bus_of(handler.daq_address)
+        if bus_of(handler.voltmeter_address) != name:
+            raise ValueError(f"The DAQ and voltmeter of a station must be on one bus ({handler.daq_address}, {handler.voltmeter_address}).")
+        if name not in self.buses:
+            self.buses[name] = BusScheduler(name, handler.clock)
+            self.buses[name].thread.start()
+        self.handlers.append(handler)
+        if handler.station is None:
+            handler.station = f"Station {len(self.handlers)}"
+        handler.bus = self.buses[name]
+        handler.group = self
+
+    def name_in_use(self, handler) -> bool:
+        """True if another station has run a test with the handler's test name (its files would be overwritten)."""
+        return any(other is not handler and other.testStarted and other.test.params.name == handler.test.params.name
+                   for other in self.handlers)
+
+    def timing_report(self):
+        return [line for bus in self.buses.values() for line in bus.timing_report()]
+
+    def close(self):
+        for bus in self.buses.values():
+            bus.stop()
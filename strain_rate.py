@@ -0,0 +1,250 @@
+"""Streaming strain-rate estimation for the creep test.
+
+The live strain rate is the slope of a straight line through the last
+`window` samples (RollingSlope), or, with the "savgol" filter, of a
+Savitzky-Golay quadratic (SavitzkyGolaySlope), which follows a changing
+rate with less lag for the same window. BlockSlope and
+BlockSavitzkyGolaySlope compute the same slopes for a whole block of samples
+at a time, for reprocess.py.
+"""
+import numpy as np
+
+
+class RollingSlope:
+    """Least-squares slope over the last `window` samples, updated in O(1) per sample.
+
+    Keeps running sums of x, y, x*x and x*y for the samples currently in the
+    window. The sums are taken relative to an origin inside the window so the
+    products stay small even after weeks of elapsed time, and they are rebuilt
+    from the ring buffer once every `window` updates to stop rounding error
+    from accumulating.
+    """
+    def __init__(self, window: int = 10):
+        if window < 2:
+            raise ValueError("Strain rate window must hold at least 2 samples.")
+        self.window = int(window)
+        self._t = np.zeros(self.window, dtype=np.float64)
+        self._y = np.zeros(self.window, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """Forget every sample."""
+        self._head = 0   # slot the next sample is written to
+        self._count = 0  # samples currently in the window
+        self._updates = 0
+        self._t0 = 0.0
+        self._y0 = 0.0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self.slope = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def update(self, t: float, y: float) -> float:
+        """Add the sample (t, y), drop the oldest one if the window is full and return the slope."""
+        t = float(t)
+        y = float(y)
+        if self._count == 0:
+            self._t0, self._y0 = t, y
+
+        if self._count == self.window:
+            # Oldest sample leaves the window
+            x_old = self._t[self._head] - self._t0
+            v_old = self._y[self._head] - self._y0
+            self._sx -= x_old
+            self._sy -= v_old
+            self._sxx -= x_old * x_old
+            self._sxy -= x_old * v_old
+        else:
+            self._count += 1
+
+        self._t[self._head] = t
+        self._y[self._head] = y
+        self._head = (self._head + 1) % self.window
+
+        x = t - self._t0
+        v = y - self._y0
+        self._sx += x
+        self._sy += v
+        self._sxx += x * x
+        self._sxy += x * v
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._rebase()
+
+        self.slope = self._solve()
+        return self.slope
+
+    def _rebase(self):
+        """Recompute the sums exactly, relative to the oldest sample in the window."""
+        n = self._count
+        oldest = (self._head - n) % self.window
+        idx = (oldest + np.arange(n)) % self.window
+        t = self._t[idx]
+        y = self._y[idx]
+        self._t0, self._y0 = t[0], y[0]
+        x = t - self._t0
+        v = y - self._y0
+        self._sx = float(x.sum())
+        self._sy = float(v.sum())
+        self._sxx = float(np.dot(x, x))
+        self._sxy = float(np.dot(x, v))
+        self._updates = 0
+
+    def _solve(self) -> float:
+        n = self._count
+        if n < 2:
+            return 0.0
+        denom = n * self._sxx - self._sx * self._sx
+        if denom <= 0.0:
+            # All samples share one timestamp, slope is undefined
+            return 0.0
+        return (n * self._sxy - self._sx * self._sy) / denom
+
+
+class BlockSlope:
+    """The same slopes as RollingSlope, computed a block of samples at a time with NumPy.
+
+    Keeps the last window-1 samples between blocks, so feeding a series in
+    blocks of any size gives the slopes RollingSlope would give sample by
+    sample. Each slope is fit with the window's times and values centred on
+    their means, which keeps it accurate at any elapsed time.
+    """
+    def __init__(self, window: int = 10):
+        if window < 2:
+            raise ValueError("Strain rate window must hold at least 2 samples.")
+        self.window = int(window)
+        self._t = np.empty(0, dtype=np.float64)
+        self._y = np.empty(0, dtype=np.float64)
+
+    def update(self, t, y) -> np.ndarray:
+        """Slopes for each sample of the block (t, y), continuing from the previous block."""
+        t = np.concatenate((self._t, np.asarray(t, dtype=np.float64)))
+        y = np.concatenate((self._y, np.asarray(y, dtype=np.float64)))
+        history = self._t.size
+        slopes = np.empty(t.size - history, dtype=np.float64)
+
+        # Samples at the very start of the series have fewer than `window` points to fit
+        full = max(history, self.window - 1) # first index with a full window behind it
+        for j in range(history, min(full, t.size)):
+            slopes[j - history] = self._fit(t[:j + 1], y[:j + 1])
+
+        if t.size > full:
+            tw = np.lib.stride_tricks.sliding_window_view(t, self.window)[full - self.window + 1:]
+            yw = np.lib.stride_tricks.sliding_window_view(y, self.window)[full - self.window + 1:]
+            slopes[full - history:] = self._fit_windows(tw, yw)
+
+        keep = self.window - 1
+        self._t = t[-keep:].copy()
+        self._y = y[-keep:].copy()
+        return slopes
+
+    def _fit(self, t, y) -> float:
+        """Slope of one series shorter than the window."""
+        if t.size < 2:
+            return 0.0
+        x = t - t.mean()
+        sxx = float(np.dot(x, x))
+        return float(np.dot(x, y - y.mean())) / sxx if sxx > 0 else 0.0
+
+    def _fit_windows(self, tw, yw) -> np.ndarray:
+        """Slopes of full windows, one per row of tw and yw."""
+        x = tw - tw.mean(axis=1, keepdims=True)
+        v = yw - yw.mean(axis=1, keepdims=True)
+        sxx = np.einsum("ij,ij->i", x, x)
+        sxy = np.einsum("ij,ij->i", x, v)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(sxx > 0, sxy / sxx, 0.0)
+
+
+class SavitzkyGolaySlope:
+    """Savitzky-Golay derivative at the newest sample: the slope of a least-squares polynomial over the last `window` samples.
+
+    Same interface as RollingSlope. The polynomial is fit to the actual sample
+    times, so it stays correct when the period changes or samples are missed
+    (the classic filter assumes even spacing). Each update costs O(window).
+    """
+    def __init__(self, window: int = 10, order: int = 2):
+        if window < 2:
+            raise ValueError("Strain rate window must hold at least 2 samples.")
+        if not 1 <= order < window:
+            raise ValueError("Savitzky-Golay order must be at least 1 and less than the window.")
+        self.window = int(window)
+        self.order = int(order)
+        self._t = np.zeros(self.window, dtype=np.float64)
+        self._y = np.zeros(self.window, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """Forget every sample."""
+        self._head = 0
+        self._count = 0
+        self.slope = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def update(self, t: float, y: float) -> float:
+        """Add the sample (t, y), drop the oldest one if the window is full and return the slope."""
+        self._t[self._head] = float(t)
+        self._y[self._head] = float(y)
+        self._head = (self._head + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+        self.slope = self._solve()
+        return self.slope
+
+    def _solve(self) -> float:
+        n = self._count
+        if n < 2:
+            return 0.0
+        idx = (self._head - n + np.arange(n)) % self.window
+        return _savgol_slope(self._t[idx], self._y[idx], self.order)
+
+
+class BlockSavitzkyGolaySlope(BlockSlope):
+    """The same slopes as SavitzkyGolaySlope, computed a block of samples at a time with NumPy."""
+    def __init__(self, window: int = 10, order: int = 2):
+        if not 1 <= order < window:
+            raise ValueError("Savitzky-Golay order must be at least 1 and less than the window.")
+        super().__init__(window)
+        self.order = int(order)
+
+    def _fit(self, t, y) -> float:
+        if t.size < 2:
+            return 0.0
+        return _savgol_slope(t, y, self.order)
+
+    def _fit_windows(self, tw, yw) -> np.ndarray:
+        scale = tw[:, -1] - tw[:, 0]
+        spread = scale > 0.0
+        x = (tw - tw[:, -1:]) / np.where(spread, scale, 1.0)[:, None]
+        vander = x[:, :, None] ** np.arange(self.order + 1)
+        normal = np.einsum("mwi,mwj->mij", vander, vander)
+        normal[~spread] = np.eye(self.order + 1) # windows without a time span get slope 0 below
+        rhs = np.einsum("mwi,mw->mi", vander, yw - yw[:, -1:])
+        try:
+            coeffs = np.linalg.solve(normal, rhs[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            # A singular window somewhere in the block: fit the windows one at a time
+            return np.array([_savgol_slope(t, y, self.order) for t, y in zip(tw, yw)])
+        return np.where(spread, coeffs[:, 1] / np.where(spread, scale, 1.0), 0.0)
+
+
+def _savgol_slope(t, y, order: int) -> float:
+    """Slope at the last sample of a least-squares polynomial of the given order (at most len(t) - 1) through (t, y)."""
+    # Times scaled to [-1, 0] around the newest sample keep the normal equations well conditioned
+    scale = t[-1] - t[0]
+    if scale <= 0.0:
+        return 0.0
+    x = (t - t[-1]) / scale
+    vander = np.vander(x, min(order, t.size - 1) + 1, increasing=True)
+    try:
+        coeffs = np.linalg.solve(vander.T @ vander, vander.T @ (y - y[-1]))
+    except np.linalg.LinAlgError:
+        return 0.0
+    return float(coeffs[1]) / scale
+
+
+FILTERS = {"linear": RollingSlope, "savgol": SavitzkyGolaySlope} # live strain rate filters by name
+BLOCK_FILTERS = {"linear": BlockSlope, "savgol": BlockSavitzkyGolaySlope} # the same, a block at a time (reprocess.py)
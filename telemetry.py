@@ -0,0 +1,213 @@
+"""Low-overhead metrics: counters, gauges and HDR-style histograms, readable as plain text.
+
+Metrics live in a Registry (REGISTRY is the process-wide one) under a name
+and optional labels, e.g. REGISTRY.histogram("sample_lateness_seconds",
+station="Station 2"); asking again for the same name and labels returns the
+same metric. Recording costs a few arithmetic operations, cheap enough for
+every sample. Each metric is written from one thread; readers may see a
+value that is one update behind.
+
+Registry.text() renders every metric in the Prometheus text format, which
+serve() offers on a local HTTP port and export() writes to a file.
+Registry.report() is the same data in a short human-readable form.
+"""
+import http.server
+import math
+import os
+import threading
+
+
+class Counter:
+    """A count that only goes up (samples taken, rows written, ...)."""
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def describe(self) -> str:
+        return f"{self.value:g}"
+
+
+class Gauge:
+    """A value that is set, not accumulated (capacity, rate of the latest batch, ...)."""
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def describe(self) -> str:
+        return f"{self.value:.4g}"
+
+
+class Histogram:
+    """Distribution of recorded values in log-linear buckets, in the manner of HdrHistogram.
+
+    Every power of two from 2**MIN_EXP to 2**MAX_EXP is split into
+    SUB_BUCKETS equal buckets, so any percentile is known to within 1/64
+    (1.6%) of its value whatever the range. Values below the range (zero or
+    negative ones included) land in the first bucket and values above it in
+    the last; count, sum, min and max are exact.
+    """
+    kind = "summary"
+    SUB_BUCKETS = 64
+    MIN_EXP = -24 # 2**-24 s is 60 ns
+    MAX_EXP = 20  # 2**20 s is 12 days
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_EXP - self.MIN_EXP) * self.SUB_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float):
+        value = float(value)
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > 0:
+            # value = mantissa * 2**exponent with 0.5 <= mantissa < 1
+            mantissa, exponent = math.frexp(value)
+            index = (exponent - 1 - self.MIN_EXP) * self.SUB_BUCKETS + int((2 * mantissa - 1) * self.SUB_BUCKETS)
+            self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+        else:
+            self.counts[0] += 1
+
+    def bucket_limit(self, index: int) -> float:
+        """Largest value that lands in a bucket."""
+        power, sub = divmod(index, self.SUB_BUCKETS)
+        return math.ldexp(1 + (sub + 1) / self.SUB_BUCKETS, self.MIN_EXP + power)
+
+    def percentile(self, q: float) -> float:
+        """Value below which a fraction q of the recorded values lie (NaN if nothing was recorded)."""
+        if self.count == 0:
+            return math.nan
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(max(self.bucket_limit(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else math.nan
+
+    def describe(self, scale: float = 1.0, unit: str = "") -> str:
+        if self.count == 0:
+            return "no values"
+        quantiles = " ".join(f"p{100 * q:g} {scale * self.percentile(q):.3g}" for q in self.QUANTILES)
+        return (f"n {self.count}, mean {scale * self.mean:.3g} {quantiles} "
+                f"max {scale * self.max:.3g}{unit}")
+
+
+def _label_text(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Registry:
+    """Named metrics, created on first use."""
+    def __init__(self):
+        self.metrics = {} # (name, labels) -> metric, labels a sorted tuple of (key, value)
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: dict):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = cls()
+                    if help:
+                        self.help.setdefault(name, help)
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels)
+
+    def _items(self):
+        with self._lock:
+            return sorted(self.metrics.items(), key=lambda item: item[0])
+
+    def text(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        described = set()
+        for (name, labels), metric in self._items():
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                for q in metric.QUANTILES:
+                    lines.append(f"{name}{_label_text(labels + (('quantile', f'{q:g}'),))} {metric.percentile(q):.9g}")
+                lines.append(f"{name}_sum{_label_text(labels)} {metric.sum:.9g}")
+                lines.append(f"{name}_count{_label_text(labels)} {metric.count}")
+                lines.append(f"{name}_max{_label_text(labels)} {metric.max if metric.count else math.nan:.9g}")
+            else:
+                lines.append(f"{name}{_label_text(labels)} {metric.value:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """One readable line per metric; durations in ms."""
+        lines = []
+        for (name, labels), metric in self._items():
+            if isinstance(metric, Histogram) and name.endswith("_seconds"):
+                value = metric.describe(scale=1000, unit=" ms")
+                name = name[:-len("_seconds")]
+            else:
+                value = metric.describe()
+            lines.append(f"{name}{_label_text(labels)}: {value}")
+        return lines
+
+    def export(self, file_name: str):
+        """Write text() to a file, replacing it in one step."""
+        tmp_name = file_name + ".tmp"
+        with open(tmp_name, mode="w", newline="") as file:
+            file.write(self.text())
+        os.replace(tmp_name, file_name)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+        """Answer GET requests on host:port with text(), on a daemon thread. Returns the server."""
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # no line per scrape
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+REGISTRY = Registry()
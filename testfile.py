@@ -0,0 +1,406 @@
+"""Chunked binary test files: compressed column chunks with an index by elapsed time.
+
+    python testfile.py NAME_data.ctest                                  # all of it to NAME_data.csv
+    python testfile.py NAME_data.ctest --start 360000 --stop 432000 -o hours_100_120.csv
+
+A test file starts with an 8-byte magic number, followed by records of a
+16-byte header (kind, payload length, CRC-32 of the payload) and a payload:
+
+META  JSON: the columns, and the test's parameters, start time and period
+      log as in the checkpoint (see recovery.py). Written at the start and
+      again whenever it changes; the latest one holds.
+CHNK  A chunk of rows: row count and first and last elapsed time, then the
+      columns one after another, byte-shuffled and zlib-compressed.
+INDX  Written on close: the offset of the latest META record, then file
+      offset, rows and time range of every chunk. A 16-byte trailer after
+      it points at it.
+
+The index takes a reader straight to the chunks holding a time range. A
+file that was not closed (after a crash) is indexed by skipping from record
+header to record header, and whatever follows its last whole record is cut
+off when it is appended to again. The CSV export streams one chunk at a
+time in the data file's column layout, so existing analysis keeps working.
+Files are about a sixth of the size of the CSV.
+
+data_blocks and sample_rows read data files of either format (for recovery
+and the viewer).
+"""
+import argparse
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from writer import DATA_COLUMNS, LINE_END, format_rows, read_chunks
+
+EXTENSION = ".ctest"
+MAGIC = b"CREEPTF1"
+TRAILER_MAGIC = b"CTINDEX1"
+RECORD = struct.Struct("<4sQI") # kind, payload length, CRC-32 of the payload
+CHUNK = struct.Struct("<Qdd") # rows, first and last elapsed time
+TRAILER = struct.Struct("<Q8s") # offset of the INDX record, TRAILER_MAGIC
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("rows", "<u8"), ("first_row", "<u8"),
+                        ("t_first", "<f8"), ("t_last", "<f8")])
+TIME_COLUMN = "Elapsed Time (s)"
+BLOCK_ROWS = 1 << 18 # CSV rows parsed per block by data_blocks
+SAMPLE_CHUNKS = 64 # chunks sample_rows decompresses at most
+
+
+class TestFileError(Exception):
+    """A test file is not one, or is damaged beyond its last whole record."""
+
+
+def _shuffle(column: np.ndarray) -> bytes:
+    """Bytes of a column grouped by significance (all first bytes, then all second...), which compress far better."""
+    column = np.ascontiguousarray(column)
+    return column.view(np.uint8).reshape(-1, column.itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, dtype: np.dtype, rows: int) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, rows).T.copy().view(dtype).ravel()
+
+
+def _scan(file):
+    """Index of an open file, the offset of its latest META record (None if none) and the offset after its last whole record.
+
+    Uses the index written on close if there is one, otherwise reads every record header.
+    """
+    size = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    if file.read(len(MAGIC)) != MAGIC:
+        raise TestFileError(f"{file.name} is not a test file.")
+    if size >= len(MAGIC) + TRAILER.size:
+        file.seek(size - TRAILER.size)
+        offset, magic = TRAILER.unpack(file.read(TRAILER.size))
+        if magic == TRAILER_MAGIC and len(MAGIC) <= offset < size:
+            file.seek(offset)
+            kind, payload = _read_record(file, size - TRAILER.size)
+            if kind == b"INDX":
+                (meta_offset,) = struct.unpack_from("<q", payload)
+                index = np.frombuffer(payload, dtype=INDEX_DTYPE, offset=8)
+                return index, (meta_offset if meta_offset >= 0 else None), offset
+
+    entries = []
+    meta_offset = None
+    offset = len(MAGIC)
+    rows = 0
+    while offset + RECORD.size <= size:
+        file.seek(offset)
+        kind, length, crc = RECORD.unpack(file.read(RECORD.size))
+        end = offset + RECORD.size + length
+        if kind not in (b"META", b"CHNK") or end > size:
+            break # an unfinished index, or a record cut short
+        if end == size:
+            # The last record may not have reached the disk whole
+            file.seek(offset)
+            if _read_record(file, size)[0] is None:
+                break
+            file.seek(offset + RECORD.size)
+        if kind == b"CHNK":
+            n, t_first, t_last = CHUNK.unpack(file.read(CHUNK.size))
+            entries.append((offset, n, rows, t_first, t_last))
+            rows += n
+        else:
+            meta_offset = offset
+        offset = end
+    return np.array(entries, dtype=INDEX_DTYPE), meta_offset, offset
+
+
+def _metadata(file, offset, end) -> dict:
+    """The META record at `offset` (empty if there is none)."""
+    if offset is None:
+        return {}
+    file.seek(offset)
+    kind, payload = _read_record(file, end)
+    if kind != b"META":
+        raise TestFileError(f"{file.name}: damaged metadata at offset {offset}.")
+    return json.loads(payload)
+
+
+def _read_record(file, end):
+    """(kind, payload) of the record at the file position, or (None, None) if it is cut short or damaged."""
+    start = file.tell()
+    header = file.read(RECORD.size)
+    if len(header) < RECORD.size:
+        return None, None
+    kind, length, crc = RECORD.unpack(header)
+    if start + RECORD.size + length > end:
+        return None, None
+    payload = file.read(length)
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        return None, None
+    return kind, payload
+
+
+class TestFile:
+    """Reads a test file: its metadata, and its rows by time range one chunk at a time."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.index, meta_offset, self._end = _scan(self._file)
+            self.metadata = _metadata(self._file, meta_offset, self._end)
+        except Exception:
+            self._file.close()
+            raise
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in self.metadata.get("columns") or []]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self) -> int:
+        return int(self.index["rows"].sum())
+
+    @property
+    def names(self):
+        return [name for name, _ in self.columns]
+
+    def _chunk(self, entry, names):
+        self._file.seek(int(entry["offset"]))
+        kind, payload = _read_record(self._file, self._end)
+        if kind != b"CHNK":
+            raise TestFileError(f"{self.path}: damaged chunk at offset {int(entry['offset'])}.")
+        rows = int(entry["rows"])
+        data = zlib.decompress(payload[CHUNK.size:])
+        columns, position = {}, 0
+        for name, dtype in self.columns:
+            size = rows * dtype.itemsize
+            if name in names:
+                columns[name] = _unshuffle(data[position:position + size], dtype, rows)
+            position += size
+        return columns
+
+    def chunks(self, start: float = None, stop: float = None, names=None):
+        """Dicts of column arrays, a chunk at a time, for the rows with start <= elapsed time <= stop."""
+        names = self.names if names is None else list(names)
+        wanted = set(names) | {TIME_COLUMN}
+        first = 0 if start is None else int(np.searchsorted(self.index["t_last"], start))
+        last = len(self.index) if stop is None else int(np.searchsorted(self.index["t_first"], stop, side="right"))
+        for entry in self.index[first:last]:
+            columns = self._chunk(entry, wanted)
+            t = columns[TIME_COLUMN]
+            if (start is not None and t[0] < start) or (stop is not None and t[-1] > stop):
+                keep = np.ones(len(t), dtype=bool)
+                if start is not None:
+                    keep &= t >= start
+                if stop is not None:
+                    keep &= t <= stop
+                columns = {name: values[keep] for name, values in columns.items()}
+            yield {name: columns[name] for name in names}
+
+    def read(self, start: float = None, stop: float = None, names=None):
+        """The columns for the rows with start <= elapsed time <= stop, as one dict of arrays."""
+        names = self.names if names is None else list(names)
+        parts = list(self.chunks(start, stop, names))
+        return {name: (np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype))
+                for name, dtype in self.columns if name in names}
+
+    def row(self, position: int):
+        """One row, in column order (position -1 is the last)."""
+        entry = self.index[-1 if position < 0 else int(np.searchsorted(self.index["first_row"], position, side="right")) - 1]
+        columns = self._chunk(entry, set(self.names))
+        offset = position if position < 0 else position - int(entry["first_row"])
+        return np.array([columns[name][offset] for name in self.names], dtype=np.float64)
+
+
+class TestFileWriter:
+    """Appends chunks of rows to a test file (a new one, or one left by an earlier run or a crash)."""
+    CHUNK_ROWS = 1 << 14 # rows held back before they are compressed into a chunk
+
+    def __init__(self, path: str, chunk_rows: int = CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.test = None # test state, as in the checkpoint
+        self.columns = None # [(name, dtype)], from the first rows appended
+        self._pending = [] # column blocks not yet in a chunk
+        self._pending_rows = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, "r+b")
+            index, self._meta_offset, end = _scan(self._file)
+            metadata = _metadata(self._file, self._meta_offset, end)
+            # Carry on after the last whole record; the index is written again on close
+            self._file.truncate(end)
+            self._file.seek(end)
+            self._index = index.tolist()
+            self.rows = int(index["rows"].sum())
+            self.test = metadata.get("test")
+            if metadata.get("columns"):
+                self.columns = [(name, np.dtype(dtype)) for name, dtype in metadata["columns"]]
+        else:
+            self._file = open(path, "w+b")
+            self._file.write(MAGIC)
+            self._meta_offset = None
+            self._index = []
+            self.rows = 0
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def _write_record(self, kind: bytes, payload: bytes) -> int:
+        offset = self._file.tell()
+        self._file.write(RECORD.pack(kind, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        return offset
+
+    def _write_metadata(self):
+        columns = [[name, dtype.str] for name, dtype in self.columns] if self.columns else None
+        self._meta_offset = self._write_record(b"META", json.dumps({"columns": columns, "test": self.test}, default=float).encode())
+
+    def write_metadata(self, test: dict):
+        """Record the test's state (parameters, start time, period log); written only if it changed."""
+        if test != self.test:
+            self.test = test
+            self._write_metadata()
+
+    def append(self, names, columns):
+        """Queue equal-length column arrays; full chunks are written straight away."""
+        if self.columns is None:
+            self.columns = [(name, np.asarray(column).dtype) for name, column in zip(names, columns)]
+            self._write_metadata()
+        elif [name for name, _ in self.columns] != list(names):
+            raise TestFileError(f"{self.path} has the columns {[name for name, _ in self.columns]}.")
+        self._pending.append([np.asarray(column) for column in columns])
+        self._pending_rows += len(columns[0])
+        while self._pending_rows >= self.chunk_rows:
+            self._write_chunk(self.chunk_rows)
+
+    def _write_chunk(self, rows: int):
+        """Compress the first `rows` pending rows into a chunk."""
+        blocks, self._pending = self._pending, []
+        merged = [np.concatenate([block[i] for block in blocks]) for i in range(len(self.columns))]
+        if rows < len(merged[0]):
+            self._pending = [[column[rows:] for column in merged]]
+        self._pending_rows = len(merged[0]) - rows
+        chunk = [np.asarray(column[:rows], dtype=dtype) for column, (_, dtype) in zip(merged, self.columns)]
+        t = chunk[[name for name, _ in self.columns].index(TIME_COLUMN)]
+        data = zlib.compress(b"".join(_shuffle(column) for column in chunk))
+        offset = self._write_record(b"CHNK", CHUNK.pack(rows, t[0], t[-1]) + data)
+        self._index.append((offset, rows, self.rows, float(t[0]), float(t[-1])))
+        self.rows += rows
+
+    def flush(self):
+        """Write the pending rows as a (short) chunk and hand everything to the operating system."""
+        if self._pending_rows:
+            self._write_chunk(self._pending_rows)
+        self._file.flush()
+
+    def close(self):
+        """Write the pending rows, the index and the trailer."""
+        self.flush()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        meta_offset = -1 if self._meta_offset is None else self._meta_offset
+        offset = self._write_record(b"INDX", struct.pack("<q", meta_offset) + index.tobytes())
+        self._file.write(TRAILER.pack(offset, TRAILER_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+def data_blocks(file_name: str, rows: int = BLOCK_ROWS):
+    """Rows of a data file, binary or CSV, as dicts of column arrays by header, a block at a time."""
+    if file_name.endswith(EXTENSION):
+        with TestFile(file_name) as test_file:
+            yield from test_file.chunks()
+        return
+    with open(file_name, newline="") as file:
+        headers = file.readline().rstrip("\r\n").split(",")
+        # Only whole lines: a crash, or a test still running, can leave the last one cut short
+        for block in read_chunks((line for line in file if line.endswith("\n")), rows):
+            yield dict(zip(headers, block.T))
+
+
+def sample_rows(file_name: str, count: int):
+    """About `count` rows spread evenly over a data file, and its last row, as a dict of column arrays.
+
+    Reads only around the rows it takes (a coarse overview of a file of any length).
+    """
+    if file_name.endswith(EXTENSION):
+        with TestFile(file_name) as test_file:
+            index = test_file.index
+            if not len(index):
+                return {name: np.empty(0, dtype) for name, dtype in test_file.columns}
+            picks = np.unique(np.linspace(0, len(index) - 1, min(len(index), SAMPLE_CHUNKS)).round().astype(int))
+            per = max(count // len(picks), 2)
+            parts = []
+            for k in picks:
+                # Rows spread over each chunk taken, from its first to its last
+                chunk = test_file._chunk(index[k], set(test_file.names))
+                rows = int(index["rows"][k])
+                take = np.unique(np.linspace(0, rows - 1, min(per, rows)).round().astype(int))
+                parts.append({name: values[take] for name, values in chunk.items()})
+            return {name: np.concatenate([part[name] for part in parts]) for name in test_file.names}
+
+    with open(file_name, "rb") as file:
+        headers = file.readline().decode("ascii").rstrip("\r\n").split(",")
+        data_start = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        lines, last_start = [], -1
+        for offset in np.linspace(data_start, size, count, endpoint=False).astype(np.int64):
+            file.seek(max(int(offset) - 1, data_start))
+            if offset > data_start:
+                file.readline() # rest of the line the offset fell in
+            start = file.tell()
+            line = file.readline()
+            if start != last_start and line.endswith(b"\n"):
+                lines.append(line)
+                last_start = start
+        # The last whole row, so the overview spans the whole test
+        tail_start = file.seek(max(size - 4096, data_start))
+        tail = file.read().splitlines(keepends=True)[1 if tail_start > data_start else 0:]
+        whole = [line for line in tail if line.endswith(b"\n")]
+        if whole and (not lines or whole[-1] != lines[-1]):
+            lines.append(whole[-1])
+    if not lines:
+        return {name: np.empty(0) for name in headers}
+    block = np.loadtxt([line.decode("ascii") for line in lines], delimiter=",", dtype=np.float64, ndmin=2)
+    return dict(zip(headers, block.T))
+
+
+def export_csv(path: str, csv_name: str, start: float = None, stop: float = None, columns=DATA_COLUMNS) -> int:
+    """Write the rows of a test file with start <= elapsed time <= stop to a CSV in the data file layout.
+
+    Streams one chunk at a time. Returns the number of rows written.
+    """
+    formats = dict(columns)
+    rows = 0
+    with TestFile(path) as test_file, open(csv_name, "w", newline="") as out:
+        names = test_file.names
+        out.write(",".join(names) + LINE_END)
+        for chunk in test_file.chunks(start, stop):
+            out.write(format_rows([chunk[name] for name in names], [formats.get(name, "%.17g") for name in names]))
+            rows += len(chunk[names[0]])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a binary test file to CSV in the data file layout.")
+    parser.add_argument("test_file", help=f"NAME_data{EXTENSION}")
+    parser.add_argument("-o", "--output", default=None, help="CSV file to write (default: the test file's name with .csv)")
+    parser.add_argument("--start", type=float, default=None, help="first elapsed time to export (s)")
+    parser.add_argument("--stop", type=float, default=None, help="last elapsed time to export (s)")
+    parser.add_argument("--info", action="store_true", help="print the file's metadata and chunks instead")
+    args = parser.parse_args(argv)
+
+    if args.info:
+        with TestFile(args.test_file) as test_file:
+            print(json.dumps(test_file.metadata, indent=1))
+            index = test_file.index
+            if len(index):
+                print(f"{len(test_file)} rows in {len(index)} chunks, "
+                      f"elapsed {index['t_first'][0]:g} to {index['t_last'][-1]:g} s")
+        return
+    output = args.output or os.path.splitext(args.test_file)[0] + ".csv"
+    rows = export_csv(args.test_file, output, args.start, args.stop)
+    print(f"Wrote {rows} rows to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Background writer for the test's data and info files, and readers for them."""
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from telemetry import REGISTRY
+
+log = logging.getLogger(__name__)
+
+# Data file columns: header and printf format. %.17g round-trips float64, %.9g float32.
+DATA_COLUMNS = [
+    ("Epoch Time (s)", "%.17g"),
+    ("Elapsed Time (s)", "%.9g"),
+    ("Displacement (in)", "%.9g"),
+    ("Engineering Strain", "%.9g"),
+    ("True Strain", "%.9g"),
+    ("True Strain Rate (1/s)", "%.9g"),
+    ("Temperature (C)", "%.9g"),
+    ("Displacement Voltage (V)", "%.10g"), # raw readings, as the instruments report them
+    ("Thermocouple Voltage (V)", "%.10g"),
+]
+
+LINE_END = "\r\n" # same line ending csv.writer used
+
+
+def format_rows(columns, formats, line_end=LINE_END) -> str:
+    """Format equal-length column arrays as CSV text with one % operation per block."""
+    n = len(columns[0])
+    if n == 0:
+        return ""
+    row = ",".join(formats) + line_end
+    values = np.column_stack([np.asarray(c, dtype=np.float64) for c in columns]).ravel().tolist()
+    return (row * n) % tuple(values)
+
+
+def read_info_lines(file_name):
+    """The "Key: value" lines of an info file as (key, value) pairs in order, repeated keys included (missing file: empty list)."""
+    pairs = []
+    if not os.path.exists(file_name):
+        return pairs
+    with open(file_name, newline="") as file:
+        for line in file:
+            key, sep, value = line.rstrip("\r\n").partition(": ")
+            if sep:
+                pairs.append((key, value))
+    return pairs
+
+
+def read_info(file_name):
+    """The "Key: value" lines of an info file as a dict, with the last value of a repeated key (missing file: empty dict)."""
+    return dict(read_info_lines(file_name))
+
+
+def read_chunks(file, rows: int):
+    """Blocks of at most `rows` data lines from an open CSV (after its header) as 2-D float arrays."""
+    while True:
+        lines = list(itertools.islice(file, rows))
+        if not lines:
+            return
+        yield np.loadtxt(lines, delimiter=",", dtype=np.float64, ndmin=2)
+
+
+class DataWriter:
+    """Appends blocks of samples to the data CSV on its own thread.
+
+    The acquisition thread only puts column slices on a queue, so it never
+    waits on the disk. The data file stays open with a large buffer; it is
+    flushed after every block and fsynced at most every `fsync_interval`
+    seconds (0 syncs every block, None leaves it to the OS). The info file
+    and the checkpoint (see recovery.py) are only rewritten when their text
+    changes, through a temporary file and os.replace so a crash never leaves
+    them half written. Both are written after the rows queued before them.
+
+    A data file named NAME_data.ctest is written as a chunked binary test
+    file instead (see testfile.py): rows are compressed a chunk at a time,
+    and a short chunk is written whenever the file is fsynced. The
+    checkpoint also goes into its metadata.
+    """
+    BLOCK_ROWS = 10000 # rows formatted per % operation, bounds the size of one string
+
+    def __init__(self, data_file_name: str, info_file_name: str, columns=DATA_COLUMNS,
+                 fsync_interval: float = 30.0, buffer_size: int = 1 << 20, labels: dict = None,
+                 checkpoint_file_name: str = None):
+        self.data_file_name = data_file_name
+        self.info_file_name = info_file_name
+        self.checkpoint_file_name = checkpoint_file_name
+        import testfile # imports this module
+        self.binary = data_file_name.endswith(testfile.EXTENSION)
+        self.headers = [name for name, _ in columns]
+        self.formats = [fmt for _, fmt in columns]
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+
+        self.rows_written = 0
+        labels = labels or {}
+        self.write_metric = REGISTRY.histogram("csv_write_seconds", "Time to format and write one block of rows", **labels)
+        self.rows_metric = REGISTRY.counter("csv_rows_total", "Rows appended to the data file", **labels)
+        self.rate_metric = REGISTRY.gauge("csv_rows_per_second", "Rows per second of the latest block", **labels)
+        self.error = None # last exception raised on the writer thread; the test stops on it at its next save
+        self._info_text = None
+        self._checkpoint_text = None
+        self._file = None
+        self._last_sync = time.monotonic()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="DataWriter", daemon=True)
+        self._thread.start()
+
+    def write_rows(self, columns):
+        """Queue equal-length column slices (in `columns` order) to be appended.
+
+        The slices are not copied, so the caller must not modify them afterwards.
+        """
+        self._queue.put(("rows", columns))
+
+    def write_info(self, text: str):
+        """Queue the info file contents; ignored if unchanged since the last call."""
+        if text != self._info_text:
+            self._info_text = text
+            self._queue.put(("info", text))
+
+    def write_checkpoint(self, text: str):
+        """Queue the checkpoint file contents; ignored if unchanged since the last call, or without a checkpoint file."""
+        if self.checkpoint_file_name is not None and text != self._checkpoint_text:
+            self._checkpoint_text = text
+            self._queue.put(("checkpoint", text))
+
+    def flush(self):
+        """Block until everything queued so far is written."""
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued, then close the data file and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(("close", None))
+            self._thread.join()
+
+    @property
+    def pending(self) -> int:
+        """Number of blocks waiting to be written."""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            kind, payload = self._queue.get()
+            try:
+                if kind == "rows":
+                    self._append(payload)
+                elif kind == "info":
+                    self._replace(self.info_file_name, payload)
+                elif kind == "checkpoint":
+                    self._replace(self.checkpoint_file_name, payload)
+                    if self.binary:
+                        self._open_file()
+                        self._file.write_metadata(json.loads(payload))
+                elif kind == "close":
+                    self._close_file()
+                    return
+            except Exception as e:
+                self.error = e
+                log.error("Error writing %s: %s", self.data_file_name, e)
+            finally:
+                self._queue.task_done()
+
+    def _open_file(self):
+        if self._file is not None:
+            return
+        if self.binary:
+            from testfile import TestFileWriter
+            self._file = TestFileWriter(self.data_file_name)
+            return
+        self._file = open(self.data_file_name, mode="a", newline="", buffering=self.buffer_size)
+        # Write header only for empty files
+        if self._file.tell() == 0:
+            self._file.write(",".join(self.headers) + LINE_END)
+
+    def _append(self, columns):
+        began = time.perf_counter()
+        self._open_file()
+
+        n = len(columns[0])
+        if self.binary:
+            self._file.append(self.headers, columns)
+        else:
+            for start in range(0, n, self.BLOCK_ROWS):
+                block = [c[start:start + self.BLOCK_ROWS] for c in columns]
+                self._file.write(format_rows(block, self.formats))
+            self._file.flush()
+        self.rows_written += n
+        seconds = time.perf_counter() - began
+        self.write_metric.record(seconds)
+        self.rows_metric.inc(n)
+        if seconds > 0:
+            self.rate_metric.set(n / seconds)
+
+        if self.fsync_interval is not None and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._file.flush() # binary: the rows held back become a chunk
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+    @staticmethod
+    def _replace(file_name, text):
+        tmp_name = file_name + ".tmp"
+        with open(tmp_name, mode="w", newline="") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_name, file_name)
+
+    def _close_file(self):
+        if self.binary and self._file is not None:
+            self._file.close() # writes the index
+            self._file = None
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None